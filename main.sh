@@ -1,2 +1 @@
-python3 src/main.py "/static-site-generator/"
-cd public && python3 -m http.server 8888	# web server at http://localhost:8888
+python3 src/main.py serve --watch --port 8888	# web server at http://localhost:8888, rebuilds on change
@@ -0,0 +1,164 @@
+'''
+Optional asset pipeline. Every static file is also published under a content-hashed name
+(index.css -> index.3f2a9c1b.css) that can be served with a far-future cache lifetime, page
+references to it are rewritten to that name, and text assets get precompressed .gz siblings
+(and .br ones when the brotli module is installed). Hashes are kept in the manifest by size and
+mtime, so an unchanged asset is neither read nor compressed again on the next build.
+'''
+
+import gzip
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from buildlog import logger
+from manifest import hash_file, remove_output
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico')
+HASH_LENGTH = 8
+
+ASSET_ATTRIBUTE_PATTERN = re.compile(r'((?:href|src)=")([^"]*)(")')
+
+
+def fingerprinted_name(path, content_hash):
+	'''
+	path with the start of content_hash before its extension: "css/site.css" -> "css/site.3f2a9c1b.css"
+	'''
+	root, extension = os.path.splitext(path)
+	return f'{root}.{content_hash[:HASH_LENGTH]}{extension}'
+
+
+def compressed_paths(path):
+	'''
+	the precompressed siblings write_compressed makes for path
+	'''
+	if not path.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+		return []
+	paths = [path + '.gz']
+	if brotli is not None:
+		paths.append(path + '.br')
+	return paths
+
+
+def write_compressed(path, data):
+	'''
+	writes path.gz (and path.br with brotli) holding data, the bytes of path.
+	the gzip header carries no name or mtime, so the same data always gives the same file.
+	returns the paths written
+	'''
+	written = []
+	for compressed_path in compressed_paths(path):
+		if compressed_path.endswith('.gz'):
+			compressed = gzip.compress(data, compresslevel=9, mtime=0)
+		else:
+			compressed = brotli.compress(data)
+		with open(compressed_path, 'wb') as f:
+			f.write(compressed)
+		written.append(compressed_path)
+	return written
+
+
+def rewrite_asset_urls(html, assets):
+	'''
+	replaces every href/src url found in assets with its fingerprinted url
+	'''
+	if not assets or '="' not in html:
+		return html
+	return ASSET_ATTRIBUTE_PATTERN.sub(lambda m: m.group(1) + assets.get(m.group(2), m.group(2)) + m.group(3), html)
+
+
+def referenced_urls(html):
+	'''
+	the root-relative href/src urls in html, in order
+	'''
+	return [m.group(2) for m in ASSET_ATTRIBUTE_PATTERN.finditer(html) if _is_root_relative(m.group(2))]
+
+
+def asset_dependencies(urls, assets):
+	'''
+	url -> fingerprinted url for every root-relative url in urls, None for those that are not assets,
+	so that a page recorded with them is rebuilt when one of its assets changes or a new asset appears at a url it uses
+	'''
+	assets = assets or {}
+	return {url: assets.get(url) for url in urls if _is_root_relative(url)}
+
+
+def fingerprint_assets(source, destination, manifest, base_path='/', threads=4):
+	'''
+	publishes a fingerprinted copy (and its compressed siblings) of every file in source under destination.
+	only assets that are new, changed or missing from destination are hashed and written, on threads threads;
+	outputs of changed or deleted assets are removed. the original files are left to fs_util.sync / main.copy.
+	returns (assets, built, unchanged, removed): assets maps each file's url under base_path
+	to its fingerprinted url, e.g. "/css/site.css" -> "/css/site.3f2a9c1b.css"
+	'''
+	if not os.path.isdir(source):
+		logger.warning('source is not a directory')
+		return ({}, 0, 0, 0)
+
+	assets = {}
+	unchanged = 0
+	seen = []
+	jobs = []
+	for root, dirs, files in os.walk(source):
+		dirs.sort()
+		for file_name in sorted(files):
+			source_path = os.path.join(root, file_name)
+			relative_path = os.path.relpath(source_path, source)
+			seen.append(source_path)
+			stat = os.stat(source_path)
+			previous = manifest.fingerprints.get(source_path)
+			if (
+				previous is not None
+				and previous['size'] == stat.st_size
+				and previous['mtime'] == stat.st_mtime_ns
+				and all(os.path.isfile(output) for output in previous['outputs'])
+			):
+				_add_url(assets, base_path, relative_path, previous['hash'])
+				unchanged += 1
+			else:
+				jobs.append((source_path, relative_path, stat))
+
+	removed = 0
+	if jobs:
+		with ThreadPoolExecutor(max_workers=max(threads, 1), thread_name_prefix='assets') as executor:
+			results = list(executor.map(lambda job: _publish(job[0], job[1], destination), jobs))
+		for (source_path, relative_path, stat), (content_hash, outputs) in zip(jobs, results):
+			previous = manifest.fingerprints.get(source_path)
+			if previous is not None:
+				for output in set(previous['outputs']) - set(outputs):
+					removed += remove_output(output, destination)
+			manifest.record_fingerprint(source_path, stat.st_size, stat.st_mtime_ns, content_hash, outputs)
+			_add_url(assets, base_path, relative_path, content_hash)
+			logger.info(f"Fingerprinted '{source_path}' as '{outputs[0]}'", extra={'event': 'fingerprinted', 'path': outputs[0]})
+
+	removed += len(manifest.prune_fingerprints(seen, destination))
+	return (assets, len(jobs), unchanged, removed)
+
+
+def _publish(source_path, relative_path, destination):
+	# runs on a pool thread: hashing, copying and zlib all release the gil for large files
+	content_hash = hash_file(source_path)
+	destination_path = os.path.join(destination, fingerprinted_name(relative_path, content_hash))
+	os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+	shutil.copy2(source_path, destination_path)
+	outputs = [destination_path]
+	if compressed_paths(destination_path):
+		with open(source_path, 'rb') as f:
+			outputs.extend(write_compressed(destination_path, f.read()))
+	return (content_hash, outputs)
+
+
+def _add_url(assets, base_path, relative_path, content_hash):
+	url = relative_path.replace(os.sep, '/')
+	assets[base_path + url] = base_path + fingerprinted_name(url, content_hash)
+
+
+def _is_root_relative(url):
+	return url.startswith('/') and not url.startswith('//')
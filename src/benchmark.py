@@ -0,0 +1,332 @@
+'''
+Benchmarks for the markdown -> html pipeline on synthetic content.
+
+	python3 src/benchmark.py --pages 2000 --output bench.json
+	python3 src/benchmark.py --pages 2000 --compare bench.json
+
+Each stage (markdown_to_blocks, block_to_block_type, text_to_textnodes, markdown_to_html_node,
+to_html, template fill, write, a metadata-only scan of the sources and a full generate_pages_recursive build) is timed over the whole
+corpus and reported as pages/s and MB/s of markdown input. The report also counts how many inline
+texts contain no markup at all and so take the plain text fast path.
+With --memory, the node tree of one large generated document is also measured with tracemalloc:
+peak memory while parsing it, and the memory and allocations the finished tree holds on to.
+'''
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from block_util import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from front_matter import scan_metadata
+from inline_util import is_plain_text, text_to_textnodes
+from main import generate_pages_recursive
+from template import Template
+
+
+WORDS = (
+	'the quick brown fox jumps over lazy dog elf ring hobbit shire river mountain road '
+	'king wizard tower forest song light shadow stone sword horse gate hall fire water'
+).split()
+
+DEFAULT_BLOCK_MIX = {
+	'paragraph': 6,
+	'heading': 2,
+	'code': 1,
+	'quote': 1,
+	'unordered_list': 1,
+	'ordered_list': 1,
+}
+
+TEMPLATE = (
+	'<!doctype html>\n<html>\n<head><title>{{ Title }}</title>'
+	'<link href="/index.css" rel="stylesheet" /></head>\n'
+	'<body><article>{{ Content }}</article></body>\n</html>\n'
+)
+
+
+class CorpusGenerator:
+	def __init__(self, seed=0, blocks_per_page=20, block_mix=None, inline_density=0.1):
+		'''
+		blocks_per_page - blocks generated after each page's title
+		block_mix - block kind -> relative weight
+		inline_density - chance that any given word is a link, image, emphasis or code span
+		'''
+		self.random = random.Random(seed)
+		self.blocks_per_page = blocks_per_page
+		mix = block_mix or DEFAULT_BLOCK_MIX
+		self.block_kinds = list(mix)
+		self.block_weights = [mix[kind] for kind in self.block_kinds]
+		self.inline_density = inline_density
+
+	def page(self, index):
+		blocks = [f'# Page {index} {self._words(3)}']
+		kinds = self.random.choices(self.block_kinds, self.block_weights, k=self.blocks_per_page)
+		blocks.extend(getattr(self, '_' + kind)() for kind in kinds)
+		return '\n\n'.join(blocks) + '\n'
+
+	def pages(self, count):
+		'''
+		returns [(relative path, markdown)] laid out like content/, a few pages per directory
+		'''
+		return [(os.path.join(f'section{i % 10}', f'page{i}', 'index.md'), self.page(i)) for i in range(count)]
+
+	def _words(self, count):
+		return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+	def _inline(self, count):
+		out = []
+		for _ in range(count):
+			word = self.random.choice(WORDS)
+			if self.random.random() < self.inline_density:
+				kind = self.random.randrange(6)
+				if kind == 0:
+					word = f'[{word}](/{word}/index.html)'
+				elif kind == 1:
+					word = f'![{word}](/images/{word}.png)'
+				elif kind == 2:
+					word = f'**{word}**'
+				elif kind == 3:
+					word = f'_{word}_'
+				elif kind == 4:
+					word = f'`{word}`'
+				else:
+					word = f'__{word}__'
+			out.append(word)
+		return ' '.join(out)
+
+	def _paragraph(self):
+		lines = self.random.randint(1, 4)
+		return '\n'.join(self._inline(self.random.randint(8, 16)) for _ in range(lines))
+
+	def _heading(self):
+		return '#' * self.random.randint(2, 4) + ' ' + self._inline(4)
+
+	def _code(self):
+		lines = self.random.randint(2, 8)
+		return '```\n' + '\n'.join(f'{self._words(2)} = {self._words(1)}(**kwargs)' for _ in range(lines)) + '\n```'
+
+	def _quote(self):
+		return '\n'.join('> ' + self._inline(8) for _ in range(self.random.randint(1, 3)))
+
+	def _unordered_list(self):
+		return '\n'.join('- ' + self._inline(5) for _ in range(self.random.randint(2, 6)))
+
+	def _ordered_list(self):
+		return '\n'.join(f'{i}. ' + self._inline(5) for i in range(1, self.random.randint(3, 7)))
+
+
+def write_tree(root, pages):
+	'''
+	writes [(relative path, markdown)] from CorpusGenerator.pages under root
+	'''
+	for relative_path, markdown in pages:
+		path = os.path.join(root, relative_path)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		with open(path, 'w', encoding='utf-8') as f:
+			f.write(markdown)
+
+
+def _inline_texts(block, block_type):
+	# the strings the block builders hand to text_to_children, approximately
+	if block_type == BlockType.CODE:
+		return []
+	if block_type == BlockType.PARAGRAPH:
+		return [block.replace('\n', ' ')]
+	if block_type == BlockType.HEADING:
+		return [block.lstrip('#').strip()]
+	if block_type == BlockType.QUOTE:
+		return [' '.join(line.lstrip('>').strip() for line in block.split('\n'))]
+	return [line.split(' ', 1)[1] if ' ' in line else line for line in block.split('\n')]
+
+
+def _timed(fn):
+	start = time.perf_counter()
+	result = fn()
+	return time.perf_counter() - start, result
+
+
+def run(pages=1000, seed=0, blocks_per_page=20, inline_density=0.1, repeat=3, jobs=1):
+	'''
+	times every stage over a generated corpus, keeping the best of repeat runs per stage
+	'''
+	generator = CorpusGenerator(seed, blocks_per_page, inline_density=inline_density)
+	tree = generator.pages(pages)
+	corpus = [markdown for _, markdown in tree]
+	input_bytes = sum(len(markdown.encode('utf-8')) for markdown in corpus)
+	template = Template(TEMPLATE)
+	stages = {}
+
+	def record(name, fn):
+		best = None
+		result = None
+		for _ in range(repeat):
+			elapsed, result = _timed(fn)
+			best = elapsed if best is None else min(best, elapsed)
+		stages[name] = {
+			'seconds': best,
+			'pages_per_second': pages / best if best else None,
+			'mb_per_second': input_bytes / best / 1e6 if best else None,
+		}
+		return result
+
+	blocks = record('markdown_to_blocks', lambda: [markdown_to_blocks(markdown) for markdown in corpus])
+	all_blocks = [block for page_blocks in blocks for block in page_blocks]
+	types = record('block_to_block_type', lambda: [block_to_block_type(block) for block in all_blocks])
+	texts = [text for block, block_type in zip(all_blocks, types) for text in _inline_texts(block, block_type)]
+	record('text_to_textnodes', lambda: [text_to_textnodes(text) for text in texts])
+	plain_texts = sum(1 for text in texts if is_plain_text(text))
+	nodes = record('markdown_to_html_node', lambda: [markdown_to_html_node(markdown) for markdown in corpus])
+	bodies = record('to_html', lambda: [node.to_html() for node in nodes])
+	outputs = record('template_fill', lambda: [template.render(Title=f'Page {i}', Content=body) for i, body in enumerate(bodies)])
+
+	work_dir = tempfile.mkdtemp(prefix='ssg-bench-')
+	try:
+		def write_all():
+			for i, output in enumerate(outputs):
+				path = os.path.join(work_dir, 'write', f'page{i}', 'index.html')
+				os.makedirs(os.path.dirname(path), exist_ok=True)
+				with open(path, 'w', encoding='utf-8') as f:
+					f.write(output)
+		record('write', write_all)
+
+		content_dir = os.path.join(work_dir, 'content')
+		write_tree(content_dir, tree)
+		template_path = os.path.join(work_dir, 'template.html')
+		with open(template_path, 'w', encoding='utf-8') as f:
+			f.write(TEMPLATE)
+
+		record('metadata_scan', lambda: scan_metadata(content_dir))
+
+		builds = itertools.count()
+
+		def build():
+			# a new output directory every run: pages already on disk with the same bytes are not written again
+			public_dir = os.path.join(work_dir, f'public{next(builds)}')
+			with contextlib.redirect_stdout(io.StringIO()):
+				generate_pages_recursive(content_dir, template_path, public_dir, '/', jobs=jobs)
+		record('build', build)
+	finally:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+	return {
+		'params': {
+			'pages': pages,
+			'seed': seed,
+			'blocks_per_page': blocks_per_page,
+			'inline_density': inline_density,
+			'repeat': repeat,
+			'jobs': jobs,
+		},
+		'environment': {
+			'python': platform.python_version(),
+			'implementation': platform.python_implementation(),
+			'machine': platform.machine(),
+			'cpus': os.cpu_count(),
+		},
+		'corpus': {'pages': pages, 'blocks': len(all_blocks), 'inline_texts': len(texts), 'plain_inline_texts': plain_texts, 'bytes': input_bytes},
+		'stages': stages,
+	}
+
+
+def measure_memory(target_bytes=1000000, seed=0, inline_density=0.1):
+	'''
+	builds the node tree for a generated document of about target_bytes of markdown under tracemalloc.
+	returns the peak traced memory while parsing, and the bytes and allocations still held by the tree
+	'''
+	generator = CorpusGenerator(seed, blocks_per_page=200, inline_density=inline_density)
+	pages = []
+	size = 0
+	while size < target_bytes:
+		page = generator.page(len(pages))
+		# one title per document
+		pages.append(page if not pages else page.split('\n', 1)[1])
+		size += len(page)
+	markdown = '\n'.join(pages)
+
+	tracemalloc.start()
+	try:
+		before = tracemalloc.take_snapshot()
+		node = markdown_to_html_node(markdown)
+		_, peak = tracemalloc.get_traced_memory()
+		after = tracemalloc.take_snapshot()
+	finally:
+		tracemalloc.stop()
+	held = [stat for stat in after.compare_to(before, 'filename') if stat.size_diff > 0]
+	nodes = 0
+	stack = [node]
+	while stack:
+		item = stack.pop()
+		nodes += 1
+		stack.extend(item.children or ())
+	return {
+		'markdown_bytes': len(markdown.encode('utf-8')),
+		'html_nodes': nodes,
+		'peak_bytes': peak,
+		'tree_bytes': sum(stat.size_diff for stat in held),
+		'tree_allocations': sum(stat.count_diff for stat in held),
+	}
+
+
+def format_report(report, baseline=None):
+	corpus = report['corpus']
+	lines = [f"{corpus['pages']} pages, {corpus['blocks']} blocks, {corpus['bytes'] / 1e6:.2f} MB"]
+	if corpus.get('inline_texts'):
+		plain = corpus.get('plain_inline_texts', 0)
+		lines.append(f"{plain} of {corpus['inline_texts']} inline texts ({plain / corpus['inline_texts'] * 100:.0f}%) take the plain text fast path")
+	lines.append(f"{'stage':<24}{'seconds':>10}{'pages/s':>12}{'MB/s':>10}" + (f"{'vs base':>10}" if baseline else ''))
+	for name, stage in report['stages'].items():
+		line = f"{name:<24}{stage['seconds']:>10.4f}{stage['pages_per_second']:>12.1f}{stage['mb_per_second']:>10.2f}"
+		if baseline:
+			base = baseline['stages'].get(name)
+			line += f"{base['seconds'] / stage['seconds']:>9.2f}x" if base and stage['seconds'] else f"{'-':>10}"
+		lines.append(line)
+	memory = report.get('memory')
+	if memory:
+		lines.append(f"memory: {memory['markdown_bytes'] / 1e6:.2f} MB document, {memory['html_nodes']} html nodes")
+		base = baseline.get('memory') if baseline else None
+		for name in ('peak_bytes', 'tree_bytes', 'tree_allocations'):
+			line = f"  {name:<22}{memory[name]:>14,}"
+			if base and base.get(name):
+				line += f"{memory[name] / base[name]:>9.2f}x"
+			lines.append(line)
+	return '\n'.join(lines)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark the markdown to html pipeline on a synthetic corpus.')
+	parser.add_argument('--pages', type=int, default=1000)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--blocks-per-page', type=int, default=20)
+	parser.add_argument('--inline-density', type=float, default=0.1, help='fraction of words carrying inline markup')
+	parser.add_argument('--repeat', type=int, default=3, help='runs per stage; the fastest is reported')
+	parser.add_argument('-j', '--jobs', type=int, default=1, help='worker processes for the full build stage')
+	parser.add_argument('--output', help='write the results as json to this path')
+	parser.add_argument('--compare', help='json results of an earlier run to compare against')
+	parser.add_argument('--memory', type=float, nargs='?', const=1.0, metavar='MB', help='also measure the memory of the node tree for one document of this many MB (default 1)')
+	args = parser.parse_args(argv)
+
+	report = run(args.pages, args.seed, args.blocks_per_page, args.inline_density, args.repeat, args.jobs)
+	if args.memory:
+		report['memory'] = measure_memory(int(args.memory * 1e6), args.seed, args.inline_density)
+	baseline = None
+	if args.compare:
+		with open(args.compare, 'r', encoding='utf-8') as f:
+			baseline = json.load(f)
+	print(format_report(report, baseline))
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as f:
+			json.dump(report, f, indent=2)
+	return report
+
+
+if __name__ == '__main__':
+	main()
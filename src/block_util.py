@@ -1,11 +1,13 @@
 '''
-Block-level markdown is the separation of different sections of an entire document. This assumes blocks are separated by a single blank line.
+Block-level markdown is the separation of different sections of an entire document. This assumes blocks are separated by a single blank line
+(blank lines inside fenced code blocks don't count).
 '''
 
+import re
 from enum import Enum
 
 from htmlnode import LeafNode, ParentNode
-from inline_util import text_node_to_html_node, text_to_textnodes
+from inline_util import extract_markdown_references, extract_terms, is_plain_text, text_node_to_html_node, text_to_textnodes
 from textnode import TextNode, TextType
 
 
@@ -19,125 +21,268 @@ class BlockType(Enum):
 
 
 def markdown_to_blocks(markdown):
-    '''
-    takes a raw Markdown string (representing a full document) as input and returns a list of "block" strings.
-    Separation is strictly by exactly two newlines ("\n\n").
-    '''
-    if markdown is None:
-        return []
-    text = markdown.strip()
-    if not text:
-        return []
-    parts = text.split("\n\n")
-    blocks = [p.strip() for p in parts if p.strip()]
-    return blocks
+	'''
+	takes a raw Markdown string (representing a full document) as input and returns a list of "block" strings.
+	Blocks are separated by blank lines ("\n\n"), except inside ``` fences, which may contain blank lines.
+	'''
+	if markdown is None:
+		return []
+	if '```' in markdown:
+		return list(iter_blocks(markdown.split('\n')))
+	text = markdown.strip()
+	if not text:
+		return []
+	parts = text.split("\n\n")
+	blocks = [p.strip() for p in parts if p.strip()]
+	return blocks
+
+
+def iter_blocks(lines):
+	'''
+	yields the same blocks as markdown_to_blocks from an iterable of lines, e.g. an open file,
+	holding only the current block in memory
+	'''
+	current = []
+	in_fence = False
+	for line in lines:
+		line = line.rstrip('\n')
+		if line.lstrip().startswith('```'):
+			in_fence = not in_fence
+		if line or in_fence:
+			current.append(line)
+			continue
+		block = '\n'.join(current).strip()
+		if block:
+			yield block
+		current = []
+	block = '\n'.join(current).strip()
+	if block:
+		yield block
+
+
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+
+
+class ClassifiedBlock:
+	__slots__ = ('block', 'block_type', 'lines', 'items')
+
+	def __init__(self, block, block_type, lines, items=None):
+		'''
+		block - the block text
+		block_type - its BlockType
+		lines - the block split into lines, once
+		items - per-line structure found while classifying: for quotes, each line without its "> ";
+		for lists, (indent, ordered, item text) per line
+		'''
+		self.block = block
+		self.block_type = block_type
+		self.lines = lines
+		self.items = items
+
+	def __repr__(self):
+		return f'ClassifiedBlock({self.block_type}, {self.lines}, {self.items})'
 
 
 def block_to_block_type(block):
-	lines = block.split("\n")
+	return classify_block(block).block_type
+
 
-	if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
-		return BlockType.HEADING
+def classify_block(block):
+	'''
+	works out a block's type in one walk over its lines, keeping what the node builders need
+	so that no block is split or scanned twice.
+	lists may contain indented items (of either kind) nested under the previous item;
+	top-level items must all be "- " or all be numbered 1., 2., 3., ...
+	'''
+	lines = block.split("\n")
+	if block.startswith(HEADING_PREFIXES):
+		return ClassifiedBlock(block, BlockType.HEADING, lines)
 	if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-		return BlockType.CODE
+		return ClassifiedBlock(block, BlockType.CODE, lines)
 	if block.startswith(">"):
+		items = []
 		for line in lines:
 			if not line.startswith(">"):
-				return BlockType.PARAGRAPH
-		return BlockType.QUOTE
-	if block.startswith("- "):
+				return ClassifiedBlock(block, BlockType.PARAGRAPH, lines)
+			items.append(_strip_quote_prefix(line))
+		return ClassifiedBlock(block, BlockType.QUOTE, lines, items)
+	if block.startswith(("- ", "1. ")):
+		ordered = not block.startswith("- ")
+		items = []
+		number = 1
+		marker = "1. " if ordered else "- "
 		for line in lines:
-			if not line.startswith("- "):
-				return BlockType.PARAGRAPH
-		return BlockType.UNORDERED_LIST
-	if block.startswith("1. "):
-		i = 1
-		for line in lines:
-			if not line.startswith(f"{i}. "):
-				return BlockType.PARAGRAPH
-			i += 1
-		return BlockType.ORDERED_LIST
-	return BlockType.PARAGRAPH
+			if line.startswith(marker):
+				items.append((0, ordered, line[len(marker):].strip()))
+				if ordered:
+					number += 1
+					marker = f"{number}. "
+				continue
+			# anything else must be a nested item; a top-level one here has the wrong kind or number
+			item = _list_item(line)
+			if item is None or item[0] == 0:
+				return ClassifiedBlock(block, BlockType.PARAGRAPH, lines)
+			items.append(item)
+		block_type = BlockType.ORDERED_LIST if ordered else BlockType.UNORDERED_LIST
+		return ClassifiedBlock(block, block_type, lines, items)
+	return ClassifiedBlock(block, BlockType.PARAGRAPH, lines)
+
+
+LIST_ITEM_PATTERN = re.compile(r"( *)(?:(-)|\d+\.) (.*)")
+
+
+def _list_item(line):
+	# (indent, ordered, item text) for a "- " or "N. " line, None for anything else
+	match = LIST_ITEM_PATTERN.fullmatch(line)
+	if match is None:
+		return None
+	return len(match.group(1)), match.group(2) is None, match.group(3).strip()
 
 
-def markdown_to_html_node(markdown):
+def markdown_to_html_node(markdown, base_path='/', cache=None, links=None, terms=None):
 	'''
 	converts a full markdown document into a single parent HTMLNode, containing many child HTMLNode objects representing the nested elements.
+	root-relative link and image urls are prefixed with base_path as the nodes are built.
+	cache - optional render_cache.RenderCache; blocks found in it become raw html leaves instead of being parsed again
+	links - optional list that receives (kind, url) for every link and image, as block_links returns them,
+	taken from the nodes the inline parser builds anyway
+	terms - optional set that receives the document's search terms (see inline_util.extract_terms)
 	'''
 	blocks = markdown_to_blocks(markdown)
-	block_nodes = [_block_to_html_node(block) for block in blocks]
+	if terms is not None:
+		terms.update(extract_terms(markdown))
+	block_nodes = [_render_block(block, base_path, cache, links) for block in blocks]
 	if not block_nodes:
 		block_nodes = [LeafNode(None, "")]
 	return ParentNode("div", block_nodes)
 
 
-def _block_to_html_node(block):
-	block_type = block_to_block_type(block)
+def render_markdown_into(lines, write, base_path='/', cache=None, links=None, terms=None):
+	'''
+	streams the html of markdown_to_html_node for the document in lines (e.g. an open file) to write,
+	one block at a time, so memory stays bounded by the largest block rather than the document
+	'''
+	write('<div>')
+	for block in iter_blocks(lines):
+		if terms is not None:
+			terms.update(extract_terms(block))
+		if cache is None:
+			_block_to_html_node(block, base_path, links).render_into(write)
+		else:
+			write(_render_block(block, base_path, cache, links).value)
+	write('</div>')
+
+
+def _render_block(block, base_path, cache, links):
+	if cache is None:
+		return _block_to_html_node(block, base_path, links)
+	if links is None:
+		return cache.render(block, base_path, _block_to_html_node)
+	parsed = False
+
+	def build(text, base_path):
+		nonlocal parsed
+		parsed = True
+		return _block_to_html_node(text, base_path, links)
+
+	node = cache.render(block, base_path, build)
+	if not parsed:
+		# a cached block is not parsed again, so its links are found with a scan of their own
+		links.extend(block_links(block))
+	return node
+
+
+def block_links(block):
+	'''
+	(kind, url) for every link and image in a block, kind being "link" or "image";
+	urls are as written, before the base path is applied. code blocks have none.
+	rendering collects the same list while parsing; this is for blocks that are not parsed
+	'''
+	if "[" not in block or (block.startswith("```") and classify_block(block).block_type == BlockType.CODE):
+		return []
+	return extract_markdown_references(block)
+
+
+def _block_to_html_node(block, base_path='/', links=None):
+	classified = classify_block(block)
+	block_type = classified.block_type
 	if block_type == BlockType.PARAGRAPH:
-		return _paragraph_block_to_node(block)
+		return _paragraph_block_to_node(classified, base_path, links)
 	if block_type == BlockType.HEADING:
-		return _heading_block_to_node(block)
+		return _heading_block_to_node(classified, base_path, links)
 	if block_type == BlockType.CODE:
-		return _code_block_to_node(block)
+		return _code_block_to_node(classified)
 	if block_type == BlockType.QUOTE:
-		return _quote_block_to_node(block)
-	if block_type == BlockType.UNORDERED_LIST:
-		return _unordered_list_block_to_node(block)
-	if block_type == BlockType.ORDERED_LIST:
-		return _ordered_list_block_to_node(block)
+		return _quote_block_to_node(classified, base_path, links)
+	if block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+		return _list_block_to_node(classified, base_path, links)
 	raise ValueError(f"Unsupported block type: {block_type}")
 
 
-def _paragraph_block_to_node(block):
-	text = block.replace("\n", " ")
-	return ParentNode("p", text_to_children(text))
+def _paragraph_block_to_node(classified, base_path, links=None):
+	text = " ".join(classified.lines)
+	return ParentNode("p", text_to_children(text, base_path, links))
 
 
-def _heading_block_to_node(block):
+def _heading_block_to_node(classified, base_path, links=None):
+	block = classified.block
 	level = 0
 	while level < len(block) and block[level] == "#":
 		level += 1
 	text = block[level:].strip()
-	return ParentNode(f"h{level}", text_to_children(text))
+	return ParentNode(f"h{level}", text_to_children(text, base_path, links))
 
 
-def _code_block_to_node(block):
-	lines = block.split("\n")
-	has_fence = len(lines) >= 2 and lines[0].startswith("```") and lines[-1].startswith("```")
-	if has_fence:
-		lines = lines[1:-1]
-	code_text = "\n".join(lines)
-	if has_fence and block.endswith("\n```") and not code_text.endswith("\n"):
+def _code_block_to_node(classified):
+	code_text = "\n".join(classified.lines[1:-1])
+	if classified.block.endswith("\n```") and not code_text.endswith("\n"):
 		code_text += "\n"
 	code_node = text_node_to_html_node(TextNode(code_text, TextType.CODE))
 	return ParentNode("pre", [code_node])
 
 
-def _quote_block_to_node(block):
-	lines = block.split("\n")
-	stripped = [_strip_quote_prefix(line) for line in lines]
-	quote_text = "\n".join(stripped).strip()
-	return ParentNode("blockquote", text_to_children(quote_text))
+def _quote_block_to_node(classified, base_path, links=None):
+	quote_text = "\n".join(classified.items).strip()
+	return ParentNode("blockquote", text_to_children(quote_text, base_path, links))
 
 
-def _unordered_list_block_to_node(block):
-	items = []
-	for line in block.split("\n"):
-		if not line:
-			continue
-		item_text = line[2:] if line.startswith("- ") else line
-		items.append(ParentNode("li", text_to_children(item_text.strip())))
-	return ParentNode("ul", items)
+def _list_block_to_node(classified, base_path, links=None):
+	'''
+	builds ul/ol nodes from the classified (indent, ordered, text) items. an item indented deeper than
+	the one before starts a nested list inside it; a change of list kind at a nested level starts a new list.
+	an item dedented to between two open levels joins the deeper one, the nearest open list indented at least as far
+	'''
+	if all(item[0] == 0 for item in classified.items):
+		tag = "ol" if classified.block_type == BlockType.ORDERED_LIST else "ul"
+		return ParentNode(tag, [ParentNode("li", text_to_children(text, base_path, links)) for _, _, text in classified.items])
+	# each open list: [indent, ordered, li children lists]; an li is [text, nested lists]
+	top = [0, classified.block_type == BlockType.ORDERED_LIST, []]
+	stack = [top]
+	for indent, ordered, text in classified.items:
+		# close a nested list only when the item is back at (or before) its parent list's indent
+		while len(stack) > 1 and indent <= stack[-2][0]:
+			stack.pop()
+		current = stack[-1]
+		if indent > current[0]:
+			nested = [indent, ordered, []]
+			current[2][-1][1].append(nested)
+			stack.append(nested)
+		elif ordered != current[1]:
+			stack.pop()
+			nested = [indent, ordered, []]
+			stack[-1][2][-1][1].append(nested)
+			stack.append(nested)
+		stack[-1][2].append([text, []])
+	return _list_to_node(top, base_path, links)
 
 
-def _ordered_list_block_to_node(block):
+def _list_to_node(list_entry, base_path, links=None):
 	items = []
-	for line in block.split("\n"):
-		if not line:
-			continue
-		item_text = _strip_ordered_list_marker(line)
-		items.append(ParentNode("li", text_to_children(item_text)))
-	return ParentNode("ol", items)
+	for text, nested_lists in list_entry[2]:
+		children = text_to_children(text, base_path, links)
+		children.extend(_list_to_node(nested, base_path, links) for nested in nested_lists)
+		items.append(ParentNode("li", children))
+	return ParentNode("ol" if list_entry[1] else "ul", items)
 
 
 def _strip_quote_prefix(line):
@@ -149,19 +294,19 @@ def _strip_quote_prefix(line):
 	return text.strip()
 
 
-def _strip_ordered_list_marker(line):
-	i = 0
-	while i < len(line) and line[i].isdigit():
-		i += 1
-	if i < len(line) and line[i] == ".":
-		i += 1
-	while i < len(line) and line[i] == " ":
-		i += 1
-	return line[i:].strip()
-
-
-def text_to_children(text):
-	if text is None:
-		text = ""
+def text_to_children(text, base_path='/', links=None):
+	'''
+	links - optional list that receives (kind, url) for every link and image node of text
+	'''
+	if not text:
+		return []
+	if is_plain_text(text):
+		# most text has no markup at all: skip the scanner and the TextNode
+		return [LeafNode(None, text)]
 	text_nodes = text_to_textnodes(text)
-	return [text_node_to_html_node(node) for node in text_nodes]
+	if links is not None:
+		links.extend(
+			('image' if node.text_type == TextType.IMAGE else 'link', node.url)
+			for node in text_nodes if node.text_type in (TextType.IMAGE, TextType.LINK)
+		)
+	return [text_node_to_html_node(node, base_path) for node in text_nodes]
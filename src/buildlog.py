@@ -0,0 +1,123 @@
+'''
+Logging for builds. Every module logs through `logger`; per-file messages carry an `event`
+(e.g. "page_generated", "copied") so that the handlers can count them instead of printing them.
+
+	text      one line per message, like the old print output
+	progress  a periodic summary line: counts per event, rate and ETA
+	jsonl     one json object per message, buffered and written in large chunks (for CI)
+'''
+
+import json
+import logging
+import logging.handlers
+import sys
+import time
+
+
+logger = logging.getLogger('ssg')
+
+LOG_FORMATS = ('text', 'progress', 'jsonl')
+
+# events that count towards the progress total announced by "pages_planned"
+PAGE_EVENTS = ('page_generated', 'page_failed')
+
+
+def configure_logging(log_format='text', level=logging.INFO, stream=None, buffer_size=1000):
+	'''
+	replaces any handlers on the build logger with one for log_format and returns it.
+	call finish_logging() at the end of the build to flush buffers and print final progress
+	'''
+	if log_format not in LOG_FORMATS:
+		raise ValueError(f'invalid log format: {log_format}')
+	stream = stream if stream is not None else sys.stdout
+	finish_logging()
+	if log_format == 'progress':
+		handler = ProgressHandler(stream)
+	elif log_format == 'jsonl':
+		target = logging.StreamHandler(stream)
+		target.setFormatter(JsonLinesFormatter())
+		handler = logging.handlers.MemoryHandler(buffer_size, flushLevel=logging.ERROR, target=target)
+	else:
+		handler = logging.StreamHandler(stream)
+		handler.setFormatter(logging.Formatter('%(message)s'))
+	logger.addHandler(handler)
+	logger.setLevel(level)
+	logger.propagate = False
+	return handler
+
+
+def finish_logging():
+	for handler in list(logger.handlers):
+		if isinstance(handler, ProgressHandler):
+			handler.finish()
+		handler.flush()
+		handler.close()
+		logger.removeHandler(handler)
+
+
+class JsonLinesFormatter(logging.Formatter):
+	def format(self, record):
+		entry = {
+			'time': round(record.created, 3),
+			'level': record.levelname.lower(),
+			'message': record.getMessage(),
+		}
+		for key in ('event', 'path', 'count'):
+			value = getattr(record, key, None)
+			if value is not None:
+				entry[key] = value
+		return json.dumps(entry)
+
+
+class ProgressHandler(logging.Handler):
+	def __init__(self, stream, interval=1.0):
+		'''
+		interval - minimum seconds between progress lines
+		'''
+		super().__init__()
+		self.stream = stream
+		self.interval = interval
+		self.counts = {}
+		self.total = None
+		self.started = time.perf_counter()
+		self._last_line = 0.0
+		self._dirty = False
+
+	def emit(self, record):
+		event = getattr(record, 'event', None)
+		if event == 'pages_planned':
+			self.total = record.count
+			return
+		if event is None or record.levelno >= logging.WARNING:
+			# phase messages and problems are always shown in full
+			self.stream.write(record.getMessage() + '\n')
+		if event is None:
+			return
+		self.counts[event] = self.counts.get(event, 0) + 1
+		self._dirty = True
+		now = time.perf_counter()
+		if now - self._last_line >= self.interval:
+			self._write_progress(now)
+
+	def progress_line(self, now=None):
+		now = time.perf_counter() if now is None else now
+		elapsed = now - self.started
+		done = sum(self.counts.get(event, 0) for event in PAGE_EVENTS)
+		parts = [f'{event}={count}' for event, count in sorted(self.counts.items())]
+		rate = done / elapsed if elapsed > 0 else 0.0
+		parts.append(f'{rate:.1f} pages/s')
+		if self.total:
+			parts.insert(0, f'{done}/{self.total} pages')
+			if rate > 0:
+				parts.append(f'eta {max(self.total - done, 0) / rate:.1f}s')
+		return ' '.join(parts)
+
+	def finish(self):
+		if self._dirty:
+			self._write_progress(time.perf_counter())
+
+	def _write_progress(self, now):
+		self.stream.write(self.progress_line(now) + '\n')
+		self.stream.flush()
+		self._last_line = now
+		self._dirty = False
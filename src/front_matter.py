@@ -0,0 +1,204 @@
+'''
+Front matter: an optional block of "key: value" lines between --- fences at the very top of a page.
+
+	---
+	title: Why Tom Bombadil Was a Mistake
+	date: 2024-03-01
+	tags: [tolkien, essays]
+	---
+
+Only a small part of YAML is understood: scalars (surrounding quotes are stripped), true/false,
+[a, b] lists and "- item" lists. read_metadata gets a page's metadata from the first few KB of
+its source without parsing the markdown, so a whole site's metadata can be gathered without rendering it.
+'''
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from block_util import iter_blocks
+
+
+FENCE = '---'
+METADATA_BYTES = 4096
+
+FRONT_MATTER_PATTERN = re.compile(r'\A---[ \t]*\r?\n(.*?)^---[ \t]*\r?$\n?', re.S | re.M)
+
+
+class MetadataScanError(Exception):
+	'''
+	raised after a scan_metadata in which one or more sources could not be read; failures is a list of
+	(source_path, error message) and metadata what was read from the others
+	'''
+	def __init__(self, failures, metadata=None):
+		self.failures = failures
+		self.metadata = metadata if metadata is not None else {}
+		lines = [f'{len(failures)} page(s) have unreadable metadata:']
+		lines += [f'  {source_path}: {message}' for source_path, message in failures]
+		super().__init__('\n'.join(lines))
+
+
+def split_front_matter(markdown):
+	'''
+	returns (metadata, the markdown after the front matter); ({}, markdown) if it has none
+	'''
+	if not markdown.startswith(FENCE):
+		return {}, markdown
+	match = FRONT_MATTER_PATTERN.match(markdown)
+	if match is None:
+		return {}, markdown
+	return parse_front_matter(match.group(1).splitlines()), markdown[match.end():]
+
+
+def read_front_matter(lines, max_bytes=METADATA_BYTES):
+	'''
+	reads the front matter from the start of an iterator of lines (e.g. an open file), giving up past max_bytes.
+	returns (metadata, the lines read that are not front matter), to be put back in front of the rest
+	'''
+	first = next(lines, '')
+	if first.rstrip('\r\n').rstrip() != FENCE:
+		return {}, [first] if first else []
+	read = [first]
+	size = len(first)
+	for line in lines:
+		read.append(line)
+		size += len(line)
+		if line.rstrip('\r\n').rstrip() == FENCE:
+			return parse_front_matter(line.rstrip('\r\n') for line in read[1:-1]), []
+		if size > max_bytes:
+			break
+	return {}, read
+
+
+def parse_front_matter(lines):
+	'''
+	key -> value for "key: value" lines. raises ValueError for a line that is neither that nor a list item
+	'''
+	metadata = {}
+	key = None
+	for line in lines:
+		stripped = line.strip()
+		if not stripped or stripped.startswith('#'):
+			continue
+		if stripped.startswith('- ') and key is not None and (metadata[key] is None or isinstance(metadata[key], list)):
+			metadata[key] = (metadata[key] or []) + [_scalar(stripped[2:])]
+			continue
+		name, separator, value = stripped.partition(':')
+		if not separator or not name.strip():
+			raise ValueError(f'invalid front matter line: {line!r}')
+		key = name.strip()
+		metadata[key] = _value(value.strip())
+	return metadata
+
+
+def title_text(value):
+	'''
+	a front matter title as text: true/false are turned back into the words, a list raises ValueError.
+	returns None for a missing or empty title
+	'''
+	if isinstance(value, list):
+		raise ValueError(f'front matter title must be a single value, not a list: {value!r}')
+	if isinstance(value, bool):
+		return 'true' if value else 'false'
+	return str(value) if value else None
+
+
+def heading_title(markdown):
+	'''
+	a page's h1 header: the first block (as block_util splits them, so never a line inside a ``` fence)
+	that starts with "# ", read as inline_util.extract_title reads the first line; None if there is none.
+	the build and read_metadata both title pages this way
+	'''
+	return read_heading(markdown.split('\n'), None)[0]
+
+
+def read_heading(lines, max_bytes=METADATA_BYTES):
+	'''
+	heading_title for an iterator of lines (e.g. an open file), reading no further than the heading and giving up
+	past max_bytes characters (None for no limit). each line is looked at once, splitting blocks as iter_blocks does.
+	returns (title or None, the lines read), to be put back in front of the rest
+	'''
+	read = []
+	size = 0
+	in_fence = False
+	in_block = False
+	for line in lines:
+		read.append(line)
+		size += len(line)
+		line = line.rstrip('\n')
+		if line.lstrip().startswith('```'):
+			in_fence = not in_fence
+		if not line and not in_fence:
+			in_block = False
+		elif not in_block and line.strip():
+			# the first line of a block (leading whitespace-only lines are stripped with the block)
+			in_block = True
+			first_line = line.strip()
+			if first_line.split(' ')[0] == '#':
+				return first_line[1:].strip(), read
+		if max_bytes is not None and size > max_bytes:
+			break
+	return None, read
+
+
+def read_metadata(path, max_bytes=METADATA_BYTES):
+	'''
+	a page's front matter plus its "title" (from the front matter, else its first heading, else None),
+	read from at most max_bytes characters of the source
+	'''
+	with open(path, 'r', encoding='utf-8') as f:
+		head = f.read(max_bytes)
+	metadata, markdown = split_front_matter(head)
+	metadata['title'] = title_text(metadata.get('title')) or heading_title(markdown)
+	return metadata
+
+
+def scan_metadata(content_dir, max_bytes=METADATA_BYTES, threads=4):
+	'''
+	source path -> read_metadata for every markdown file under content_dir, in sorted order.
+	the files are read on threads threads, since the scan is all file system latency.
+	a source that cannot be read does not stop the others; MetadataScanError is raised at the end listing every failure
+	'''
+	paths = []
+	for root, dirs, files in os.walk(content_dir):
+		dirs.sort()
+		paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith('.md'))
+
+	def read(path):
+		try:
+			return read_metadata(path, max_bytes), None
+		except (OSError, ValueError) as e:
+			return None, f'{type(e).__name__}: {e}'
+
+	if threads <= 1:
+		results = map(read, paths)
+	else:
+		with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='metadata') as executor:
+			results = list(executor.map(read, paths))
+	metadata = {}
+	failures = []
+	for path, (page_metadata, error) in zip(paths, results):
+		if error is None:
+			metadata[path] = page_metadata
+		else:
+			failures.append((path, error))
+	if failures:
+		raise MetadataScanError(failures, metadata)
+	return metadata
+
+
+def _value(text):
+	if text.startswith('[') and text.endswith(']'):
+		return [_scalar(item) for item in text[1:-1].split(',') if item.strip()]
+	if not text:
+		return None
+	return _scalar(text)
+
+
+def _scalar(text):
+	text = text.strip()
+	if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+		return text[1:-1]
+	if text in ('true', 'false'):
+		return text == 'true'
+	return text
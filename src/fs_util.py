@@ -0,0 +1,142 @@
+'''
+Differential syncing of the static directory into the output directory.
+Unlike main.copy, nothing is wiped: unchanged files are left alone and only files this sync put there are ever deleted.
+'''
+
+import os
+import shutil
+
+from buildlog import logger
+from manifest import hash_file
+
+
+LINK_MODES = ('copy', 'hardlink', 'reflink')
+
+# linux ioctl that asks the filesystem (btrfs, xfs, ...) for a copy-on-write clone
+_FICLONE = 0x40049409
+
+
+def sync(source, destination, manifest, checksum=False, link='copy'):
+	'''
+	makes destination contain an up to date copy of every file in source.
+	a file is copied only when its size or mtime differ from the destination; with checksum,
+	a file whose mtime changed but whose content hash matches the last sync is only re-stamped.
+	link - 'copy', 'hardlink' or 'reflink'. links fall back to copying when the filesystem can't do them.
+	files synced by an earlier run whose source is gone are deleted; anything else in destination
+	(e.g. generated pages) is never touched.
+	returns (copied, unchanged, deleted) counts
+	'''
+	if not os.path.isdir(source):
+		logger.warning('source is not a directory')
+		return (0, 0, 0)
+	if link not in LINK_MODES:
+		raise ValueError(f'invalid link mode: {link}')
+
+	copied = 0
+	unchanged = 0
+	seen = []
+	for root, dirs, files in os.walk(source):
+		dirs.sort()
+		relative_path = os.path.relpath(root, source)
+		destination_root = (
+			os.path.join(destination, relative_path)
+			if relative_path != '.'
+			else destination
+		)
+		for file_name in sorted(files):
+			source_path = os.path.join(root, file_name)
+			destination_path = os.path.join(destination_root, file_name)
+			seen.append(destination_path)
+			source_stat = os.stat(source_path)
+			previous = manifest.assets.get(destination_path)
+			content_hash = previous.get('hash') if previous else None
+
+			if _is_up_to_date(source_stat, destination_path):
+				unchanged += 1
+			elif checksum and _same_content(source_path, source_stat, destination_path, previous):
+				shutil.copystat(source_path, destination_path)
+				unchanged += 1
+			else:
+				os.makedirs(destination_root, exist_ok=True)
+				method = _transfer(source_path, destination_path, link)
+				content_hash = None
+				copied += 1
+				logger.info(f"{method} '{source_path}' to '{destination_path}'", extra={'event': 'copied', 'path': destination_path})
+
+			if checksum and content_hash is None:
+				content_hash = hash_file(source_path)
+			manifest.record_asset(destination_path, source_path, source_stat.st_size, source_stat.st_mtime_ns, content_hash)
+
+	removed = manifest.prune_assets(seen, destination)
+	for removed_path in removed:
+		logger.info(f"Path '{removed_path}' deleted.", extra={'event': 'deleted', 'path': removed_path})
+	return (copied, unchanged, len(removed))
+
+
+def _is_up_to_date(source_stat, destination_path):
+	try:
+		destination_stat = os.stat(destination_path)
+	except FileNotFoundError:
+		return False
+	return (
+		destination_stat.st_size == source_stat.st_size
+		and destination_stat.st_mtime_ns == source_stat.st_mtime_ns
+	)
+
+
+def _same_content(source_path, source_stat, destination_path, previous):
+	# the destination still holds what the last sync wrote, and the source hashes the same as it did then
+	if previous is None or previous.get('hash') is None:
+		return False
+	if previous.get('size') != source_stat.st_size:
+		return False
+	try:
+		destination_stat = os.stat(destination_path)
+	except FileNotFoundError:
+		return False
+	if destination_stat.st_size != source_stat.st_size or destination_stat.st_mtime_ns != previous.get('mtime'):
+		return False
+	return hash_file(source_path) == previous['hash']
+
+
+def _transfer(source_path, destination_path, link):
+	'''
+	puts source_path at destination_path and returns a word describing how, for logging
+	'''
+	if link == 'hardlink' and _try_hardlink(source_path, destination_path):
+		return 'Linked'
+	if link == 'reflink' and _try_reflink(source_path, destination_path):
+		return 'Cloned'
+	shutil.copy2(source_path, destination_path)
+	return 'Copied'
+
+
+def _try_hardlink(source_path, destination_path):
+	destination_dir = os.path.dirname(destination_path) or '.'
+	if os.stat(source_path).st_dev != os.stat(destination_dir).st_dev:
+		return False
+	if os.path.lexists(destination_path):
+		os.remove(destination_path)
+	try:
+		os.link(source_path, destination_path)
+	except OSError:
+		return False
+	return True
+
+
+def _try_reflink(source_path, destination_path):
+	try:
+		import fcntl
+	except ImportError:
+		return False
+	if os.path.lexists(destination_path):
+		os.remove(destination_path)
+	try:
+		with open(source_path, 'rb') as source_file, open(destination_path, 'wb') as destination_file:
+			fcntl.ioctl(destination_file.fileno(), _FICLONE, source_file.fileno())
+	except OSError:
+		if os.path.exists(destination_path):
+			os.remove(destination_path)
+		return False
+	shutil.copystat(source_path, destination_path)
+	return True
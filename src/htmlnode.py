@@ -1,7 +1,10 @@
 class HTMLNode:
     '''
-    Nodes in an HTML document tree
+    Nodes in an HTML document tree.
+    nodes are slotted (no per-instance __dict__): a large page builds hundreds of thousands of them
     '''
+    __slots__ = ('tag', 'value', 'children', 'props')
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         '''
         tag - A string representing the HTML tag name (e.g. "p", "a", "h1", etc.)
@@ -17,26 +20,54 @@ class HTMLNode:
     
     def to_html(self):
         raise NotImplementedError()
-    
+
+    def render_into(self, write):
+        '''
+        streams the html for this node and its descendants to write (e.g. a file's write method)
+        as a series of string chunks. the tree is walked with an explicit stack, so deep documents
+        don't recurse and nothing is concatenated along the way.
+        '''
+        stack = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                write(item)
+                continue
+            opening, children, closing = item._render_parts()
+            write(opening)
+            if children:
+                stack.append(closing)
+                stack.extend(reversed(children))
+            elif closing:
+                write(closing)
+
+    def _render_parts(self):
+        '''
+        returns (opening html, children to render next, closing html).
+        nodes that only implement to_html are rendered whole.
+        '''
+        return self.to_html(), None, ''
+
     def props_to_html(self):
         if self.props is None:
             return ''
-        
-        output = ''
-        for k, v in self.props.items():
-            output += f' {k}=\"{v}\"'
-        return output
+        return ''.join([f' {k}=\"{v}\"' for k, v in self.props.items()])
     
     def __repr__(self):
         return f'HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})'
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         '''
         leaf node cannot have children
         '''
-        super().__init__(tag=tag, value=value, children=None, props=props)
+        # set the slots directly: going through the children property on every construction adds up
+        self.tag = tag
+        self.value = value
+        self.props = props
 
     @property
     def children(self):
@@ -58,8 +89,14 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag=tag, value=None, children=children, props=props)
+        if props not in (None, [], ()):
+            raise AttributeError("ParentNode cannot have props")
+        self.tag = tag
+        self.value = None
+        self.children = children
     
     @property
     def props(self):
@@ -72,12 +109,13 @@ class ParentNode(HTMLNode):
             raise AttributeError("ParentNode cannot have props")
     
     def to_html(self):
+        chunks = []
+        self.render_into(chunks.append)
+        return ''.join(chunks)
+
+    def _render_parts(self):
         if self.tag is None:
             raise ValueError('ParentNode must have a tag')
         if self.children is None or len(self.children) == 0:
             raise ValueError('ParentNode must have a child node')
-        # Recursively render all children and wrap with this node's tag
-        children_html = ''
-        for c in self.children:
-            children_html += c.to_html()
-        return f'<{self.tag}{super().props_to_html()}>{children_html}</{self.tag}>'
+        return f'<{self.tag}{super().props_to_html()}>', self.children, f'</{self.tag}>'
@@ -24,10 +24,49 @@ LINK_PATTERN = re.compile(
     re.VERBOSE,
 )
 
+# the "(url)" of a link or image, left out of search terms
+URL_PART_PATTERN = re.compile(r'\]\([^)]*\)')
 
-def text_node_to_html_node(text_node: TextNode):
+# a search term: two or more letters or digits
+TERM_PATTERN = re.compile(r'[^\W_]{2,}')
+
+# every inline delimiter, longest first so "**" wins over "*" at the same position
+DELIMITER_PATTERN = re.compile(r'`|\*\*|__|\*|_')
+
+# delimiter -> (text type, priority); lower priority numbers were split first by the legacy pipeline
+DELIMITERS = {
+    '`': (TextType.CODE, 0),
+    '**': (TextType.BOLD, 1),
+    '__': (TextType.BOLD, 2),
+    '*': (TextType.ITALIC, 3),
+    '_': (TextType.ITALIC, 4),
+}
+
+# compatibility switch: True routes text_to_textnodes through the original chain of split_nodes_* passes
+USE_LEGACY_INLINE_PARSER = False
+
+
+def is_plain_text(text):
+    '''
+    true when text holds none of the characters that start inline markup ("[", "`", "*", "_";
+    "!" only matters as part of "!["), so it is a single TEXT node as it is.
+    four substring checks are several times faster than one regex search
+    '''
+    return not ('[' in text or '`' in text or '*' in text or '_' in text)
+
+
+def rewrite_url(url, base_path='/'):
+    '''
+    prefixes a root-relative url with the site's base path, e.g. "/images/a.png" -> "/blog/images/a.png"
     '''
-    convert a TextNode to an HTMLNode
+    if base_path == '/' or not url or not url.startswith('/'):
+        return url
+    return base_path + url[1:]
+
+
+def text_node_to_html_node(text_node: TextNode, base_path='/'):
+    '''
+    convert a TextNode to an HTMLNode; root-relative link and image urls are prefixed with base_path
     '''
     if text_node.text_type == TextType.TEXT:
         return LeafNode(None, text_node.text)
@@ -38,9 +77,9 @@ def text_node_to_html_node(text_node: TextNode):
     if text_node.text_type == TextType.CODE:
         return LeafNode('code', text_node.text)
     if text_node.text_type == TextType.LINK:
-        return LeafNode('a', text_node.text, {"href": text_node.url})
+        return LeafNode('a', _link_text_to_html(text_node.text, base_path), {"href": rewrite_url(text_node.url, base_path)})
     if text_node.text_type == TextType.IMAGE:
-        return LeafNode('img', '', {"src": text_node.url, "alt": text_node.text})
+        return LeafNode('img', '', {"src": rewrite_url(text_node.url, base_path), "alt": text_node.text})
     raise ValueError(f'invalid text type: {text_node.text_type}')
 
 
@@ -92,17 +131,41 @@ def extract_markdown_links(text):
 	]
 
 
+def extract_terms(text):
+    '''
+    the set of lowercased words in markdown text, for a search index. link and image urls are left out;
+    markup characters are not part of any word, so "**bold**" gives "bold"
+    '''
+    if '](' in text:
+        text = URL_PART_PATTERN.sub(']', text)
+    # words repeat a lot: only run the pattern over each distinct whitespace separated chunk once
+    return set(TERM_PATTERN.findall(' '.join(set(text.lower().split()))))
+
+
+def extract_markdown_references(text):
+    '''
+    returns ("image" | "link", url) for every image and link in text, in order,
+    matched the same way text_to_textnodes matches them
+    '''
+    if '[' not in text:
+        return []
+    return [
+        ('image' if node.text_type == TextType.IMAGE else 'link', node.url)
+        for _, _, node in _find_images_and_links(text)
+    ]
+
+
 def extract_title(markdown):
 	'''
-	pull the h1 header from the markdown file (the line that starts with a single #) and return it.
+	pull the h1 header from the markdown file (the first line, which must start with a single #) and return it.
 	raise an exception if no h1 header
 	'''
-	markdown = markdown.strip()
-	strings = markdown.split(' ')
+	first_line = markdown.strip().split('\n', 1)[0]
+	strings = first_line.split(' ')
 	if strings[0] != '#':
 		raise ValueError('h1 header not detected')
 
-	extracted_title = markdown[1:]
+	extracted_title = first_line[1:]
 	return extracted_title.strip()
 
 
@@ -140,7 +203,90 @@ def _split_nodes_by_pattern(old_nodes, pattern, new_text_type):
     return new_nodes
 
 
-def text_to_textnodes(text):
+def _link_text_to_html(text, base_path):
+    # emphasis and code inside link text render nested, e.g. [**bold** link](url);
+    # link text that isn't valid inline markdown on its own stays literal
+    if USE_LEGACY_INLINE_PARSER or DELIMITER_PATTERN.search(text) is None:
+        return text
+    try:
+        nodes = text_to_textnodes(text)
+    except ValueError:
+        return text
+    return ''.join([text_node_to_html_node(node, base_path).to_html() for node in nodes])
+
+
+def text_to_textnodes(text, legacy=None):
+    '''
+    splits inline markdown into TextNodes in a single left-to-right scan.
+    produces the same nodes (and the same errors) as the legacy chain of split passes,
+    which is still available with legacy=True or USE_LEGACY_INLINE_PARSER.
+    '''
+    if legacy is None:
+        legacy = USE_LEGACY_INLINE_PARSER
+    if legacy:
+        return _text_to_textnodes_legacy(text)
+    if is_plain_text(text):
+        return [TextNode(text, TextType.TEXT)] if text else []
+    nodes = []
+    last_index = 0
+    if '[' in text:
+        for start, end, node in _find_images_and_links(text):
+            _scan_delimiters(text, last_index, start, nodes)
+            nodes.append(node)
+            last_index = end
+    _scan_delimiters(text, last_index, len(text), nodes)
+    return nodes
+
+
+def _find_images_and_links(text):
+    '''
+    returns (start, end, TextNode) for every image and link, in order.
+    images are matched first and links only in the text between them, as the legacy passes did
+    '''
+    spans = []
+    last_index = 0
+    for match in IMAGE_PATTERN.finditer(text):
+        _find_links(text, last_index, match.start(), spans)
+        spans.append((match.start(), match.end(), TextNode(match.group(1), TextType.IMAGE, match.group(2) or match.group(3))))
+        last_index = match.end()
+    _find_links(text, last_index, len(text), spans)
+    return spans
+
+
+def _find_links(text, start, end, spans):
+    for match in LINK_PATTERN.finditer(text, start, end):
+        spans.append((match.start(), match.end(), TextNode(match.group(1), TextType.LINK, match.group(2) or match.group(3))))
+
+
+def _scan_delimiters(text, start, end, nodes):
+    '''
+    appends the nodes for text[start:end], which contains no images or links.
+    inside an open section, lower priority delimiters are literal text and a higher priority
+    delimiter means the section can't be closed, exactly as the legacy split order behaves
+    '''
+    open_delimiter = None
+    section_start = start
+    for match in DELIMITER_PATTERN.finditer(text, start, end):
+        delimiter = match.group()
+        if open_delimiter is None:
+            if match.start() > section_start:
+                nodes.append(TextNode(text[section_start:match.start()], TextType.TEXT))
+            open_delimiter = delimiter
+            section_start = match.end()
+        elif delimiter == open_delimiter:
+            if match.start() > section_start:
+                nodes.append(TextNode(text[section_start:match.start()], DELIMITERS[delimiter][0]))
+            open_delimiter = None
+            section_start = match.end()
+        elif DELIMITERS[delimiter][1] < DELIMITERS[open_delimiter][1]:
+            raise ValueError('invalid markdown, formatted section not closed')
+    if open_delimiter is not None:
+        raise ValueError('invalid markdown, formatted section not closed')
+    if section_start < end:
+        nodes.append(TextNode(text[section_start:end], TextType.TEXT))
+
+
+def _text_to_textnodes_legacy(text):
     nodes = [TextNode(text, TextType.TEXT)]
     nodes = split_nodes_image(nodes)
     nodes = split_nodes_link(nodes)
@@ -0,0 +1,148 @@
+'''
+The site's link index: every link and image url of every page, collected while the pages are parsed
+and persisted next to the manifest. Broken internal links and unreferenced images are found from
+the index and a listing of the output directory, without reading any generated html.
+'''
+
+import json
+import os
+import posixpath
+import re
+from urllib.parse import unquote
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico')
+
+# "https:", "mailto:", ... and protocol-relative "//host" urls point outside the site
+EXTERNAL_URL_PATTERN = re.compile(r'^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//)')
+
+
+class LinkIndex:
+	def __init__(self, path=None):
+		'''
+		path - where the index is persisted (None keeps it in memory only)
+		pages - source path -> {"output": page path relative to the output directory, "links": [url], "images": [url]}
+		urls are as written in the markdown, before the base path is applied
+		'''
+		self.path = path
+		self.pages = {}
+
+	@classmethod
+	def load(cls, path):
+		'''
+		read an index from disk, starting empty if it is missing or unreadable
+		'''
+		index = cls(path)
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return index
+		if isinstance(data, dict) and isinstance(data.get('pages'), dict):
+			index.pages = data['pages']
+		return index
+
+	def save(self):
+		if self.path is None:
+			return
+		directory = os.path.dirname(self.path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump({'pages': self.pages}, f, indent=1, sort_keys=True)
+		os.replace(tmp_path, self.path)
+
+	def record(self, source_path, output, refs):
+		'''
+		output - the page's path relative to the output directory, e.g. "blog/index.html"
+		refs - [(kind, url)] as collected by block_util.block_links, kind "link" or "image"
+		'''
+		self.pages[source_path] = {
+			'output': output,
+			'links': [url for kind, url in refs if kind == 'link'],
+			'images': [url for kind, url in refs if kind == 'image'],
+		}
+
+	def forget(self, source_path):
+		self.pages.pop(source_path, None)
+
+	def prune(self, seen_sources):
+		'''
+		drops pages whose source was not seen in the latest build
+		'''
+		seen = set(seen_sources)
+		for source_path in [path for path in self.pages if path not in seen]:
+			del self.pages[source_path]
+
+	def references(self):
+		'''
+		target path (relative to the output directory) -> sorted pages linking to it or showing it;
+		external urls are left out
+		'''
+		targets = {}
+		for entry in self.pages.values():
+			for url in entry['links'] + entry['images']:
+				target = resolve_url(url, entry['output'])
+				if target is not None:
+					targets.setdefault(target, set()).add(entry['output'])
+		return {target: sorted(pages) for target, pages in targets.items()}
+
+	def broken_links(self, output_dir):
+		'''
+		[(source path, url)] for every internal link or image that points at nothing in output_dir
+		'''
+		files = list_output(output_dir)
+		broken = []
+		for source_path, entry in sorted(self.pages.items()):
+			for url in entry['links'] + entry['images']:
+				target = resolve_url(url, entry['output'])
+				if target is not None and not _exists(target, files):
+					broken.append((source_path, url))
+		return broken
+
+	def orphaned_images(self, output_dir):
+		'''
+		images in output_dir that no page references (the template's own images are not indexed)
+		'''
+		referenced = set(self.references())
+		return sorted(
+			path for path in list_output(output_dir)
+			if path.lower().endswith(IMAGE_EXTENSIONS) and path not in referenced
+		)
+
+
+def resolve_url(url, page):
+	'''
+	the path, relative to the output directory, that url points at from page ("blog/index.html").
+	"" is the site root ("../" past it stays at the root, as in a browser); None for external urls and same-page anchors
+	'''
+	if not url or EXTERNAL_URL_PATTERN.match(url):
+		return None
+	path = unquote(url.split('#', 1)[0].split('?', 1)[0])
+	if not path:
+		return None
+	if not path.startswith('/'):
+		path = posixpath.join(posixpath.dirname(page), path)
+	return posixpath.normpath('/' + path).lstrip('/')
+
+
+def list_output(output_dir):
+	'''
+	every file under output_dir, as '/'-separated paths relative to it
+	'''
+	files = set()
+	for root, _, names in os.walk(output_dir):
+		relative_root = os.path.relpath(root, output_dir)
+		for name in names:
+			path = name if relative_root == '.' else os.path.join(relative_root, name)
+			files.add(path.replace(os.sep, '/'))
+	return files
+
+
+def _exists(target, files):
+	# a url names a file, a directory served as its index.html, or a page without its .html
+	if target in files:
+		return True
+	index = target.rstrip('/') + '/index.html' if target else 'index.html'
+	return index in files or target + '.html' in files
@@ -1,25 +1,51 @@
+import argparse
+import contextlib
+import gzip
+import itertools
+import json
+import logging
 import os
-import sys
 import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
 
-from block_util import markdown_to_html_node
-from inline_util import extract_title
+from block_util import markdown_to_html_node, render_markdown_into
+from buildlog import LOG_FORMATS, configure_logging, finish_logging, logger
+from front_matter import METADATA_BYTES, MetadataScanError, heading_title, read_front_matter, read_heading, scan_metadata, split_front_matter, title_text
+from fs_util import LINK_MODES
+from assets import asset_dependencies
+from inline_util import rewrite_url
+from manifest import hash_file
+from page_writer import PageWriter, remove_compressed, temp_path, write_file
+from profiling import NULL_PROFILER, BuildProfiler
+from render_cache import DEFAULT_MAX_ENTRIES, RenderCache
+from template import Template, TemplateSet
 
 
 static_path = './static'
 public_path = './docs'
 content_path = './content'
 template_path = './template.html'
+manifest_path = './.build/manifest.json'
+render_cache_path = './.build/render-cache.json'
+links_path = './.build/links.json'
+pages_path = './.build/pages.json'
+search_path = './.build/search.json'
 default_base_path = '/'
 
+# markdown files larger than this (in bytes) are rendered as a stream of blocks
+STREAM_THRESHOLD = 8 * 1024 * 1024
+
 
 def copy(source, destination):
 	'''
 	copies all the contents from a source directory to a destination directory (in our case, static to public)
+	and returns the number of files copied
 	'''
 	if not os.path.isdir(source):
-		print('source is not a directory')
-		return
+		logger.warning('source is not a directory')
+		return 0
 
 	# delete all files in detination
 	if os.path.exists(destination):
@@ -29,8 +55,9 @@ def copy(source, destination):
 				shutil.rmtree(file_path)
 			else:
 				os.remove(file_path)
-			print(f"Path '{file_path}' deleted.")
+			logger.info(f"Path '{file_path}' deleted.", extra={'event': 'deleted', 'path': file_path})
 	# copy all files and subdirectories, nested files...
+	copied = 0
 	for root, _, files in os.walk(source):
 		# figure out where to put the copied items under destination
 		relative_path = os.path.relpath(root, source)
@@ -45,58 +72,488 @@ def copy(source, destination):
 			source_path = os.path.join(root, file_name)
 			destination_path = os.path.join(destination_root, file_name)
 			shutil.copy2(source_path, destination_path)
+			copied += 1
 			# logging the path of each file copied for debugging
-			print(f"Copied '{source_path}' to '{destination_path}'")
-	return
+			logger.info(f"Copied '{source_path}' to '{destination_path}'", extra={'event': 'copied', 'path': destination_path})
+	return copied
+
+
+class PageGenerationError(Exception):
+	'''
+	raised after a build in which one or more pages failed; failures is a list of (source_path, error message)
+	and counts the (built, skipped, removed) page counts generate_pages_recursive would have returned
+	'''
+	def __init__(self, failures, counts=(0, 0, 0)):
+		self.failures = failures
+		self.counts = counts
+		lines = [f'{len(failures)} page(s) failed to generate:']
+		lines += [f'  {source_path}: {message}' for source_path, message in failures]
+		super().__init__('\n'.join(lines))
 
 
 def generate_page(from_path, template_path, dest_path, base_path):
-	print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+	'''
+	renders from_path through the template at template_path into dest_path (see _write_page)
+	'''
+	logger.info(f"Generating page from {from_path} to {dest_path} using {template_path}", extra={'event': 'page_generated', 'path': dest_path})
+	_write_page(from_path, Template.load(template_path, base_path), dest_path)
+
+
+def generate_page_from_template(from_path, template, dest_path, cache=None):
+	'''
+	like generate_page, with an already compiled Template (which carries the base path)
+	'''
+	logger.info(f"Generating page from {from_path} to {dest_path}", extra={'event': 'page_generated', 'path': dest_path})
+	_write_page(from_path, template, dest_path, cache=cache)
+
+
+def _write_page(from_path, template, dest_path, timings=None, cache=None, writer=None, links=None, compress_level=None, terms=None):
+	'''
+	renders one markdown file through an already compiled template (which carries the base path).
+	sources larger than STREAM_THRESHOLD bytes are parsed and written block by block instead of being read whole.
+	smaller pages are joined into one string, so write_file can compare it with the file on disk and leave an
+	unchanged page alone: a page-sized copy is the price of stable mtimes, kept off the largest pages by streaming them
+	timings - optional dict that receives read/parse/render(/write) seconds and bytes read/written
+	cache - optional RenderCache of block html
+	writer - optional PageWriter to hand the rendered page to; without one it is written before returning
+	links - optional list that receives the page's (kind, url) links and images
+	compress_level - also write a .gz sibling at this gzip level, compressed from the rendered page
+	(a writer compresses at its own level)
+	terms - optional set that receives the page's search terms
+	returns the page's metadata: its front matter, and its title (from the front matter, else its h1 header)
+	'''
+	source_size = os.path.getsize(from_path)
+	if source_size > STREAM_THRESHOLD:
+		if timings is not None:
+			started = perf_counter()
+		metadata = _stream_page(from_path, template, dest_path, cache, links, compress_level, terms)
+		if timings is not None:
+			timings['stream'] = perf_counter() - started
+			timings['bytes_read'] = source_size
+			timings['bytes_written'] = os.path.getsize(dest_path)
+		return metadata
+
+	if timings is not None:
+		started = perf_counter()
 	with open(from_path, "r", encoding="utf-8") as source_file:
 		markdown_content = source_file.read()
-	with open(template_path, "r", encoding="utf-8") as template_file:
-		template_content = template_file.read()
+	if timings is not None:
+		read_done = perf_counter()
+
+	metadata, markdown_content = split_front_matter(markdown_content)
+	content_node = markdown_to_html_node(markdown_content, template.base_path, cache, links, terms)
+	title = _page_title(metadata, markdown_content)
+	metadata['title'] = title
+	if timings is not None:
+		parse_done = perf_counter()
+
+	chunks = []
+	template.render_into(chunks.append, Title=title, Content=content_node)
+	html = ''.join(chunks)
+	if timings is not None:
+		render_done = perf_counter()
+
+	if writer is not None:
+		writer.submit(dest_path, html, from_path)
+	else:
+		write_file(dest_path, html, compress_level=compress_level)
+
+	if timings is not None:
+		timings['read'] = read_done - started
+		timings['parse'] = parse_done - read_done
+		timings['render'] = render_done - parse_done
+		if writer is None:
+			timings['write'] = perf_counter() - render_done
+		timings['bytes_read'] = source_size
+		timings['bytes_written'] = len(html.encode('utf-8'))
+	return metadata
+
+
+def _page_title(metadata, markdown):
+	'''
+	the title from the front matter, else the h1 header; raises ValueError if the page has neither
+	'''
+	title = title_text(metadata.get('title')) or heading_title(markdown)
+	if title is None:
+		raise ValueError('h1 header not detected')
+	return title
+
+
+def _stream_page(from_path, template, dest_path, cache=None, links=None, compress_level=None, terms=None):
+	with open(from_path, "r", encoding="utf-8") as source_file:
+		# the title is in the front matter or the page's h1 header (see front_matter.heading_title): read up to the header
+		# if need be, within the first METADATA_BYTES of the page, and put the lines read so far back in front of the rest
+		metadata, head = read_front_matter(source_file)
+		title = title_text(metadata.get('title'))
+		if title is None:
+			title, head = read_heading(itertools.chain(head, source_file))
+			if title is None:
+				raise ValueError(f'h1 header not detected in the first {METADATA_BYTES} characters')
+		metadata['title'] = title
+		lines = itertools.chain(head, source_file)
+		dest_dir = os.path.dirname(dest_path)
+		if dest_dir:
+			os.makedirs(dest_dir, exist_ok=True)
+		# streamed pages are too big to compare with what is on disk, but are still replaced atomically
+		tmp = temp_path(dest_path)
+		gz_tmp = temp_path(dest_path + '.gz') if compress_level is not None else None
+		try:
+			with contextlib.ExitStack() as stack:
+				dest_file = stack.enter_context(open(tmp, "w", encoding="utf-8"))
+				write = dest_file.write
+				if gz_tmp is not None:
+					# the .gz is compressed chunk by chunk alongside, rather than by reading the page back
+					gz_raw = stack.enter_context(open(gz_tmp, 'wb'))
+					gz_file = stack.enter_context(gzip.GzipFile('', 'wb', compress_level, gz_raw, mtime=0))
+
+					def write(chunk):
+						dest_file.write(chunk)
+						gz_file.write(chunk.encode('utf-8'))
+				template.render_into(
+					write,
+					Title=title,
+					Content=lambda write: render_markdown_into(lines, write, template.base_path, cache, links, terms),
+				)
+			os.replace(tmp, dest_path)
+			if gz_tmp is not None:
+				os.replace(gz_tmp, dest_path + '.gz')
+			else:
+				remove_compressed(dest_path)
+		except BaseException:
+			for path in (tmp, gz_tmp):
+				if path is not None and os.path.exists(path):
+					os.remove(path)
+			raise
+	return metadata
+
 
-	html_string = markdown_to_html_node(markdown_content).to_html()
-	title = extract_title(markdown_content)
-	output = template_content.replace("{{ Title }}", title)
-	output = output.replace("{{ Content }}", html_string)
-	output = output.replace('href="/', 'href="' + base_path)
-	output = output.replace('src="/', 'src="' + base_path)
+# in a worker process, its copy of the build's render cache (see _init_page_worker)
+_worker_cache = None
 
-	dest_dir = os.path.dirname(dest_path)
-	if dest_dir:
-		os.makedirs(dest_dir, exist_ok=True)
-	with open(dest_path, "w", encoding="utf-8") as dest_file:
-		dest_file.write(output)
 
+def _init_page_worker(max_entries, entries):
+	global _worker_cache
+	_worker_cache = RenderCache(max_entries, track_added=True)
+	_worker_cache.absorb((0, 0, entries))
 
-def generate_pages_recursive(content_dir, template_path, dest_dir, base_path):
+
+def _generate_page_job(job):
+	'''
+	worker entry point: generates one page and returns (error message or None, timings or None, cache delta or None,
+	links or None, metadata or None, terms or None) instead of raising, so a single bad page cannot take down the rest of the build.
+	cache is a RenderCache, or True in a worker process for its own copy; the cache delta is what that copy
+	learned (RenderCache.drain()), for the build's cache to absorb.
+	writer is the build's PageWriter in the main process, None in workers (which write as they go).
+	with collect_links, links is the page's [(kind, url)] for the link index
+	compress_level is the gzip level for .gz siblings, or None
+	with collect_terms, terms is the page's set of search terms
+	'''
+	from_path, template, dest_path, profile, cache, writer, collect_links, compress_level, collect_terms = job
+	timings = {} if profile else None
+	links = [] if collect_links else None
+	terms = set() if collect_terms else None
+	if cache is True:
+		cache = _worker_cache
+	error = None
+	metadata = None
+	try:
+		metadata = _write_page(from_path, template, dest_path, timings, cache, writer, links, compress_level, terms)
+	except Exception as e:
+		error = f'{type(e).__name__}: {e}'
+	return error, timings, cache.drain() if cache is _worker_cache and cache is not None else None, links, metadata, terms
+
+
+def page_pool(workers, cache=None):
+	'''
+	a process pool for generate_pages_recursive to render pages on, for callers that build more than once.
+	each worker gets its own copy of cache (a RenderCache) as it is now, and keeps what it learns between builds
+	'''
+	if cache is not None:
+		return ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker, initargs=(cache.max_entries, list(cache.entries.items())))
+	return ProcessPoolExecutor(max_workers=workers)
+
+
+def _run_page_jobs(jobs_list, workers, cache=None, executor=None):
+	# results come back in submission order, so the log is the same whatever the worker count
+	if workers <= 1 or len(jobs_list) <= 1:
+		return map(_generate_page_job, jobs_list)
+	chunksize = max(1, min(64, len(jobs_list) // (workers * 4)))
+	# worker processes write their own pages; each gets a copy of the cache once, rather than one pickled into every job
+	jobs_list = [
+		(from_path, template, dest_path, profile, True if cache is not None else None, None, collect_links, compress_level, collect_terms)
+		for from_path, template, dest_path, profile, _, _, collect_links, compress_level, collect_terms in jobs_list
+	]
+	if executor is not None:
+		return list(executor.map(_generate_page_job, jobs_list, chunksize=chunksize))
+	executor = page_pool(workers, cache)
+	try:
+		return list(executor.map(_generate_page_job, jobs_list, chunksize=chunksize))
+	finally:
+		executor.shutdown()
+
+
+def generate_pages_recursive(content_dir, template_path, dest_dir, base_path, manifest=None, *, jobs=1, profiler=NULL_PROFILER, cache=None, write_threads=4, template=None, link_index=None, compress_level=None, page_table=None, search_index=None, explain=False, incremental=True, templates=None, executor=None):
+	'''
+	generates a page for every markdown file under content_dir and returns (built, skipped, removed) page counts.
+	the options after manifest are keyword-only, so that adding one cannot shift the others.
+	with a manifest, every generated page is recorded in it and outputs of deleted sources are removed; with incremental
+	too, pages whose source, template, base path, generator version and referenced assets are unchanged
+	since the last build are skipped.
+	jobs > 1 renders pages on a process pool (executor, from page_pool, if given; one started for this call otherwise).
+	a failing page does not stop the others;
+	PageGenerationError is raised at the end listing every failure.
+	each page uses the nearest template.html in its directory or above it under content_dir, else template_path
+	(see template.TemplateSet); every distinct template is compiled once per build.
+	profiler - a profiling.BuildProfiler to collect stage and per-page timings
+	cache - a render_cache.RenderCache shared by every page (and updated from the workers)
+	write_threads - threads writing pages in the background while the next ones are parsed (0 = write in turn)
+	template - the Template already compiled from template_path with base_path, to save loading it again
+	link_index - a link_index.LinkIndex updated with the links and images of every generated page
+	(pages it does not know yet are generated even when the manifest says they are unchanged)
+	compress_level - also write a .gz of every generated page at this gzip level (1-9); an unchanged page keeps its .gz
+	page_table - a site_index.PageTable updated with the title, date and front matter of every generated page
+	(like link_index, pages it does not know yet are always generated)
+	search_index - a search_index.SearchIndex updated with the search terms of every generated page (likewise)
+	explain - log why each page is generated (see _scan_pages)
+	incremental - skip unchanged pages (without it, a manifest only serves to remove the outputs of deleted sources)
+	templates - the template.TemplateSet to look each page's template up in, when the caller keeps one (template is then ignored)
+	'''
 	if not os.path.isdir(content_dir):
-		print(f"Content directory '{content_dir}' does not exist.")
-		return
-	for root, _, files in os.walk(content_dir):
+		logger.warning(f"Content directory '{content_dir}' does not exist.")
+		return (0, 0, 0)
+	if templates is None:
+		if template is None:
+			with profiler.stage('template'):
+				template = Template.load(template_path, base_path)
+		templates = TemplateSet(content_dir, template_path, base_path, template.assets, template)
+	seen_sources = []
+	pending = []
+	indexes = [index for index in (link_index, page_table, search_index) if index is not None]
+	with profiler.stage('scan'):
+		_scan_pages(content_dir, dest_dir, base_path, manifest, templates, seen_sources, pending, indexes, compress_level, explain, incremental)
+	profiler.count('templates_compiled', len(templates.compiled))
+	skipped = len(seen_sources) - len(pending) if manifest is not None else 0
+	profiler.count('pages_skipped', skipped)
+	logger.info(f"{len(pending)} page(s) to generate, {skipped} unchanged", extra={'event': 'pages_planned', 'count': len(pending)})
+
+	writer = PageWriter(write_threads, compress_level=compress_level)
+	# with fingerprinted assets, a page's links say which assets it depends on
+	collect_links = link_index is not None or templates.assets is not None
+	collect_terms = search_index is not None
+	page_jobs = [
+		(source_path, page_template, destination_path, profiler.enabled, cache, writer, collect_links, compress_level, collect_terms)
+		for source_path, destination_path, _, page_template in pending
+	]
+	failures = []
+	built = 0
+	cache_counts = (cache.hits, cache.misses) if cache is not None else None
+	with profiler.stage('pages'):
+		results = _run_page_jobs(page_jobs, jobs, cache, executor)
+		for (source_path, destination_path, source_hash, page_template), (error, timings, cache_delta, links, metadata, terms) in zip(pending, results):
+			if timings:
+				profiler.add_page(source_path, timings)
+			if cache_delta is not None:
+				cache.absorb(cache_delta)
+			if error is not None:
+				logger.error(f"Failed to generate page from {source_path}: {error}", extra={'event': 'page_failed', 'path': source_path})
+				failures.append((source_path, error))
+				profiler.count('pages_failed')
+				continue
+			logger.info(f"Generating page from {source_path} to {destination_path} using {templates.path_for(os.path.dirname(source_path))}", extra={'event': 'page_generated', 'path': destination_path})
+			profiler.count('pages_built')
+			built += 1
+			if manifest is not None:
+				dependencies = None
+				if templates.assets is not None:
+					urls = page_template.references + [rewrite_url(url, base_path) for _, url in links]
+					dependencies = asset_dependencies(urls, templates.assets)
+				manifest.record(source_path, source_hash, page_template.hash, base_path, destination_path, dependencies, compress_level)
+			output = os.path.relpath(destination_path, dest_dir).replace(os.sep, '/')
+			if link_index is not None:
+				link_index.record(source_path, output, links)
+			title = metadata.pop('title')
+			if page_table is not None:
+				page_table.record(source_path, output, title, os.stat(source_path).st_mtime_ns, metadata)
+			if search_index is not None:
+				search_index.record(source_path, output, title, terms)
+	with profiler.stage('write'):
+		write_failures = writer.close()
+	for source_path, error in write_failures:
+		logger.error(f"Failed to write page from {source_path}: {error}", extra={'event': 'page_failed', 'path': source_path})
+		failures.append((source_path, error))
+		profiler.count('pages_failed')
+		profiler.count('pages_built', -1)
+		built -= 1
+		if manifest is not None:
+			manifest.forget(source_path)
+	for index in indexes:
+		for source_path, _ in failures:
+			index.forget(source_path)
+		index.prune(seen_sources)
+	if cache is not None:
+		profiler.count('render_cache_hits', cache.hits - cache_counts[0])
+		profiler.count('render_cache_misses', cache.misses - cache_counts[1])
+	removed = []
+	if manifest is not None:
+		with profiler.stage('prune'):
+			removed = manifest.prune(seen_sources, dest_dir)
+			for removed_path in removed:
+				logger.info(f"Removed orphaned page {removed_path}", extra={'event': 'page_removed', 'path': removed_path})
+	counts = (built, skipped, len(removed))
+	if failures:
+		raise PageGenerationError(failures, counts)
+	return counts
+
+
+def page_destination(relative_root, file_name, dest_dir):
+	'''
+	where the page for content_dir/relative_root/file_name is written, e.g. ("blog", "a.md") -> dest_dir/blog/a.html
+	'''
+	destination_root = dest_dir if relative_root == "." else os.path.join(dest_dir, relative_root)
+	return os.path.join(destination_root, os.path.splitext(file_name)[0] + ".html")
+
+
+def _scan_pages(content_dir, dest_dir, base_path, manifest, templates, seen_sources, pending, indexes=(), compress_level=None, explain=False, incremental=True):
+	'''
+	walks content_dir in sorted order, appending every markdown source to seen_sources and
+	(source, destination, source hash, its Template from templates) to pending for each page that needs generating.
+	that includes unchanged pages missing from any of indexes (link index, page table, ...),
+	and with compress_level, unchanged pages whose .gz is missing.
+	a page is also generated again when its template, an asset it references or its compression level changed
+	explain - log the reason each page is generated (BuildManifest.stale_reason, or one of the above)
+	incremental - skip pages the manifest says are fresh; without it every page is pending (with its source hash)
+	'''
+	for root, dirs, files in os.walk(content_dir):
+		dirs.sort()
 		relative_root = os.path.relpath(root, content_dir)
-		for file_name in files:
+		for file_name in sorted(files):
 			if not file_name.lower().endswith(".md"):
 				continue
 			source_path = os.path.join(root, file_name)
-			destination_root = dest_dir if relative_root == "." else os.path.join(dest_dir, relative_root)
-			destination_name = os.path.splitext(file_name)[0] + ".html"
-			destination_path = os.path.join(destination_root, destination_name)
-			generate_page(source_path, template_path, destination_path, base_path)
+			destination_path = page_destination(relative_root, file_name, dest_dir)
+			source_hash = None
+			template = templates.for_page(source_path)
+			seen_sources.append(source_path)
+			if manifest is not None:
+				source_hash = hash_file(source_path)
+			if manifest is not None and incremental:
+				reason = manifest.stale_reason(source_path, source_hash, template.hash, base_path, destination_path, templates.assets, compress_level)
+				if reason is None:
+					reason = next((f'not in the {type(index).__name__}' for index in indexes if source_path not in index.pages), None)
+				if reason is None and compress_level is not None and not os.path.isfile(destination_path + '.gz'):
+					reason = '.gz missing'
+				if reason is None:
+					logger.debug(f"Skipping unchanged page {source_path}", extra={'event': 'page_skipped', 'path': source_path})
+					continue
+			else:
+				reason = 'not incremental'
+			if explain:
+				logger.info(f"Generating {source_path}: {reason}", extra={'event': 'page_explained', 'path': source_path})
+			pending.append((source_path, destination_path, source_hash, template))
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(description='Generate the static site.')
+	parser.add_argument('base_path', nargs='?', default=default_base_path, help="prefix for root-relative urls (default '/')")
+	parser.add_argument('--incremental', action='store_true', help='only regenerate pages whose inputs changed since the last build')
+	parser.add_argument('--sync', action='store_true', help='copy only changed static files instead of wiping the output directory (implied by --incremental)')
+	parser.add_argument('--checksum', action='store_true', help='with --sync, compare content hashes of files whose mtime changed')
+	parser.add_argument('--link', choices=LINK_MODES, default='copy', help='with --sync, hardlink or reflink static files when possible')
+	parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes for page generation (0 = one per cpu)')
+	parser.add_argument('--write-threads', type=int, default=4, metavar='N', help='threads writing pages while the next ones are parsed (0 = write each page in turn)')
+	parser.add_argument('--log-format', choices=LOG_FORMATS, default='text', help='text: a line per file; progress: periodic counts, rate and eta; jsonl: buffered json lines')
+	parser.add_argument('--log-file', help='write the log here instead of stdout')
+	parser.add_argument('-q', '--quiet', action='store_true', help='only log warnings and errors')
+	parser.add_argument('-v', '--verbose', action='store_true', help='also log skipped pages and other debug messages')
+	parser.add_argument('--explain', action='store_true', help='log why each page is generated (new page, source changed, template changed, asset ... changed, ...)')
+	parser.add_argument('--profile', metavar='REPORT', help='time each stage and page and write a build report (.json or .csv)')
+	parser.add_argument('--profile-top', type=int, default=10, metavar='N', help='number of slowest pages to list in the report')
+	parser.add_argument('--check-links', action='store_true', help='report links and images that point at nothing in the output (exit status 1) and images no page uses')
+	parser.add_argument('--compress', type=int, nargs='?', const=9, choices=range(1, 10), metavar='LEVEL', help='also write a .gz of every page, at gzip level LEVEL (default 9)')
+	parser.add_argument('--indexes', action='store_true', help='write a listing page for every content directory with pages but no index.md')
+	parser.add_argument('--site-url', metavar='URL', help='absolute url of the site (e.g. https://example.com); writes sitemap.xml and an Atom feed.xml')
+	parser.add_argument('--search', action='store_true', help='write a sharded client-side search index and its loader (search.js) to search/ in the output')
+	parser.add_argument('--metadata-only', metavar='FILE', help="don't build: write every page's front matter and title, read from the start of each source, to FILE as json")
+	parser.add_argument('--fingerprint', action='store_true', help='also publish static files under content-hashed names, precompress text assets (.gz, and .br with the brotli module) and point pages at them')
+	add_render_cache_args(parser)
+	return parser.parse_args(argv)
+
+
+def add_render_cache_args(parser):
+	parser.add_argument('--render-cache', action='store_true', help=f'reuse the html of blocks rendered before, kept in {render_cache_path} between builds')
+	parser.add_argument('--render-cache-size', type=int, default=DEFAULT_MAX_ENTRIES, metavar='N', help='most block fragments the render cache keeps')
+
+
+def main(argv=None):
+	argv = sys.argv[1:] if argv is None else argv
+	if argv[:1] == ['serve']:
+		import server
+		return server.run(argv[1:])
+	args = parse_args(argv)
+	level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+	log_stream = open(args.log_file, 'w', encoding='utf-8') if args.log_file else None
+	configure_logging(args.log_format, level, log_stream)
+	try:
+		if args.metadata_only:
+			_write_metadata(args.metadata_only)
+		else:
+			_build(args)
+	finally:
+		finish_logging()
+		if log_stream is not None:
+			log_stream.close()
+
 
+def _write_metadata(path):
+	started = perf_counter()
+	failures = []
+	try:
+		metadata = scan_metadata(content_path)
+	except MetadataScanError as e:
+		metadata = e.metadata
+		failures = e.failures
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump(metadata, f, indent=1, sort_keys=True)
+	logger.info(f"Read the metadata of {len(metadata)} page(s) in {(perf_counter() - started) * 1000:.0f}ms", extra={'event': 'metadata', 'path': path})
+	for source_path, error in failures:
+		logger.error(f"Failed to read the metadata of {source_path}: {error}", extra={'event': 'page_failed', 'path': source_path})
+	if failures:
+		logger.error(str(MetadataScanError(failures)))
+		sys.exit(1)
 
-def main():
-	base_path = default_base_path
-	if len(sys.argv) > 1:
-		base_path = sys.argv[1]
 
-	print('Copying static files to public directory...')
-	copy(static_path, public_path)
+def _build(args):
+	from site_builder import Site, SiteBuilder
 
-	print('Generating content...')
-	generate_pages_recursive(content_path, template_path, public_path, base_path)
+	profiler = BuildProfiler() if args.profile else NULL_PROFILER
+	cache = RenderCache.load(render_cache_path, args.render_cache_size) if args.render_cache else None
+	site = Site(content_path, template_path, public_path, static_path, args.base_path, manifest_path if args.incremental or args.sync or args.fingerprint else None, links_path, pages_path, search_path)
+	jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+	builder = SiteBuilder(
+		jobs=jobs, write_threads=args.write_threads, incremental=args.incremental, sync=args.sync, checksum=args.checksum,
+		link=args.link, render_cache=cache, check_links=args.check_links, fingerprint=args.fingerprint,
+		compress_level=args.compress, indexes=args.indexes, site_url=args.site_url, search=args.search, explain=args.explain,
+	)
+	try:
+		result = builder.build(site, profiler)
+	finally:
+		builder.close()
+		if cache is not None:
+			cache.save()
+			logger.info(cache.summary())
+		if args.profile:
+			profiler.write_report(args.profile, args.profile_top)
+			logger.info(profiler.summary(args.profile_top))
+	for source_path, url in result.broken_links:
+		logger.warning(f"Broken link in {source_path}: {url}", extra={'event': 'broken_link', 'path': source_path})
+	for image_path in result.orphaned_images:
+		logger.info(f"Image not used by any page: {image_path}", extra={'event': 'orphaned_image', 'path': image_path})
+	if not result.ok:
+		logger.error(str(PageGenerationError(result.failures)))
+		sys.exit(1)
+	if result.broken_links:
+		logger.error(f"{len(result.broken_links)} broken link(s)")
+		sys.exit(1)
 
 
 if __name__ == '__main__':
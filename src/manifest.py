@@ -0,0 +1,214 @@
+'''
+The build manifest remembers, for every generated page, the inputs it was built from
+(source hash, template hash, base path, generator version, and the urls of the fingerprinted assets
+it references) and where the output went. Together these entries are the build's dependency graph:
+incremental builds use them to skip pages none of whose inputs changed, and say which input did otherwise.
+It also remembers which files a static sync put in the output directory, so only those are ever deleted,
+and the content hash and outputs of every fingerprinted asset.
+'''
+
+import hashlib
+import json
+import os
+
+
+# bump whenever a change to the generator can change the html it produces, in the same change
+# (e.g. inline markup inside link text, base-path rewriting of code blocks)
+GENERATOR_VERSION = '5'
+
+
+def hash_bytes(data):
+	return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+	digest = hashlib.sha256()
+	with open(path, 'rb') as f:
+		for chunk in iter(lambda: f.read(1 << 16), b''):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+class BuildManifest:
+	def __init__(self, path=None):
+		'''
+		path - where the manifest is persisted (None keeps it in memory only)
+		pages - source path -> {"source": ..., "template": ..., "base_path": ..., "version": ..., "output": ...,
+		"assets": {url: fingerprinted url or None}, "compress": gzip level of its .gz}
+		assets - synced destination path -> {"source": ..., "size": ..., "mtime": ..., "hash": ...}
+		fingerprints - static source path -> {"size": ..., "mtime": ..., "hash": ..., "outputs": [...]}
+		'''
+		self.path = path
+		self.pages = {}
+		self.assets = {}
+		self.fingerprints = {}
+
+	@classmethod
+	def load(cls, path):
+		'''
+		read a manifest from disk, starting empty if it is missing or unreadable
+		'''
+		manifest = cls(path)
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return manifest
+		if not isinstance(data, dict):
+			return manifest
+		if isinstance(data.get('pages'), dict):
+			manifest.pages = data['pages']
+		if isinstance(data.get('assets'), dict):
+			manifest.assets = data['assets']
+		if isinstance(data.get('fingerprints'), dict):
+			manifest.fingerprints = data['fingerprints']
+		return manifest
+
+	def save(self):
+		if self.path is None:
+			return
+		directory = os.path.dirname(self.path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump({'version': GENERATOR_VERSION, 'pages': self.pages, 'assets': self.assets, 'fingerprints': self.fingerprints}, f, indent=1, sort_keys=True)
+		os.replace(tmp_path, self.path)
+
+	def is_fresh(self, source_path, source_hash, template_hash, base_path, output_path, assets=None, compress_level=None):
+		'''
+		true when the page was last built from exactly these inputs and its output is still on disk
+		'''
+		return self.stale_reason(source_path, source_hash, template_hash, base_path, output_path, assets, compress_level) is None
+
+	def stale_reason(self, source_path, source_hash, template_hash, base_path, output_path, assets=None, compress_level=None):
+		'''
+		why the page needs building again, e.g. "source changed" or "asset /css/site.css changed"; None if it does not.
+		assets - the build's url -> fingerprinted url map, checked against the urls the page was recorded with
+		compress_level - the gzip level of the build's .gz siblings (None for none), checked against the page's
+		'''
+		entry = self.pages.get(source_path)
+		if entry is None:
+			return 'new page'
+		if entry.get('version') != GENERATOR_VERSION:
+			return 'generator version changed'
+		if entry.get('source') != source_hash:
+			return 'source changed'
+		if entry.get('template') != template_hash:
+			return 'template changed'
+		if entry.get('base_path') != base_path:
+			return 'base path changed'
+		assets = assets or {}
+		for url, fingerprinted in sorted(entry.get('assets', {}).items()):
+			if assets.get(url) != fingerprinted:
+				return f'asset {url} changed'
+		if entry.get('compress') != compress_level:
+			return 'compression changed'
+		if entry.get('output') != output_path or not os.path.isfile(output_path):
+			return 'output missing'
+		return None
+
+	def record(self, source_path, source_hash, template_hash, base_path, output_path, assets=None, compress_level=None):
+		'''
+		assets - url -> fingerprinted url (None for a url that is not an asset) for every root-relative url
+		the page references, so that it is built again when any of them changes (see assets.asset_dependencies)
+		compress_level - the gzip level the page's .gz was written at, None if it was written without one
+		'''
+		entry = {
+			'source': source_hash,
+			'template': template_hash,
+			'base_path': base_path,
+			'version': GENERATOR_VERSION,
+			'output': output_path,
+		}
+		if assets:
+			entry['assets'] = assets
+		if compress_level is not None:
+			entry['compress'] = compress_level
+		self.pages[source_path] = entry
+
+	def forget(self, source_path):
+		'''
+		drops a page's entry so that the next incremental build regenerates it
+		'''
+		self.pages.pop(source_path, None)
+
+	def prune(self, seen_sources, output_root):
+		'''
+		forget every page whose source was not seen in this build and delete its output,
+		along with any directories under output_root the deletion left empty.
+		returns the list of output paths that were removed
+		'''
+		removed = []
+		for source_path in sorted(set(self.pages) - set(seen_sources)):
+			output_path = self.pages.pop(source_path).get('output')
+			if output_path and remove_output(output_path, output_root, compressed=True):
+				removed.append(output_path)
+		return removed
+
+	def record_asset(self, dest_path, source_path, size, mtime, content_hash=None):
+		self.assets[dest_path] = {
+			'source': source_path,
+			'size': size,
+			'mtime': mtime,
+			'hash': content_hash,
+		}
+
+	def prune_assets(self, seen_destinations, output_root):
+		'''
+		forget every synced file whose source disappeared and delete it from the output.
+		returns the list of destination paths that were removed
+		'''
+		removed = []
+		for dest_path in sorted(set(self.assets) - set(seen_destinations)):
+			del self.assets[dest_path]
+			if remove_output(dest_path, output_root):
+				removed.append(dest_path)
+		return removed
+
+	def record_fingerprint(self, source_path, size, mtime, content_hash, outputs):
+		self.fingerprints[source_path] = {
+			'size': size,
+			'mtime': mtime,
+			'hash': content_hash,
+			'outputs': outputs,
+		}
+
+	def prune_fingerprints(self, seen_sources, output_root):
+		'''
+		forget every fingerprinted asset whose source disappeared and delete its outputs.
+		returns the list of output paths that were removed
+		'''
+		removed = []
+		for source_path in sorted(set(self.fingerprints) - set(seen_sources)):
+			for output in self.fingerprints.pop(source_path)['outputs']:
+				if remove_output(output, output_root):
+					removed.append(output)
+		return removed
+
+
+def remove_output(path, output_root, compressed=False):
+	'''
+	deletes a generated file and any directories under output_root that it leaves empty.
+	compressed - also delete its .gz sibling (see page_writer.write_file) if there is one
+	returns False if there was no such file
+	'''
+	if not os.path.isfile(path):
+		return False
+	os.remove(path)
+	if compressed and os.path.isfile(path + '.gz'):
+		os.remove(path + '.gz')
+	_remove_empty_dirs(os.path.dirname(path), output_root)
+	return True
+
+
+def _remove_empty_dirs(directory, stop):
+	# walk up from a deleted output, dropping directories the deletion left empty
+	stop = os.path.abspath(stop)
+	while (
+		os.path.abspath(directory).startswith(stop + os.sep)
+		and os.path.isdir(directory)
+		and not os.listdir(directory)
+	):
+		os.rmdir(directory)
+		directory = os.path.dirname(directory)
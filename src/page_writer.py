@@ -0,0 +1,154 @@
+'''
+Writing generated pages. Every page is written atomically (a temp file renamed over the destination),
+and a page whose bytes are already on disk is not rewritten, so mtimes (and rsync of the output) stay stable.
+PageWriter does the writing on a small thread pool, so file system latency overlaps with parsing the next page.
+Pages can also get a precompressed .gz sibling, compressed from the rendered text on the same threads.
+'''
+
+import gzip
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DirectoryCache:
+	'''
+	remembers which directories already exist, so each is created (or checked) once per build
+	'''
+	def __init__(self):
+		self.created = set()
+
+	def ensure(self, directory):
+		if not directory or directory in self.created:
+			return
+		os.makedirs(directory, exist_ok=True)
+		self.created.add(directory)
+
+
+def temp_path(path):
+	# unique per process and thread, in the destination's directory so the rename stays on one file system
+	directory, name = os.path.split(path)
+	return os.path.join(directory, f'.{name}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+
+def write_file(path, text, directories=None, compress_level=None):
+	'''
+	atomically replaces path with text (utf-8), unless the file already holds exactly those bytes.
+	compress_level - also write path.gz at this gzip level (1-9); it is left alone with the page
+	when the page is unchanged and the .gz exists. without it, a .gz left by an earlier write is removed,
+	so it can never be older than the page
+	returns True if the file (or its .gz) was written, False if it was left alone
+	'''
+	data = text.encode('utf-8')
+	gz_path = path + '.gz' if compress_level is not None else None
+	if gz_path is None:
+		remove_compressed(path)
+	try:
+		if os.path.getsize(path) == len(data):
+			with open(path, 'rb') as f:
+				if f.read() == data:
+					if gz_path is None or os.path.isfile(gz_path):
+						return False
+					_replace(gz_path, gzip.compress(data, compresslevel=compress_level, mtime=0))
+					return True
+	except FileNotFoundError:
+		pass
+	if directories is not None:
+		directories.ensure(os.path.dirname(path))
+	else:
+		directory = os.path.dirname(path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+	_replace(path, data)
+	if gz_path is not None:
+		_replace(gz_path, gzip.compress(data, compresslevel=compress_level, mtime=0))
+	return True
+
+
+def remove_compressed(path):
+	'''
+	deletes the .gz sibling of path, if it has one
+	'''
+	try:
+		os.remove(path + '.gz')
+	except FileNotFoundError:
+		pass
+
+
+def _replace(path, data):
+	tmp = temp_path(path)
+	try:
+		with open(tmp, 'wb') as f:
+			f.write(data)
+		os.replace(tmp, path)
+	except BaseException:
+		if os.path.exists(tmp):
+			os.remove(tmp)
+		raise
+
+
+class PageWriter:
+	def __init__(self, threads=4, max_pending=None, compress_level=None):
+		'''
+		threads - writer threads; 0 writes each page synchronously in submit
+		max_pending - pages queued or being written before submit waits for the oldest (bounds memory)
+		compress_level - also write a .gz of every page at this gzip level (see write_file)
+		written, unchanged - counts of finished writes, and of pages skipped because their bytes were on disk
+		'''
+		self.threads = threads
+		self.compress_level = compress_level
+		self.max_pending = max_pending if max_pending is not None else max(threads, 1) * 8
+		self.directories = DirectoryCache()
+		self.written = 0
+		self.unchanged = 0
+		self.failures = []
+		self._pending = deque()
+		self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='page-writer') if threads > 0 else None
+
+	def submit(self, path, text, key=None):
+		'''
+		queues text to be written to path. key (default path) identifies the page in failures
+		'''
+		key = key if key is not None else path
+		if self._executor is None:
+			try:
+				self._count(write_file(path, text, self.directories, self.compress_level))
+			except Exception as e:
+				self.failures.append((key, f'{type(e).__name__}: {e}'))
+			return
+		while len(self._pending) >= self.max_pending:
+			self._finish(*self._pending.popleft())
+		self._pending.append((key, self._executor.submit(write_file, path, text, self.directories, self.compress_level)))
+
+	def wait(self):
+		'''
+		blocks until every queued page is written and returns failures: [(key, error message)]
+		'''
+		while self._pending:
+			self._finish(*self._pending.popleft())
+		return self.failures
+
+	def close(self):
+		failures = self.wait()
+		if self._executor is not None:
+			self._executor.shutdown()
+		return failures
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def _finish(self, key, future):
+		try:
+			self._count(future.result())
+		except Exception as e:
+			self.failures.append((key, f'{type(e).__name__}: {e}'))
+
+	def _count(self, written):
+		if written:
+			self.written += 1
+		else:
+			self.unchanged += 1
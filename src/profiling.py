@@ -0,0 +1,120 @@
+'''
+Opt-in build instrumentation: stage timers, counters, per-page timings and byte counts,
+reported as json or csv at the end of a build.
+NULL_PROFILER has the same interface and does nothing, so an uninstrumented build pays only a no-op call per stage.
+'''
+
+import contextlib
+import csv
+import json
+import time
+
+
+class BuildProfiler:
+	def __init__(self):
+		'''
+		stages - stage name -> [total seconds, times entered]
+		counters - counter name -> value
+		pages - (source path, seconds, bytes read, bytes written, {sub-stage: seconds})
+		'''
+		self.enabled = True
+		self.stages = {}
+		self.counters = {}
+		self.pages = []
+		self._started = time.perf_counter()
+
+	@contextlib.contextmanager
+	def stage(self, name):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add_time(name, time.perf_counter() - start)
+
+	def add_time(self, name, seconds):
+		entry = self.stages.setdefault(name, [0.0, 0])
+		entry[0] += seconds
+		entry[1] += 1
+
+	def count(self, name, amount=1):
+		self.counters[name] = self.counters.get(name, 0) + amount
+
+	def add_page(self, source_path, timings):
+		'''
+		timings - as filled in by page generation: sub-stage seconds plus "bytes_read" and "bytes_written"
+		'''
+		stage_times = {k: v for k, v in timings.items() if not k.startswith('bytes_')}
+		for name, seconds in stage_times.items():
+			self.add_time('page.' + name, seconds)
+		bytes_read = timings.get('bytes_read', 0)
+		bytes_written = timings.get('bytes_written', 0)
+		self.count('bytes_read', bytes_read)
+		self.count('bytes_written', bytes_written)
+		self.pages.append((source_path, sum(stage_times.values()), bytes_read, bytes_written, stage_times))
+
+	def slowest_pages(self, n=10):
+		return sorted(self.pages, key=lambda page: page[1], reverse=True)[:n]
+
+	def report(self, top=10):
+		return {
+			'total_seconds': time.perf_counter() - self._started,
+			'stages': {name: {'seconds': seconds, 'count': count} for name, (seconds, count) in self.stages.items()},
+			'counters': dict(self.counters),
+			'slowest_pages': [
+				{'source': source, 'seconds': seconds, 'bytes_read': bytes_read, 'bytes_written': bytes_written, 'stages': stages}
+				for source, seconds, bytes_read, bytes_written, stages in self.slowest_pages(top)
+			],
+		}
+
+	def write_report(self, path, top=10):
+		'''
+		writes the report as csv when path ends in .csv, json otherwise.
+		the csv lists every stage, counter and page, one per row
+		'''
+		if path.lower().endswith('.csv'):
+			with open(path, 'w', encoding='utf-8', newline='') as f:
+				writer = csv.writer(f)
+				writer.writerow(['kind', 'name', 'seconds', 'count', 'bytes_read', 'bytes_written'])
+				for name, (seconds, count) in self.stages.items():
+					writer.writerow(['stage', name, f'{seconds:.6f}', count, '', ''])
+				for name, value in self.counters.items():
+					writer.writerow(['counter', name, '', value, '', ''])
+				for source, seconds, bytes_read, bytes_written, _ in self.pages:
+					writer.writerow(['page', source, f'{seconds:.6f}', 1, bytes_read, bytes_written])
+			return
+		with open(path, 'w', encoding='utf-8') as f:
+			json.dump(self.report(top), f, indent=2)
+
+	def summary(self, top=10):
+		report = self.report(top)
+		lines = [f"build took {report['total_seconds']:.3f}s"]
+		for name, stage in report['stages'].items():
+			lines.append(f"  {name:<20}{stage['seconds']:>10.3f}s  x{stage['count']}")
+		for name, value in report['counters'].items():
+			lines.append(f'  {name:<20}{value:>10}')
+		if report['slowest_pages']:
+			lines.append(f'slowest {len(report["slowest_pages"])} pages:')
+			for page in report['slowest_pages']:
+				lines.append(f"  {page['seconds'] * 1000:>8.1f}ms  {page['source']}")
+		return '\n'.join(lines)
+
+
+class NullProfiler:
+	enabled = False
+
+	def stage(self, name):
+		return _NULL_CONTEXT
+
+	def add_time(self, name, seconds):
+		pass
+
+	def count(self, name, amount=1):
+		pass
+
+	def add_page(self, source_path, timings):
+		pass
+
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,119 @@
+'''
+Content-addressed cache of rendered html fragments. A block is keyed by a hash of its markdown text
+and the base path, so boilerplate that many pages share (disclaimers, footers, repeated code samples)
+is parsed and rendered once, and with a persisted cache, unchanged blocks of an edited page are not re-rendered.
+'''
+
+import json
+import os
+from collections import OrderedDict
+
+from htmlnode import LeafNode
+from manifest import GENERATOR_VERSION, hash_bytes
+
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class RenderCache:
+	def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, path=None, track_added=False):
+		'''
+		max_entries - least recently used fragments are evicted beyond this many
+		path - where the cache is persisted (None keeps it in memory only)
+		track_added - remember the keys put since the last drain(), for a page worker's copy of the cache
+		entries - key -> html, least recently used first
+		'''
+		self.max_entries = max_entries
+		self.path = path
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.track_added = track_added
+		self._added = []
+
+	@classmethod
+	def load(cls, path, max_entries=DEFAULT_MAX_ENTRIES):
+		'''
+		read a cache from disk, starting empty if it is missing, unreadable or from another generator version
+		'''
+		cache = cls(max_entries, path)
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return cache
+		if not isinstance(data, dict) or data.get('version') != GENERATOR_VERSION:
+			return cache
+		for key, html in data.get('entries', [])[-max_entries:]:
+			cache.entries[key] = html
+		return cache
+
+	def save(self):
+		if self.path is None:
+			return
+		directory = os.path.dirname(self.path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump({'version': GENERATOR_VERSION, 'entries': list(self.entries.items())}, f)
+		os.replace(tmp_path, self.path)
+
+	@staticmethod
+	def key(text, base_path):
+		return hash_bytes(f'{base_path}\0{text}'.encode('utf-8'))
+
+	def get(self, key):
+		html = self.entries.get(key)
+		if html is None:
+			self.misses += 1
+			return None
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return html
+
+	def put(self, key, html):
+		self.entries[key] = html
+		self.entries.move_to_end(key)
+		if self.track_added:
+			self._added.append(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+
+	def render(self, text, base_path, build):
+		'''
+		returns a raw html node for build(text, base_path), building and storing it only on a miss
+		'''
+		key = self.key(text, base_path)
+		html = self.get(key)
+		if html is None:
+			html = build(text, base_path).to_html()
+			self.put(key, html)
+		return LeafNode(None, html)
+
+	def drain(self):
+		'''
+		returns (hits, misses, [(key, html) added]) since the last drain and resets them (added is only
+		tracked with track_added). page workers send this back so the build's cache can absorb what each process learned
+		'''
+		added = [(key, self.entries[key]) for key in self._added if key in self.entries]
+		delta = (self.hits, self.misses, added)
+		self.hits = 0
+		self.misses = 0
+		self._added = []
+		return delta
+
+	def absorb(self, delta):
+		hits, misses, added = delta
+		self.hits += hits
+		self.misses += misses
+		for key, html in added:
+			self.entries[key] = html
+			self.entries.move_to_end(key)
+		while len(self.entries) > self.max_entries:
+			self.entries.popitem(last=False)
+
+	def summary(self):
+		lookups = self.hits + self.misses
+		rate = self.hits / lookups * 100 if lookups else 0.0
+		return f'Render cache: {self.hits} hit(s), {self.misses} miss(es) ({rate:.0f}% hit rate), {len(self.entries)} fragment(s)'
@@ -0,0 +1,204 @@
+'''
+Client-side search. The search terms of every page are collected while it is parsed and kept in a
+per-page table persisted next to the manifest, so an incremental build only tokenizes the pages it
+regenerates. After the build the table is inverted into a sharded index under output_dir/search/:
+
+	index.json        {"pages": "pages.json", "shards": {prefix: file}}
+	pages.json        [[url, title]] - a page id is its position here
+	<prefix hex>.json {term: [page id deltas]} - every term that starts with prefix
+
+Shards are split by longer and longer term prefixes until each is at most max_shard_bytes, so
+a browser looking up a word fetches index.json, pages.json and the one shard whose prefix is the
+longest one the word starts with. search.js does that (and prefix matches the last word typed).
+'''
+
+import json
+import os
+
+from inline_util import extract_terms
+from manifest import remove_output
+from page_writer import write_file
+from site_index import page_url
+
+
+SEARCH_DIR = 'search'
+MAX_SHARD_BYTES = 32 * 1024
+
+LOADER_JS = '''\
+// search(baseUrl, query) -> [{url, title}] of the pages containing every word of query
+// (the last word also matches as a prefix), e.g. search("/search/", "tom bomb")
+const ssgSearch = (() => {
+	const cache = {};
+	const get = (url) => cache[url] || (cache[url] = fetch(url).then((response) => response.json()));
+	const terms = (text) => text.toLowerCase().match(/[\\p{L}\\p{N}]{2,}/gu) || [];
+
+	async function postings(baseUrl, index, term, prefix) {
+		// a term is in the shard with the longest prefix of it; words it starts are also in shards under it
+		const keys = Object.keys(index.shards);
+		const own = keys.filter((key) => term.startsWith(key)).reduce((a, b) => (a === null || b.length > a.length ? b : a), null);
+		const ids = new Set();
+		for (const key of keys) {
+			if (key !== own && !(prefix && key.startsWith(term))) continue;
+			const shard = await get(baseUrl + index.shards[key]);
+			for (const [word, deltas] of Object.entries(shard)) {
+				if (word !== term && !(prefix && word.startsWith(term))) continue;
+				let id = 0;
+				for (const delta of deltas) ids.add(id += delta);
+			}
+		}
+		return ids;
+	}
+
+	return async function search(baseUrl, query) {
+		const index = await get(baseUrl + 'index.json');
+		const words = terms(query);
+		if (!words.length) return [];
+		let found = null;
+		for (let i = 0; i < words.length; i++) {
+			const ids = await postings(baseUrl, index, words[i], i === words.length - 1);
+			found = found === null ? ids : new Set([...found].filter((id) => ids.has(id)));
+		}
+		const pages = await get(baseUrl + index.pages);
+		return [...found].sort((a, b) => a - b).map((id) => ({url: pages[id][0], title: pages[id][1]}));
+	};
+})();
+'''
+
+
+class SearchIndex:
+	def __init__(self, path=None):
+		'''
+		path - where the per-page terms are persisted (None keeps them in memory only)
+		pages - source path -> {"output": page path relative to the output directory, "title": ..., "terms": [term]}
+		files - the files the last write_search_index wrote, relative to the search directory
+		'''
+		self.path = path
+		self.pages = {}
+		self.files = []
+
+	@classmethod
+	def load(cls, path):
+		'''
+		read an index from disk, starting empty if it is missing or unreadable
+		'''
+		index = cls(path)
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return index
+		if isinstance(data, dict) and isinstance(data.get('pages'), dict):
+			index.pages = data['pages']
+			index.files = data.get('files', [])
+		return index
+
+	def save(self):
+		if self.path is None:
+			return
+		directory = os.path.dirname(self.path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump({'pages': self.pages, 'files': self.files}, f, sort_keys=True)
+		os.replace(tmp_path, self.path)
+
+	def record(self, source_path, output, title, terms):
+		'''
+		terms - the page's terms, as block_util collects them; the title's are added here
+		'''
+		self.pages[source_path] = {'output': output, 'title': title, 'terms': sorted(set(terms).union(extract_terms(title)))}
+
+	def forget(self, source_path):
+		self.pages.pop(source_path, None)
+
+	def prune(self, seen_sources):
+		'''
+		drops pages whose source was not seen in the latest build
+		'''
+		seen = set(seen_sources)
+		for source_path in [path for path in self.pages if path not in seen]:
+			del self.pages[source_path]
+
+	def invert(self, base_path='/'):
+		'''
+		([[url, title]] ordered by url, term -> sorted page ids)
+		'''
+		entries = sorted((page_url(entry['output'], base_path), entry['title'], entry['terms']) for entry in self.pages.values())
+		postings = {}
+		for page_id, (_, _, terms) in enumerate(entries):
+			for term in terms:
+				postings.setdefault(term, []).append(page_id)
+		return [[url, title] for url, title, _ in entries], postings
+
+
+def shard_postings(postings, max_shard_bytes=MAX_SHARD_BYTES):
+	'''
+	prefix -> {term: page id deltas} for every term, with prefixes as long as it takes to keep each
+	shard within max_shard_bytes of json (a shard holding a single term can be larger)
+	'''
+	encoded = {term: _deltas(ids) for term, ids in postings.items()}
+	shards = {}
+	pending = [(1, sorted(encoded))]
+	while pending:
+		length, terms = pending.pop()
+		groups = {}
+		for term in terms:
+			groups.setdefault(term[:length], []).append(term)
+		for prefix, group in groups.items():
+			shard = {term: encoded[term] for term in group}
+			# terms no longer than the prefix cannot be split further
+			splittable = any(len(term) > length for term in group)
+			if splittable and len(group) > 1 and len(_dump(shard)) > max_shard_bytes:
+				pending.append((length + 1, group))
+			else:
+				shards[prefix] = shard
+	return shards
+
+
+def write_search_index(index, output_dir, base_path='/', max_shard_bytes=MAX_SHARD_BYTES, compress_level=None):
+	'''
+	writes index.json, pages.json, the shards and search.js under output_dir/search/ and removes shards
+	the last write made that are gone. returns the number of files written (unchanged files are left alone)
+	'''
+	search_dir = os.path.join(output_dir, SEARCH_DIR)
+	pages, postings = index.invert(base_path)
+	shards = shard_postings(postings, max_shard_bytes)
+	files = {'pages.json': _dump(pages), 'search.js': LOADER_JS}
+	shard_files = {}
+	for prefix, shard in sorted(shards.items()):
+		name = prefix.encode('utf-8').hex() + '.json'
+		shard_files[prefix] = name
+		files[name] = _dump(shard)
+	files['index.json'] = _dump({'pages': 'pages.json', 'shards': shard_files})
+
+	written = 0
+	for name, text in files.items():
+		written += write_file(os.path.join(search_dir, name), text, compress_level=compress_level)
+	for name in set(index.files) - set(files):
+		remove_output(os.path.join(search_dir, name), output_dir, compressed=True)
+	index.files = sorted(files)
+	return written
+
+
+def remove_search_index(index, output_dir):
+	'''
+	removes the files the last write_search_index of index wrote under output_dir/search/, with their .gz
+	'''
+	search_dir = os.path.join(output_dir, SEARCH_DIR)
+	for name in index.files:
+		remove_output(os.path.join(search_dir, name), output_dir, compressed=True)
+	index.files = []
+
+
+def _deltas(ids):
+	previous = 0
+	deltas = []
+	for page_id in ids:
+		deltas.append(page_id - previous)
+		previous = page_id
+	return deltas
+
+
+def _dump(data):
+	return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
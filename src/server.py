@@ -0,0 +1,209 @@
+'''
+Development server: builds the site once, serves the output directory over http and, with --watch,
+polls content/, static/ and the templates (with the layouts they extend) for changes and regenerates only what they affect.
+The parser, the compiled templates and the manifest stay in memory between rebuilds.
+
+	python3 src/main.py serve --watch --port 8888
+'''
+
+import argparse
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+from buildlog import configure_logging, finish_logging, logger
+from fs_util import sync
+from manifest import BuildManifest, hash_file
+from render_cache import RenderCache
+from template import TEMPLATE_NAME, TemplateSet
+
+
+class SiteWatcher:
+	def __init__(self, content_dir, static_dir, template_path, public_dir, base_path='/', manifest=None, cache=None):
+		self.content_dir = content_dir
+		self.static_dir = static_dir
+		self.template_path = template_path
+		self.public_dir = public_dir
+		self.base_path = base_path
+		self.manifest = manifest if manifest is not None else BuildManifest()
+		self.cache = cache
+		self.templates = None
+		self.snapshot = {}
+
+	def build(self):
+		'''
+		brings the whole output up to date (incrementally) and takes the first snapshot
+		'''
+		self.templates = TemplateSet(self.content_dir, self.template_path, self.base_path)
+		sync(self.static_dir, self.public_dir, self.manifest)
+		main.generate_pages_recursive(self.content_dir, self.template_path, self.public_dir, self.base_path, self.manifest, cache=self.cache, templates=self.templates)
+		self.snapshot = self.take_snapshot()
+
+	def take_snapshot(self):
+		'''
+		path -> (mtime, size) for every watched file
+		'''
+		snapshot = {}
+		for directory in (self.content_dir, self.static_dir):
+			_stat_tree(directory, snapshot)
+		for path in self.template_paths():
+			_stat_file(path, snapshot)
+		return snapshot
+
+	def template_paths(self):
+		'''
+		the site template and every template and layout the pages built so far use
+		'''
+		paths = {self.template_path}
+		if self.templates is not None:
+			for chain in self.templates.chains.values():
+				paths.update(chain)
+		return paths
+
+	def poll(self):
+		'''
+		returns the set of watched paths added, changed or removed since the last poll
+		'''
+		current = self.take_snapshot()
+		changed = {path for path in current.keys() | self.snapshot.keys() if current.get(path) != self.snapshot.get(path)}
+		self.snapshot = current
+		return changed
+
+	def rebuild(self, changed):
+		'''
+		regenerates the outputs affected by the changed paths and returns how many pages were written
+		'''
+		if not changed:
+			return 0
+		template_paths = self.template_paths()
+		if any(path in template_paths or os.path.basename(path) == TEMPLATE_NAME for path in changed):
+			# a template change can affect any number of pages: let the manifest work out the rebuild
+			self.templates = TemplateSet(self.content_dir, self.template_path, self.base_path)
+			main.generate_pages_recursive(self.content_dir, self.template_path, self.public_dir, self.base_path, self.manifest, cache=self.cache, templates=self.templates)
+			changed = {path for path in changed if not _is_under(path, self.content_dir)}
+		if any(_is_under(path, self.static_dir) for path in changed):
+			sync(self.static_dir, self.public_dir, self.manifest)
+
+		built = 0
+		removed = False
+		for source_path in sorted(changed):
+			if not _is_under(source_path, self.content_dir) or not source_path.lower().endswith('.md'):
+				continue
+			if not os.path.exists(source_path):
+				removed = True
+				continue
+			relative_root = os.path.relpath(os.path.dirname(source_path), self.content_dir)
+			destination_path = main.page_destination(relative_root, os.path.basename(source_path), self.public_dir)
+			try:
+				template = self.templates.for_page(source_path)
+				main.generate_page_from_template(source_path, template, destination_path, self.cache)
+			except Exception as e:
+				logger.error(f"Failed to generate page from {source_path}: {type(e).__name__}: {e}", extra={'event': 'page_failed', 'path': source_path})
+				continue
+			self.manifest.record(source_path, hash_file(source_path), template.hash, self.base_path, destination_path)
+			built += 1
+		if removed:
+			existing = [path for path in self.manifest.pages if os.path.exists(path)]
+			for removed_path in self.manifest.prune(existing, self.public_dir):
+				logger.info(f"Removed orphaned page {removed_path}", extra={'event': 'page_removed', 'path': removed_path})
+		# start watching layouts the rebuilt pages use for the first time
+		for path in self.template_paths() - self.snapshot.keys():
+			_stat_file(path, self.snapshot)
+		return built
+
+	def watch(self, interval=0.1, stop=None):
+		'''
+		polls every interval seconds until stop (a threading.Event) is set
+		'''
+		while stop is None or not stop.is_set():
+			changed = self.poll()
+			if changed:
+				started = time.perf_counter()
+				built = self.rebuild(changed)
+				self.manifest.save()
+				logger.info(f"Rebuilt {built} page(s) in {(time.perf_counter() - started) * 1000:.0f}ms")
+			time.sleep(interval)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+	def log_message(self, format, *args):
+		logger.debug(format % args)
+
+
+def make_server(directory, host='127.0.0.1', port=8888):
+	handler = functools.partial(_QuietHandler, directory=directory)
+	return ThreadingHTTPServer((host, port), handler)
+
+
+def _stat_tree(directory, snapshot):
+	stack = [directory]
+	while stack:
+		try:
+			entries = list(os.scandir(stack.pop()))
+		except FileNotFoundError:
+			continue
+		for entry in entries:
+			if entry.is_dir(follow_symlinks=False):
+				stack.append(entry.path)
+			else:
+				stat = entry.stat()
+				snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def _stat_file(path, snapshot):
+	try:
+		stat = os.stat(path)
+	except FileNotFoundError:
+		return
+	snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def _is_under(path, directory):
+	return os.path.abspath(path).startswith(os.path.abspath(directory) + os.sep)
+
+
+def serve(args):
+	manifest = BuildManifest.load(main.manifest_path)
+	cache = RenderCache.load(main.render_cache_path, args.render_cache_size) if args.render_cache else None
+	watcher = SiteWatcher(main.content_path, main.static_path, main.template_path, main.public_path, args.base_path, manifest, cache)
+	watcher.build()
+	manifest.save()
+
+	server = make_server(main.public_path, args.host, args.port)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	logger.info(f"Serving {main.public_path} at http://{args.host}:{server.server_address[1]}/")
+	try:
+		if args.watch:
+			watcher.watch(args.interval)
+		else:
+			threading.Event().wait()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.shutdown()
+		manifest.save()
+		if cache is not None:
+			cache.save()
+
+
+def parse_args(argv=None):
+	parser = argparse.ArgumentParser(prog='main.py serve', description='Build the site and serve it locally.')
+	parser.add_argument('base_path', nargs='?', default=main.default_base_path)
+	parser.add_argument('--watch', action='store_true', help='rebuild affected pages when content, static files or the template change')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8888)
+	parser.add_argument('--interval', type=float, default=0.1, help='seconds between polls for changes')
+	main.add_render_cache_args(parser)
+	return parser.parse_args(argv)
+
+
+def run(argv=None):
+	args = parse_args(argv)
+	configure_logging()
+	try:
+		serve(args)
+	finally:
+		finish_logging()
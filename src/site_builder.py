@@ -0,0 +1,325 @@
+'''
+Building sites from python, without the command line's globals. A SiteBuilder is created once and
+asked to build any number of Sites, any number of times; compiled templates, manifests, the
+render cache and the worker processes stay in memory between builds, and every build returns a BuildResult
+instead of printing. close() (or leaving a with block) stops the workers.
+
+	with SiteBuilder(jobs=4) as builder:
+		result = builder.build(Site('content', 'template.html', 'public', static_dir='static'))
+		if not result.ok:
+			...
+'''
+
+import os
+import time
+
+from assets import fingerprint_assets
+from buildlog import logger
+from fs_util import LINK_MODES, sync
+from link_index import LinkIndex
+from main import PageGenerationError, copy, generate_pages_recursive, page_pool
+from manifest import BuildManifest
+from profiling import NULL_PROFILER
+from search_index import SearchIndex, remove_search_index, write_search_index
+from site_index import PageTable, write_indexes
+from template import Template, TemplateSet
+
+
+class Site:
+	def __init__(self, content_dir, template_path, output_dir, static_dir=None, base_path='/', manifest_path=None, links_path=None, pages_path=None, search_path=None):
+		'''
+		content_dir - markdown sources
+		template_path - the page template
+		output_dir - where pages (and static files) are written
+		static_dir - copied into output_dir as is (None for no static files)
+		base_path - prefix for root-relative urls
+		manifest_path - where the build manifest is persisted (None keeps it in the builder's memory only)
+		links_path - where the link index is persisted (None keeps it in the builder's memory only)
+		pages_path - where the page table is persisted (None keeps it in the builder's memory only)
+		search_path - where the search terms of every page are persisted (None keeps them in the builder's memory only)
+		'''
+		self.content_dir = content_dir
+		self.template_path = template_path
+		self.output_dir = output_dir
+		self.static_dir = static_dir
+		self.base_path = base_path
+		self.manifest_path = manifest_path
+		self.links_path = links_path
+		self.pages_path = pages_path
+		self.search_path = search_path
+
+	def __repr__(self):
+		return f'Site({self.content_dir}, {self.template_path}, {self.output_dir}, {self.base_path})'
+
+
+class BuildResult:
+	def __init__(self, site):
+		'''
+		pages_built, pages_skipped, pages_removed - page counts (skipped: unchanged since the last build)
+		static_copied, static_unchanged, static_deleted - static file counts
+		assets - url -> fingerprinted url of every static file (with fingerprint)
+		assets_built - static files fingerprinted (and compressed) by this build
+		failures - [(source path, error message)] for every page that failed
+		broken_links - [(source path, url)] for internal links and images that point at nothing (with check_links)
+		orphaned_images - images in the output that no page uses (with check_links)
+		indexes_written - listing pages, sitemap.xml and feed.xml written (files whose bytes did not change are not counted)
+		search_written - search index files written (likewise)
+		seconds - wall time of the build
+		'''
+		self.site = site
+		self.pages_built = 0
+		self.pages_skipped = 0
+		self.pages_removed = 0
+		self.static_copied = 0
+		self.static_unchanged = 0
+		self.static_deleted = 0
+		self.assets = {}
+		self.assets_built = 0
+		self.failures = []
+		self.broken_links = []
+		self.orphaned_images = []
+		self.indexes_written = 0
+		self.search_written = 0
+		self.seconds = 0.0
+
+	@property
+	def ok(self):
+		return not self.failures
+
+	def __repr__(self):
+		return (
+			f'BuildResult(built={self.pages_built}, skipped={self.pages_skipped}, removed={self.pages_removed}, '
+			f'failed={len(self.failures)}, seconds={self.seconds:.3f})'
+		)
+
+
+class SiteBuilder:
+	def __init__(self, jobs=1, write_threads=4, incremental=True, sync=True, checksum=False, link='copy', render_cache=None, check_links=False, fingerprint=False, compress_level=None, indexes=False, site_url=None, search=False, explain=False):
+		'''
+		jobs - worker processes for page generation, started on the first build that needs them and kept until close()
+		write_threads - threads writing pages while the next ones are parsed
+		incremental - skip pages whose inputs did not change since the last build of the same site
+		sync - copy only changed static files and remove the pages of deleted sources; otherwise the output directory is wiped first
+		checksum, link - as for fs_util.sync
+		render_cache - a render_cache.RenderCache shared by every build (its keys include the base path)
+		check_links - after each build, check the site's link index for broken links and unused images
+		fingerprint - also publish static files under content-hashed names, with .gz/.br siblings for text
+		assets, and point pages at them (see assets.fingerprint_assets)
+		compress_level - also write a .gz of every page at this gzip level (1-9)
+		indexes - write a listing page for every content directory with pages but no index page of its own
+		site_url - the site's absolute url (e.g. "https://example.com"); sitemap.xml and an Atom feed.xml are written with it
+		search - collect every page's search terms and write a sharded search index (see search_index)
+		explain - log why each page is generated, e.g. "asset /css/site.css changed"
+		'''
+		if link not in LINK_MODES:
+			raise ValueError(f'invalid link mode: {link}')
+		self.jobs = jobs
+		self.write_threads = write_threads
+		self.incremental = incremental
+		self.sync = sync or incremental
+		self.checksum = checksum
+		self.link = link
+		self.render_cache = render_cache
+		self.check_links = check_links
+		self.fingerprint = fingerprint
+		self.compress_level = compress_level
+		self.indexes = indexes
+		self.site_url = site_url
+		self.search = search
+		self.explain = explain
+		# (template path, base path) -> ((mtime, size) of each file of the template's chain, assets, Template)
+		self.templates = {}
+		# manifest path, or output directory for in-memory manifests -> BuildManifest
+		self.manifests = {}
+		# links path, or output directory for in-memory indexes -> LinkIndex
+		self.link_indexes = {}
+		# pages path, or output directory for in-memory tables -> PageTable
+		self.page_tables = {}
+		# search path, or output directory for in-memory indexes -> SearchIndex
+		self.search_indexes = {}
+		# the worker processes, while jobs > 1
+		self.executor = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def close(self):
+		'''
+		stops the worker processes; a later build starts them again
+		'''
+		if self.executor is not None:
+			self.executor.shutdown()
+			self.executor = None
+
+	def build(self, site, profiler=NULL_PROFILER):
+		'''
+		builds site and returns a BuildResult. failing pages are listed in the result rather than raised;
+		other errors (e.g. a missing template) propagate
+		'''
+		started = time.perf_counter()
+		result = BuildResult(site)
+		manifest = self.manifest(site) if self.sync else None
+		assets = None
+		# indexes are only kept for the features that read them; one that stops being kept up to date
+		# would be stale when its feature is turned back on, so it is dropped and rebuilt from scratch then
+		link_index = self.link_index(site) if self.check_links else None
+		if link_index is None:
+			self._forget_index(self.link_indexes, site.links_path, site)
+		page_table = self.page_table(site) if self.indexes or self.site_url is not None else None
+		if page_table is None:
+			self._forget_index(self.page_tables, site.pages_path, site)
+		search_index = self.search_index(site) if self.search else None
+		if search_index is None:
+			self._forget_search_index(site)
+
+		if site.static_dir is not None:
+			logger.info('Copying static files to public directory...')
+			with profiler.stage('copy'):
+				if manifest is not None:
+					result.static_copied, result.static_unchanged, result.static_deleted = sync(
+						site.static_dir, site.output_dir, manifest, checksum=self.checksum, link=self.link
+					)
+				else:
+					result.static_copied = copy(site.static_dir, site.output_dir)
+			if self.fingerprint:
+				# fingerprints are kept in the site's manifest even without sync; after a
+				# copy() wiped the output directory they are simply written again
+				asset_manifest = self.manifest(site)
+				with profiler.stage('assets'):
+					assets, result.assets_built, _, _ = fingerprint_assets(
+						site.static_dir, site.output_dir, asset_manifest, site.base_path, self.write_threads
+					)
+				result.assets = assets
+				if manifest is None:
+					asset_manifest.save()
+
+		logger.info('Generating content...')
+		with profiler.stage('template'):
+			template = self.template(site.template_path, site.base_path, assets)
+			# section templates are compiled once per build, and used by both pages and listings
+			templates = TemplateSet(site.content_dir, site.template_path, site.base_path, assets, template)
+		if self.jobs > 1 and self.executor is None:
+			self.executor = page_pool(self.jobs, self.render_cache)
+		try:
+			counts = generate_pages_recursive(
+				site.content_dir, site.template_path, site.output_dir, site.base_path,
+				manifest, jobs=self.jobs, profiler=profiler, cache=self.render_cache, write_threads=self.write_threads,
+				template=template, link_index=link_index, compress_level=self.compress_level, page_table=page_table,
+				search_index=search_index, explain=self.explain, incremental=self.incremental, templates=templates,
+				executor=self.executor,
+			)
+		except PageGenerationError as e:
+			counts = e.counts
+			result.failures = e.failures
+		finally:
+			if manifest is not None:
+				manifest.save()
+			if link_index is not None:
+				link_index.save()
+		result.pages_built, result.pages_skipped, result.pages_removed = counts
+		if page_table is not None:
+			with profiler.stage('indexes'):
+				result.indexes_written = write_indexes(
+					page_table, templates, site.output_dir, self.site_url, self.compress_level, listings=self.indexes
+				)
+			page_table.save()
+		if search_index is not None:
+			with profiler.stage('search'):
+				result.search_written = write_search_index(search_index, site.output_dir, site.base_path, compress_level=self.compress_level)
+			search_index.save()
+		if self.check_links:
+			with profiler.stage('check_links'):
+				result.broken_links = link_index.broken_links(site.output_dir)
+				result.orphaned_images = link_index.orphaned_images(site.output_dir)
+				if assets:
+					# pages name images by their original url; the fingerprinted copies are used through it
+					copies = {url[len(site.base_path):] for url in assets.values()}
+					result.orphaned_images = [path for path in result.orphaned_images if path not in copies]
+		result.seconds = time.perf_counter() - started
+		return result
+
+	def template(self, path, base_path='/', assets=None):
+		'''
+		the compiled template for path, recompiled only when the asset map or a file of it or its layouts changes
+		'''
+		entry = self.templates.get((path, base_path))
+		if entry is None or entry[1] != (assets or None) or entry[0] != _stat_keys(entry[2].paths):
+			template = Template.load(path, base_path, assets)
+			entry = (_stat_keys(template.paths), assets or None, template)
+			self.templates[(path, base_path)] = entry
+		return entry[2]
+
+	def manifest(self, site):
+		'''
+		the site's manifest, loaded from disk on first use and kept in memory afterwards
+		'''
+		key = site.manifest_path if site.manifest_path is not None else os.path.abspath(site.output_dir)
+		manifest = self.manifests.get(key)
+		if manifest is None:
+			manifest = BuildManifest.load(site.manifest_path) if site.manifest_path is not None else BuildManifest()
+			self.manifests[key] = manifest
+		return manifest
+
+	def page_table(self, site):
+		'''
+		the site's page table, loaded from disk on first use and kept in memory afterwards
+		'''
+		key = site.pages_path if site.pages_path is not None else os.path.abspath(site.output_dir)
+		table = self.page_tables.get(key)
+		if table is None:
+			table = PageTable.load(site.pages_path) if site.pages_path is not None else PageTable()
+			self.page_tables[key] = table
+		return table
+
+	def search_index(self, site):
+		'''
+		the site's search index, loaded from disk on first use and kept in memory afterwards
+		'''
+		key = site.search_path if site.search_path is not None else os.path.abspath(site.output_dir)
+		index = self.search_indexes.get(key)
+		if index is None:
+			index = SearchIndex.load(site.search_path) if site.search_path is not None else SearchIndex()
+			self.search_indexes[key] = index
+		return index
+
+	def _forget_search_index(self, site):
+		# the published index would keep pointing at pages that may since have been removed or renamed
+		key = site.search_path if site.search_path is not None else os.path.abspath(site.output_dir)
+		index = self.search_indexes.get(key)
+		if index is None and site.search_path is not None and os.path.exists(site.search_path):
+			index = SearchIndex.load(site.search_path)
+		if index is not None:
+			remove_search_index(index, site.output_dir)
+		self._forget_index(self.search_indexes, site.search_path, site)
+
+	def _forget_index(self, indexes, path, site):
+		key = path if path is not None else os.path.abspath(site.output_dir)
+		indexes.pop(key, None)
+		if path is not None and os.path.exists(path):
+			os.remove(path)
+
+	def link_index(self, site):
+		'''
+		the site's link index, loaded from disk on first use and kept in memory afterwards
+		'''
+		key = site.links_path if site.links_path is not None else os.path.abspath(site.output_dir)
+		index = self.link_indexes.get(key)
+		if index is None:
+			index = LinkIndex.load(site.links_path) if site.links_path is not None else LinkIndex()
+			self.link_indexes[key] = index
+		return index
+
+
+def _stat_keys(paths):
+	keys = []
+	for path in paths:
+		try:
+			stat = os.stat(path)
+		except OSError:
+			keys.append(None)
+		else:
+			keys.append((stat.st_mtime_ns, stat.st_size))
+	return keys
@@ -0,0 +1,224 @@
+'''
+The site's page table: the title, url and date of every page, recorded while the pages are generated
+and persisted next to the manifest. Listing pages, sitemap.xml and an Atom feed are written from the
+table after each build, without reading any source again; pages an incremental build skips keep their rows.
+'''
+
+import json
+import os
+import posixpath
+from datetime import datetime, timezone
+from html import escape
+
+from manifest import remove_output
+from page_writer import write_file
+
+
+FEED_ENTRIES = 20
+
+
+class PageTable:
+	def __init__(self, path=None):
+		'''
+		path - where the table is persisted (None keeps it in memory only)
+		pages - source path -> {"output": page path relative to the output directory, "title": ..., "mtime": source mtime in ns, "meta": {...}}
+		listings - the listing pages the last write_indexes wrote, relative to the output directory
+		'''
+		self.path = path
+		self.pages = {}
+		self.listings = []
+
+	@classmethod
+	def load(cls, path):
+		'''
+		read a table from disk, starting empty if it is missing or unreadable
+		'''
+		table = cls(path)
+		try:
+			with open(path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return table
+		if isinstance(data, dict) and isinstance(data.get('pages'), dict):
+			table.pages = data['pages']
+			table.listings = data.get('listings', [])
+		return table
+
+	def save(self):
+		if self.path is None:
+			return
+		directory = os.path.dirname(self.path)
+		if directory:
+			os.makedirs(directory, exist_ok=True)
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump({'pages': self.pages, 'listings': self.listings}, f, indent=1, sort_keys=True)
+		os.replace(tmp_path, self.path)
+
+	def record(self, source_path, output, title, mtime, meta=None):
+		'''
+		output - the page's path relative to the output directory, e.g. "blog/index.html"
+		meta - the page's other front matter; a "date" (iso 8601) dates the page in listings and the feed
+		'''
+		self.pages[source_path] = {'output': output, 'title': title, 'mtime': mtime, 'meta': meta or {}}
+
+	def forget(self, source_path):
+		self.pages.pop(source_path, None)
+
+	def prune(self, seen_sources):
+		'''
+		drops pages whose source was not seen in the latest build
+		'''
+		seen = set(seen_sources)
+		for source_path in [path for path in self.pages if path not in seen]:
+			del self.pages[source_path]
+
+	def sections(self):
+		'''
+		directory url path ("blog", "" for the root) -> its child pages, newest first, for every directory
+		that has child pages but no page of its own
+		'''
+		by_path = {_url_path(entry['output']): entry for entry in self.pages.values()}
+		sections = {}
+		for path, entry in by_path.items():
+			if path:
+				sections.setdefault(posixpath.dirname(path), []).append(entry)
+		return {
+			section: _newest_first(entries)
+			for section, entries in sorted(sections.items())
+			if section not in by_path
+		}
+
+
+def page_url(output, base_path='/'):
+	'''
+	the url a page is served at: "blog/tom/index.html" -> base_path + "blog/tom/"
+	'''
+	path = _url_path(output)
+	return base_path + path + '/' if path and output.endswith('index.html') else base_path + path
+
+
+def write_indexes(table, templates, output_dir, site_url=None, compress_level=None, listings=True):
+	'''
+	writes a listing page for every section of table, through the template its pages would use
+	(templates is the build's template.TemplateSet), and with site_url
+	(e.g. "https://example.com"), sitemap.xml and feed.xml. listing pages of sections that are gone
+	(or all of them, without listings) are removed.
+	returns the number of files written; files whose bytes did not change are left alone
+	'''
+	base_path = templates.base_path
+	written = 0
+	outputs = []
+	sections = table.sections() if listings else {}
+	for section, entries in sections.items():
+		output = posixpath.join(section, 'index.html') if section else 'index.html'
+		outputs.append(output)
+		title = _section_title(section)
+		template = templates.get(templates.path_for(os.path.join(templates.content_dir, *section.split('/'))))
+		html = template.render(Title=title, Content=render_listing(title, entries, base_path))
+		written += write_file(os.path.join(output_dir, output), html, compress_level=compress_level)
+	pages = {entry['output'] for entry in table.pages.values()}
+	for output in set(table.listings) - set(outputs) - pages:
+		remove_output(os.path.join(output_dir, output), output_dir, compressed=True)
+	table.listings = outputs
+
+	if site_url is not None:
+		site_url = site_url.rstrip('/')
+		sitemap = render_sitemap(table, sections, site_url, base_path)
+		written += write_file(os.path.join(output_dir, 'sitemap.xml'), sitemap, compress_level=compress_level)
+		feed = render_feed(table, site_url, base_path)
+		written += write_file(os.path.join(output_dir, 'feed.xml'), feed, compress_level=compress_level)
+	return written
+
+
+def render_listing(title, entries, base_path='/'):
+	items = [
+		f'<li><a href="{escape(page_url(entry["output"], base_path))}">{escape(entry["title"])}</a> '
+		f'<time datetime="{_date(page_time(entry))}">{_date(page_time(entry))}</time></li>'
+		for entry in entries
+	]
+	return f'<h1>{escape(title)}</h1><ul class="listing">' + ''.join(items) + '</ul>'
+
+
+def render_sitemap(table, sections, site_url, base_path='/'):
+	'''
+	sitemap.xml for every page and listing page of the table, with absolute urls under site_url
+	'''
+	urls = [(page_url(entry['output'], base_path), entry['mtime']) for entry in table.pages.values()]
+	for section, entries in sections.items():
+		urls.append((base_path + section + '/' if section else base_path, max(entry['mtime'] for entry in entries)))
+	lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+	for url, mtime in sorted(urls):
+		lines.append(f'<url><loc>{escape(site_url + url)}</loc><lastmod>{_date(mtime)}</lastmod></url>')
+	lines.append('</urlset>')
+	return '\n'.join(lines) + '\n'
+
+
+def render_feed(table, site_url, base_path='/'):
+	'''
+	an Atom feed of the FEED_ENTRIES newest pages (the home page's title names the feed)
+	'''
+	home = next((entry for entry in table.pages.values() if entry['output'] == 'index.html'), None)
+	title = home['title'] if home is not None else site_url
+	entries = _newest_first([entry for entry in table.pages.values() if entry is not home])[:FEED_ENTRIES]
+	updated = max((page_time(entry) for entry in table.pages.values()), default=0)
+	lines = [
+		'<?xml version="1.0" encoding="utf-8"?>',
+		'<feed xmlns="http://www.w3.org/2005/Atom">',
+		f'<title>{escape(title)}</title>',
+		f'<id>{escape(site_url + base_path)}</id>',
+		f'<link href="{escape(site_url + base_path)}feed.xml" rel="self"/>',
+		f'<link href="{escape(site_url + base_path)}"/>',
+		f'<updated>{_timestamp(updated)}</updated>',
+		f'<author><name>{escape(title)}</name></author>',
+	]
+	for entry in entries:
+		url = escape(site_url + page_url(entry['output'], base_path))
+		lines.append(
+			f'<entry><title>{escape(entry["title"])}</title><id>{url}</id><link href="{url}"/>'
+			f'<updated>{_timestamp(page_time(entry))}</updated></entry>'
+		)
+	lines.append('</feed>')
+	return '\n'.join(lines) + '\n'
+
+
+def page_time(entry):
+	'''
+	when a page was published, in ns: the date in its front matter if it has a valid one, else its source mtime
+	'''
+	date = entry.get('meta', {}).get('date')
+	if isinstance(date, str):
+		try:
+			published = datetime.fromisoformat(date)
+		except ValueError:
+			return entry['mtime']
+		if published.tzinfo is None:
+			published = published.replace(tzinfo=timezone.utc)
+		return int(published.timestamp()) * 1_000_000_000 + published.microsecond * 1000
+	return entry['mtime']
+
+
+def _url_path(output):
+	# "blog/tom/index.html" -> "blog/tom", "index.html" -> "", "about.html" -> "about.html"
+	if output == 'index.html':
+		return ''
+	if output.endswith('/index.html'):
+		return output[:-len('/index.html')]
+	return output
+
+
+def _newest_first(entries):
+	return sorted(entries, key=lambda entry: (-page_time(entry), entry['title']))
+
+
+def _section_title(section):
+	name = posixpath.basename(section) or 'Index'
+	return name.replace('-', ' ').replace('_', ' ').capitalize()
+
+
+def _date(mtime):
+	return datetime.fromtimestamp(mtime / 1e9, timezone.utc).strftime('%Y-%m-%d')
+
+
+def _timestamp(mtime):
+	return datetime.fromtimestamp(mtime / 1e9, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -0,0 +1,243 @@
+'''
+Page templates, compiled once per build into static segments and {{ Name }} slots so that
+rendering a page is a single join.
+
+A template can extend a layout and override its blocks:
+
+	{% extends "../layout.html" %}
+	{% block main %}<article>{{ Content }}</article>{% endblock %}
+
+The path is relative to the extending template; a bare {% extends %} extends the next template.html
+up the content tree (or the site's template). The layout's {% block name %}default{% endblock %} sections are replaced by the most specific template's
+version, and everything else in an extending template is ignored. Blocks do not nest. A TemplateSet finds
+each page's template (the nearest template.html in its directory or above) and compiles every chain once.
+'''
+
+import os
+import re
+
+from assets import referenced_urls, rewrite_asset_urls
+from htmlnode import HTMLNode
+from manifest import hash_bytes
+
+
+SLOT_PATTERN = re.compile(r'\{\{ (\w+) \}\}')
+EXTENDS_PATTERN = re.compile(r'\{%\s*extends(?:\s+"([^"]+)")?\s*%\}')
+BLOCK_PATTERN = re.compile(r'\{%\s*block\s+(\w+)\s*%\}(.*?)\{%\s*endblock\s*%\}', re.S)
+TAG_PATTERN = re.compile(r'\{%.*?%\}', re.S)
+
+# a directory's own template; pages use the nearest one in their directory or above
+TEMPLATE_NAME = 'template.html'
+
+
+def rewrite_root_urls(html, base_path):
+	'''
+	prefixes root-relative href/src attributes with base_path
+	'''
+	if base_path == '/':
+		return html
+	html = html.replace('href="/', 'href="' + base_path)
+	return html.replace('src="/', 'src="' + base_path)
+
+
+class Template:
+	def __init__(self, source, base_path='/', assets=None, paths=()):
+		'''
+		source - the template text, with {{ Title }}, {{ Content }}, ... placeholders
+		base_path - applied to the template's own root-relative urls here, once
+		assets - url -> fingerprinted url (see assets.fingerprint_assets); references in the template
+		and in every rendered page are rewritten. the hash only says whether there is a map: which assets
+		a page depends on is recorded per page (references holds the template's own root-relative urls)
+		paths - the files source came from: the template, then each layout it extends
+		'''
+		self.base_path = base_path
+		self.paths = tuple(paths)
+		self.assets = assets or None
+		if self.assets:
+			self.hash = hash_bytes((source + '\0fingerprinted').encode('utf-8'))
+		else:
+			self.hash = hash_bytes(source.encode('utf-8'))
+		self.segments = []
+		self.slots = []
+		source = rewrite_root_urls(source, base_path)
+		self.references = referenced_urls(source) if self.assets else []
+		source = rewrite_asset_urls(source, self.assets)
+		last_index = 0
+		for match in SLOT_PATTERN.finditer(source):
+			self.segments.append(source[last_index:match.start()])
+			self.slots.append(match.group(1))
+			last_index = match.end()
+		self.segments.append(source[last_index:])
+
+	@classmethod
+	def load(cls, path, base_path='/', assets=None):
+		'''
+		compiles the template at path, with the layouts it extends applied
+		'''
+		chain = template_chain(path, _read_text)
+		return cls(apply_layouts([source for _, source in chain]), base_path, assets, [link for link, _ in chain])
+
+	def render(self, **values):
+		'''
+		fills every slot from values; a slot with no value is left as its original placeholder
+		'''
+		parts = [self.segments[0]]
+		for slot, segment in zip(self.slots, self.segments[1:]):
+			value = values.get(slot)
+			parts.append(rewrite_asset_urls(value, self.assets) if value is not None else '{{ ' + slot + ' }}')
+			parts.append(segment)
+		return ''.join(parts)
+
+	def render_into(self, write, **values):
+		'''
+		streams the filled template to write. values may be strings, HTMLNodes, or callables
+		that take write; nodes and callables stream straight through without building one big string
+		'''
+		write(self.segments[0])
+		write_value = write
+		if self.assets:
+			def write_value(chunk):
+				write(rewrite_asset_urls(chunk, self.assets))
+		for slot, segment in zip(self.slots, self.segments[1:]):
+			value = values.get(slot)
+			if value is None:
+				write('{{ ' + slot + ' }}')
+			elif isinstance(value, HTMLNode):
+				value.render_into(write_value)
+			elif callable(value):
+				value(write_value)
+			else:
+				write_value(value)
+			write(segment)
+
+	def __repr__(self):
+		return f'Template({self.slots}, {self.base_path})'
+
+
+class TemplateSet:
+	'''
+	the templates of one content tree: a page uses the nearest template.html in its directory or the ones above it
+	(up to content_dir), else default_path. each template file is read once and each distinct chain of layouts is
+	compiled once, however many pages or sections share it
+	'''
+	def __init__(self, content_dir, default_path, base_path='/', assets=None, default=None):
+		'''
+		default - the template already compiled from default_path with base_path and assets, to reuse
+		'''
+		self.content_dir = os.path.normpath(content_dir)
+		self.default_path = os.path.normpath(default_path)
+		self.base_path = base_path
+		self.assets = assets or None
+		# content directory -> the template path its pages use
+		self.paths = {}
+		# template path -> source text
+		self.sources = {}
+		# template path -> its chain of template paths, most specific first
+		self.chains = {}
+		# chain -> Template
+		self.compiled = {}
+		if default is not None:
+			self.compiled[self.chain(self.default_path)] = default
+
+	def path_for(self, directory):
+		'''
+		the template path for pages in directory
+		'''
+		directory = os.path.normpath(directory)
+		path = self.paths.get(directory)
+		if path is None:
+			candidate = os.path.join(directory, TEMPLATE_NAME)
+			if os.path.isfile(candidate):
+				path = candidate
+			elif directory == self.content_dir or not directory.startswith(self.content_dir + os.sep):
+				path = self.default_path
+			else:
+				path = self.path_for(os.path.dirname(directory))
+			self.paths[directory] = path
+		return path
+
+	def for_page(self, source_path):
+		return self.get(self.path_for(os.path.dirname(source_path)))
+
+	def get(self, path):
+		'''
+		the compiled template at path, with its layouts applied
+		'''
+		chain = self.chain(path)
+		template = self.compiled.get(chain)
+		if template is None:
+			template = Template(apply_layouts([self.sources[link] for link in chain]), self.base_path, self.assets, chain)
+			self.compiled[chain] = template
+		return template
+
+	def chain(self, path):
+		chain = self.chains.get(path)
+		if chain is None:
+			chain = tuple(link for link, _ in template_chain(path, self._read, self._parent))
+			self.chains[path] = chain
+		return chain
+
+	def _read(self, path):
+		source = self.sources.get(path)
+		if source is None:
+			source = self.sources[path] = _read_text(path)
+		return source
+
+	def _parent(self, path):
+		# what a bare {% extends %} in path extends: the next template up the content tree
+		if path == self.default_path:
+			return None
+		directory = os.path.dirname(os.path.normpath(path))
+		if directory == self.content_dir or not directory.startswith(self.content_dir + os.sep):
+			return self.default_path
+		return self.path_for(os.path.dirname(directory))
+
+
+def template_chain(path, read, parent=None):
+	'''
+	[(path, source)] for the template at path and each layout it extends in turn, root layout last.
+	read - path -> source text
+	parent - path -> what a bare {% extends %} in it extends (None when it cannot)
+	raises ValueError for a template that extends nothing or itself
+	'''
+	chain = []
+	seen = set()
+	path = os.path.normpath(path)
+	while True:
+		if path in seen:
+			raise ValueError(f'template {path} extends itself')
+		seen.add(path)
+		source = read(path)
+		chain.append((path, source))
+		match = EXTENDS_PATTERN.search(source)
+		if match is None:
+			return chain
+		if match.group(1):
+			extended = os.path.join(os.path.dirname(path), match.group(1))
+		else:
+			extended = parent(path) if parent is not None else None
+			if extended is None:
+				raise ValueError(f'template {path} has no template above it to extend')
+		path = os.path.normpath(extended)
+
+
+def apply_layouts(sources):
+	'''
+	sources - template sources, most specific first, as template_chain returns them.
+	returns the root layout with each block replaced by the most specific version of it and every tag removed.
+	raises ValueError for tags left over, e.g. nested blocks or a misspelt endblock
+	'''
+	blocks = {}
+	for source in sources[:-1]:
+		for match in BLOCK_PATTERN.finditer(source):
+			blocks.setdefault(match.group(1), match.group(2))
+	html = BLOCK_PATTERN.sub(lambda m: blocks.get(m.group(1), m.group(2)), sources[-1])
+	leftover = TAG_PATTERN.search(html)
+	if leftover is not None:
+		raise ValueError(f'unexpected template tag {leftover.group(0)!r}')
+	return html
+
+
+def _read_text(path):
+	with open(path, 'r', encoding='utf-8') as f:
+		return f.read()
@@ -0,0 +1,103 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from assets import asset_dependencies, compressed_paths, fingerprint_assets, fingerprinted_name, referenced_urls, rewrite_asset_urls
+from manifest import BuildManifest, hash_bytes
+from template import Template
+
+
+class TestAssetHelpers(unittest.TestCase):
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name("css/site.css", "3f2a9c1b77"), "css/site.3f2a9c1b.css")
+        self.assertEqual(fingerprinted_name("LICENSE", "3f2a9c1b77"), "LICENSE.3f2a9c1b")
+
+    def test_only_text_assets_are_compressed(self):
+        self.assertIn("site.css.gz", compressed_paths("site.css"))
+        self.assertEqual(compressed_paths("logo.png"), [])
+
+    def test_rewrite_asset_urls(self):
+        assets = {"/index.css": "/index.1234abcd.css", "/a.png": "/a.5678abcd.png"}
+        html = '<link href="/index.css"><img src="/a.png"><a href="/about">/index.css</a>'
+        self.assertEqual(
+            rewrite_asset_urls(html, assets),
+            '<link href="/index.1234abcd.css"><img src="/a.5678abcd.png"><a href="/about">/index.css</a>',
+        )
+        self.assertEqual(rewrite_asset_urls(html, {}), html)
+
+    def test_asset_dependencies(self):
+        html = '<link href="/index.css"><a href="//cdn.example.com/a.js"></a><img src="a.png"><a href="/about">'
+        self.assertEqual(referenced_urls(html), ["/index.css", "/about"])
+        assets = {"/index.css": "/index.1234abcd.css"}
+        self.assertEqual(asset_dependencies(referenced_urls(html) + ["b.png"], assets), {"/index.css": "/index.1234abcd.css", "/about": None})
+
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.write("index.css", "body { color: red }")
+        self.write("images/a.png", "png")
+        self.manifest = BuildManifest()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative_path, text):
+        path = os.path.join(self.static, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def fingerprint(self):
+        with self.assertLogs("ssg"):
+            return fingerprint_assets(self.static, self.public, self.manifest, "/x/")
+
+    def test_publishes_fingerprinted_and_compressed_copies(self):
+        assets, built, unchanged, removed = self.fingerprint()
+        css_name = fingerprinted_name("index.css", hash_bytes(b"body { color: red }"))
+        self.assertEqual(assets["/x/index.css"], "/x/" + css_name)
+        self.assertEqual(assets["/x/images/a.png"], "/x/" + fingerprinted_name("images/a.png", hash_bytes(b"png")))
+        self.assertEqual((built, unchanged, removed), (2, 0, 0))
+        with gzip.open(os.path.join(self.public, css_name + ".gz")) as f:
+            self.assertEqual(f.read(), b"body { color: red }")
+        self.assertFalse(os.path.exists(os.path.join(self.public, assets["/x/images/a.png"][3:] + ".gz")))
+
+    def test_unchanged_assets_are_reused_and_stale_outputs_removed(self):
+        first, _, _, _ = self.fingerprint()
+        self.assertEqual(fingerprint_assets(self.static, self.public, self.manifest, "/x/"), (first, 0, 2, 0))
+
+        self.write("index.css", "body { color: blue }")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        assets, built, unchanged, removed = self.fingerprint()
+        self.assertEqual((built, unchanged), (1, 0))
+        self.assertEqual(removed, len(compressed_paths("index.css")) + 2)
+        self.assertNotEqual(assets["/x/index.css"], first["/x/index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, first["/x/index.css"][3:])))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+
+class TestTemplateAssets(unittest.TestCase):
+    def test_template_and_content_urls_are_rewritten(self):
+        assets = {"/x/index.css": "/x/index.1234abcd.css", "/x/a.png": "/x/a.5678abcd.png"}
+        template = Template('<link href="/index.css">{{ Content }}', "/x/", assets)
+        chunks = []
+        template.render_into(chunks.append, Content='<img src="/x/a.png">')
+        self.assertEqual("".join(chunks), '<link href="/x/index.1234abcd.css"><img src="/x/a.5678abcd.png">')
+        self.assertEqual(template.render(Content='<img src="/x/a.png">'), "".join(chunks))
+
+    def test_hash_changes_when_assets_are_fingerprinted(self):
+        # which assets changed is tracked per page, so the hash does not depend on the map itself
+        source = '<link href="/index.css">{{ Content }}'
+        plain = Template(source)
+        self.assertEqual(plain.hash, Template(source, "/", {}).hash)
+        fingerprinted = Template(source, "/x/", {"/x/index.css": "/x/index.1234abcd.css"})
+        self.assertNotEqual(plain.hash, fingerprinted.hash)
+        self.assertEqual(fingerprinted.hash, Template(source, "/x/", {"/x/index.css": "/x/index.5678abcd.css"}).hash)
+        self.assertEqual(fingerprinted.references, ["/x/index.css"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from benchmark import CorpusGenerator, measure_memory, run
+from block_util import markdown_to_html_node
+
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_same_seed_same_corpus(self):
+        self.assertEqual(CorpusGenerator(seed=3).pages(5), CorpusGenerator(seed=3).pages(5))
+
+    def test_pages_are_valid_markdown(self):
+        for _, markdown in CorpusGenerator(seed=1, inline_density=0.5).pages(20):
+            self.assertTrue(markdown.startswith("# Page "))
+            markdown_to_html_node(markdown).to_html()
+
+    def test_block_mix_is_respected(self):
+        generator = CorpusGenerator(blocks_per_page=10, block_mix={"code": 1})
+        markdown = generator.page(0)
+        self.assertEqual(markdown.count("```"), 20)
+
+
+class TestRun(unittest.TestCase):
+    def test_reports_every_stage(self):
+        report = run(pages=3, blocks_per_page=4, repeat=1)
+        self.assertEqual(
+            list(report["stages"]),
+            ["markdown_to_blocks", "block_to_block_type", "text_to_textnodes", "markdown_to_html_node",
+             "to_html", "template_fill", "write", "metadata_scan", "build"],
+        )
+        for stage in report["stages"].values():
+            self.assertGreater(stage["pages_per_second"], 0)
+
+    def test_counts_plain_text_fast_path(self):
+        plain = run(pages=3, blocks_per_page=4, inline_density=0.0, repeat=1)["corpus"]
+        self.assertEqual(plain["plain_inline_texts"], plain["inline_texts"])
+        marked = run(pages=3, blocks_per_page=4, inline_density=1.0, repeat=1)["corpus"]
+        # only the page titles
+        self.assertEqual(marked["plain_inline_texts"], 3)
+
+    def test_measure_memory(self):
+        memory = measure_memory(target_bytes=20000)
+        self.assertGreaterEqual(memory["markdown_bytes"], 20000)
+        self.assertGreater(memory["html_nodes"], 100)
+        self.assertGreaterEqual(memory["peak_bytes"], memory["tree_bytes"])
+        self.assertGreater(memory["tree_allocations"], memory["html_nodes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,10 @@ import unittest
 import textwrap
 
 
-from block_util import BlockType, markdown_to_blocks, block_to_block_type, markdown_to_html_node
+import io
+
+from block_util import BlockType, markdown_to_blocks, block_to_block_type, classify_block, markdown_to_html_node, iter_blocks, render_markdown_into, text_to_children
+from htmlnode import LeafNode
 
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -46,6 +49,43 @@ class TestMarkdownToBlocks(unittest.TestCase):
 		self.assertEqual(markdown_to_blocks(""), [])
 		self.assertEqual(markdown_to_blocks(" \n\t \n\n  \n"), [])
 
+	def test_fenced_code_keeps_blank_lines(self):
+		md = "intro\n\n```\nline one\n\nline two\n```\n\noutro"
+		self.assertEqual(
+			markdown_to_blocks(md), ["intro", "```\nline one\n\nline two\n```", "outro"]
+		)
+
+
+class TestIterBlocks(unittest.TestCase):
+	SAMPLES = [
+		"",
+		"A\n\nB",
+		"\n\nA\n\n\nB\n\n",
+		"A\n \nB",
+		"  A  \n\n\n\n  B\nC  ",
+		"# t\n\n- a\n- b\n\n> q",
+	]
+
+	def test_matches_markdown_to_blocks(self):
+		for md in self.SAMPLES:
+			with self.subTest(md=md):
+				self.assertEqual(list(iter_blocks(md.split("\n"))), markdown_to_blocks(md))
+
+	def test_reads_file_lines(self):
+		source = io.StringIO("# t\n\n```\na\n\nb\n```\n")
+		self.assertEqual(list(iter_blocks(source)), ["# t", "```\na\n\nb\n```"])
+
+	def test_render_markdown_into_matches_node_html(self):
+		md = "# t\n\nsome **bold** [x](/y)\n\n```\ncode\n```\n\n- a\n- b"
+		chunks = []
+		render_markdown_into(io.StringIO(md), chunks.append, "/base/")
+		self.assertEqual("".join(chunks), markdown_to_html_node(md, "/base/").to_html())
+
+	def test_render_empty_document(self):
+		chunks = []
+		render_markdown_into([], chunks.append)
+		self.assertEqual("".join(chunks), markdown_to_html_node("").to_html())
+
 
 class TestBlockToBlockType(unittest.TestCase):
 	def test_block_to_block_types(self):
@@ -62,6 +102,21 @@ class TestBlockToBlockType(unittest.TestCase):
 		block = 'paragraph'
 		self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
+	def test_invalid_blocks_are_paragraphs(self):
+		for block in ('1. one\n3. three', '- item\nplain line', '> quote\nplain line', '- item\n1. item', '####### seven', '```\nunclosed'):
+			self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH, block)
+
+	def test_nested_lists(self):
+		self.assertEqual(block_to_block_type('- a\n  - b\n  1. c\n- d'), BlockType.UNORDERED_LIST)
+		self.assertEqual(block_to_block_type('1. a\n   - b\n2. c'), BlockType.ORDERED_LIST)
+
+	def test_classify_keeps_lines_and_items(self):
+		classified = classify_block('> one\n>two')
+		self.assertEqual(classified.lines, ['> one', '>two'])
+		self.assertEqual(classified.items, ['one', 'two'])
+		classified = classify_block('1. a\n  - b')
+		self.assertEqual(classified.items, [(0, True, 'a'), (2, False, 'b')])
+
 
 class TestMarkdownToHTMLNode(unittest.TestCase):
 	def test_paragraphs(self):
@@ -100,3 +155,44 @@ class TestMarkdownToHTMLNode(unittest.TestCase):
 	        html,
 	        "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
 	    )
+
+	def test_codeblock_with_blank_line(self):
+		md = "```\nfirst\n\nsecond\n```"
+		self.assertEqual(
+			markdown_to_html_node(md).to_html(),
+			"<div><pre><code>first\n\nsecond\n</code></pre></div>",
+		)
+
+	def test_nested_list(self):
+		md = "- fruit\n  1. apple\n  2. pear\n- veg\n  - leek\n    - baby leek\n  - kale\n- bread"
+		self.assertEqual(
+			markdown_to_html_node(md).to_html(),
+			"<div><ul><li>fruit<ol><li>apple</li><li>pear</li></ol></li>"
+			"<li>veg<ul><li>leek<ul><li>baby leek</li></ul></li><li>kale</li></ul></li>"
+			"<li>bread</li></ul></div>",
+		)
+
+	def test_dedent_between_levels_stays_in_the_deeper_list(self):
+		self.assertEqual(
+			markdown_to_html_node("- a\n    - b\n  - c").to_html(),
+			"<div><ul><li>a<ul><li>b</li><li>c</li></ul></li></ul></div>",
+		)
+		self.assertEqual(
+			markdown_to_html_node("- a\n  - b\n    - c\n   - d\n  - e\n- f").to_html(),
+			"<div><ul><li>a<ul><li>b<ul><li>c</li><li>d</li></ul></li><li>e</li></ul></li><li>f</li></ul></div>",
+		)
+
+	def test_nested_list_switching_kind(self):
+		md = "1. one\n   - a\n   1. b\n2. two"
+		self.assertEqual(
+			markdown_to_html_node(md).to_html(),
+			"<div><ol><li>one<ul><li>a</li></ul><ol><li>b</li></ol></li><li>two</li></ol></div>",
+		)
+
+	def test_plain_text_children_match_parsed_children(self):
+		self.assertEqual(text_to_children(""), [])
+		self.assertEqual(text_to_children(None), [])
+		children = text_to_children("no markup at all!")
+		self.assertEqual(len(children), 1)
+		self.assertIsInstance(children[0], LeafNode)
+		self.assertEqual(children[0].to_html(), "no markup at all!")
@@ -0,0 +1,76 @@
+import io
+import json
+import logging
+import unittest
+
+from buildlog import ProgressHandler, configure_logging, finish_logging, logger
+
+
+class TestConfigureLogging(unittest.TestCase):
+    def tearDown(self):
+        finish_logging()
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+
+    def test_text_format_prints_messages(self):
+        out = io.StringIO()
+        configure_logging("text", stream=out)
+        logger.info("Copied 'a' to 'b'", extra={"event": "copied"})
+        logger.debug("hidden")
+        finish_logging()
+        self.assertEqual(out.getvalue(), "Copied 'a' to 'b'\n")
+
+    def test_quiet_level_drops_info(self):
+        out = io.StringIO()
+        configure_logging("text", level=logging.WARNING, stream=out)
+        logger.info("per file")
+        logger.warning("problem")
+        finish_logging()
+        self.assertEqual(out.getvalue(), "problem\n")
+
+    def test_jsonl_is_buffered_until_finish(self):
+        out = io.StringIO()
+        configure_logging("jsonl", stream=out)
+        logger.info("Generating page", extra={"event": "page_generated", "path": "docs/index.html"})
+        self.assertEqual(out.getvalue(), "")
+        finish_logging()
+        entry = json.loads(out.getvalue())
+        self.assertEqual(entry["event"], "page_generated")
+        self.assertEqual(entry["path"], "docs/index.html")
+        self.assertEqual(entry["level"], "info")
+
+    def test_jsonl_flushes_on_error(self):
+        out = io.StringIO()
+        configure_logging("jsonl", stream=out)
+        logger.error("broken")
+        self.assertIn('"broken"', out.getvalue())
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            configure_logging("xml")
+
+
+class TestProgressHandler(unittest.TestCase):
+    def test_counts_events_and_reports_eta(self):
+        out = io.StringIO()
+        handler = ProgressHandler(out, interval=3600)
+        progress_logger = logging.getLogger("ssg.test.progress")
+        progress_logger.propagate = False
+        progress_logger.addHandler(handler)
+        try:
+            progress_logger.warning("Generating content...")
+            progress_logger.warning("4 page(s)", extra={"event": "pages_planned", "count": 4})
+            for _ in range(2):
+                progress_logger.warning("page", extra={"event": "page_generated"})
+        finally:
+            progress_logger.removeHandler(handler)
+        line = handler.progress_line()
+        self.assertTrue(line.startswith("2/4 pages"), line)
+        self.assertIn("page_generated=2", line)
+        self.assertIn("eta", line)
+        handler.finish()
+        self.assertTrue(out.getvalue().startswith("Generating content...\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import os
+import tempfile
+import unittest
+
+from front_matter import MetadataScanError, heading_title, read_front_matter, read_heading, read_metadata, scan_metadata, split_front_matter, title_text
+
+
+PAGE = """---
+title: "Why Tom: a Mistake"
+date: 2024-03-01
+draft: false
+tags: [tolkien, 'essays']
+authors:
+  - Ann
+  - Bo
+---
+# Heading
+
+Body
+"""
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_split(self):
+        metadata, markdown = split_front_matter(PAGE)
+        self.assertEqual(metadata, {
+            "title": "Why Tom: a Mistake",
+            "date": "2024-03-01",
+            "draft": False,
+            "tags": ["tolkien", "essays"],
+            "authors": ["Ann", "Bo"],
+        })
+        self.assertEqual(markdown, "# Heading\n\nBody\n")
+
+    def test_without_front_matter(self):
+        for markdown in ("# Title\n\n---\n", "---\nno closing fence\n", "----\n"):
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle\n---\n")
+
+    def test_read_front_matter_from_lines(self):
+        lines = io.StringIO(PAGE)
+        metadata, head = read_front_matter(lines)
+        self.assertEqual(metadata["title"], "Why Tom: a Mistake")
+        self.assertEqual(head, [])
+        self.assertEqual(lines.read(), "# Heading\n\nBody\n")
+
+        metadata, head = read_front_matter(io.StringIO("# Title\nBody\n"))
+        self.assertEqual((metadata, head), ({}, ["# Title\n"]))
+        unclosed = "---\n" + "a: b\n" * 10
+        self.assertEqual(read_front_matter(io.StringIO(unclosed), max_bytes=20), ({}, unclosed.splitlines(True)[:5]))
+
+    def test_title_text(self):
+        self.assertEqual([title_text(value) for value in ("Tom", False, None, "")], ["Tom", "false", None, None])
+        with self.assertRaises(ValueError):
+            title_text(["a", "b"])
+
+    def test_heading_title(self):
+        self.assertEqual(heading_title("Intro\n\n# The Title\n## Sub"), "The Title")
+        self.assertIsNone(heading_title("## Sub\ntext"))
+        self.assertIsNone(heading_title("Intro\n\n```sh\n# install deps\n\nmake\n```\n"))
+        self.assertEqual(heading_title("```\n# not this\n```\n\n# Title"), "Title")
+
+    def test_read_heading_reads_up_to_the_heading(self):
+        lines = iter(["Intro\n", "\n", "  # The Title\n", "text\n"])
+        self.assertEqual(read_heading(lines), ("The Title", ["Intro\n", "\n", "  # The Title\n"]))
+        self.assertEqual(next(lines), "text\n")
+        # a "# " line inside a paragraph does not start a block
+        self.assertEqual(read_heading(iter(["Intro\n", "# no\n", "\n", "# Yes\n"]))[0], "Yes")
+
+    def test_read_heading_gives_up_past_max_bytes(self):
+        title, read = read_heading(iter(["x" * 10 + "\n"] * 5 + ["\n", "# Late\n"]), max_bytes=20)
+        self.assertIsNone(title)
+        self.assertEqual(len(read), 2)
+
+
+class TestReadMetadata(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative_path, text):
+        path = os.path.join(self.tmp.name, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_reads_only_the_head(self):
+        path = self.write("big.md", "intro\n\n# Big\n\n" + "x" * 100000)
+        self.assertEqual(read_metadata(path, max_bytes=64), {"title": "Big"})
+        path = self.write("late.md", "x" * 100 + "\n# Too Late\n")
+        self.assertEqual(read_metadata(path, max_bytes=64), {"title": None})
+
+    def test_scan(self):
+        self.write("index.md", "# Home")
+        self.write("blog/post.md", PAGE)
+        self.write("blog/notes.txt", "# not a page")
+        for threads in (1, 4):
+            metadata = scan_metadata(self.tmp.name, threads=threads)
+            self.assertEqual(list(metadata), [os.path.join(self.tmp.name, "index.md"), os.path.join(self.tmp.name, "blog", "post.md")])
+            self.assertEqual(metadata[os.path.join(self.tmp.name, "blog", "post.md")]["tags"], ["tolkien", "essays"])
+
+    def test_scan_reports_every_bad_source_at_the_end(self):
+        self.write("a.md", "---\nnot a pair\n---\n# A")
+        self.write("b.md", "# B")
+        self.write("c.md", "---\ntitle: [x, y]\n---\n")
+        for threads in (1, 4):
+            with self.assertRaises(MetadataScanError) as ctx:
+                scan_metadata(self.tmp.name, threads=threads)
+            self.assertEqual([path for path, _ in ctx.exception.failures], [os.path.join(self.tmp.name, name) for name in ("a.md", "c.md")])
+            self.assertIn("invalid front matter line", str(ctx.exception))
+            self.assertEqual(list(ctx.exception.metadata), [os.path.join(self.tmp.name, "b.md")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from fs_util import sync
+from manifest import BuildManifest
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.source, "images"))
+        self.write(os.path.join(self.source, "index.css"), "body {}")
+        self.write(os.path.join(self.source, "images", "a.png"), "png")
+        self.manifest = BuildManifest()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def sync(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sync(self.source, self.dest, self.manifest, **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        self.assertEqual(self.sync(), (2, 0, 0))
+        with open(os.path.join(self.dest, "images", "a.png")) as f:
+            self.assertEqual(f.read(), "png")
+
+    def test_second_sync_copies_nothing(self):
+        self.sync()
+        self.assertEqual(self.sync(), (0, 2, 0))
+
+    def test_changed_file_is_recopied(self):
+        self.sync()
+        self.write(os.path.join(self.source, "index.css"), "body { margin: 0 }")
+        self.assertEqual(self.sync(), (1, 1, 0))
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body { margin: 0 }")
+
+    def test_deletes_only_files_removed_from_source(self):
+        self.sync()
+        generated = os.path.join(self.dest, "index.html")
+        self.write(generated, "<html></html>")
+        os.remove(os.path.join(self.source, "images", "a.png"))
+        self.assertEqual(self.sync(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(generated))
+
+    def test_checksum_skips_touched_but_identical_file(self):
+        self.sync(checksum=True)
+        css = os.path.join(self.source, "index.css")
+        stat = os.stat(css)
+        os.utime(css, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.sync(checksum=True), (0, 2, 0))
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns, stat.st_mtime_ns + 10**9)
+
+    def test_hardlink_mode_shares_inode(self):
+        self.sync(link="hardlink")
+        self.assertEqual(
+            os.stat(os.path.join(self.source, "index.css")).st_ino,
+            os.stat(os.path.join(self.dest, "index.css")).st_ino,
+        )
+
+    def test_reflink_mode_falls_back_to_copy(self):
+        self.sync(link="reflink")
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_invalid_link_mode(self):
+        with self.assertRaises(ValueError):
+            self.sync(link="symlink")
+
+
+if __name__ == "__main__":
+    unittest.main()
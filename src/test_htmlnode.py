@@ -80,6 +80,12 @@ class TestLeafNode(unittest.TestCase):
         with self.assertRaises(AttributeError):
             node.children = [LeafNode("span", "y")]
 
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("p", "x"), ParentNode("p", [LeafNode(None, "x")])):
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.extra = 1
+
 
 class TestParentNode(unittest.TestCase):
     def test_to_html_with_children(self):
@@ -96,6 +102,40 @@ class TestParentNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_render_into_streams_same_html(self):
+        tree = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+            LeafNode("a", "link", {"href": "/x"}),
+        ])
+        chunks = []
+        tree.render_into(chunks.append)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), tree.to_html())
+        self.assertEqual(tree.to_html(), '<div><p>a <b>bold</b></p><a href="/x">link</a></div>')
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode("span", "x")
+        for _ in range(5000):
+            node = ParentNode("b", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<b>" * 5000 + "<span>x</span>"))
+
+    def test_missing_tag_or_children_still_raise(self):
+        with self.assertRaises(ValueError):
+            ParentNode(None, [LeafNode(None, "x")]).to_html()
+        with self.assertRaises(ValueError):
+            ParentNode("div", []).to_html()
+        with self.assertRaises(ValueError):
+            ParentNode("div", [ParentNode("p", None)]).to_html()
+
+    def test_props_rules(self):
+        node = ParentNode("div", [LeafNode(None, "x")], props=None)
+        self.assertIsNone(node.props)
+        with self.assertRaises(AttributeError):
+            ParentNode("div", [LeafNode(None, "x")], props={"class": "x"})
+        with self.assertRaises(AttributeError):
+            node.props = {"class": "x"}
+
 
 if __name__ == "__main__":
     unittest.main()
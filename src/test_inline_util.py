@@ -1,12 +1,15 @@
 import unittest
 
+import inline_util
 from textnode import TextNode, TextType
 from inline_util import (
     text_node_to_html_node,
     split_nodes_delimiter,
     extract_markdown_images,
     extract_markdown_links,
+    extract_terms,
     extract_title,
+    is_plain_text,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
@@ -200,6 +203,10 @@ class TestExtractTitle(unittest.TestCase):
 		md = '# 123 title with numbers 456 '
 		self.assertEqual('123 title with numbers 456', extract_title(md))
 
+	def test_extract_title_only_uses_first_line(self):
+		md = '# Title\n\nSome body text\n\n## Section'
+		self.assertEqual('Title', extract_title(md))
+
 	def test_extract_title_with_special_characters(self):
 		md = '# title with *&^%$#@! characters'
 		self.assertEqual('title with *&^%$#@! characters', extract_title(md))
@@ -299,5 +306,84 @@ class TestTextToTextNodes(unittest.TestCase):
         )
 
 
+class TestSinglePassTokenizer(unittest.TestCase):
+    SAMPLES = [
+        "",
+        "plain text",
+        "This is **text** with an _italic_ word and a `code block`",
+        "a **b*** c*",
+        "before **** after",
+        "**bold with _underscore_ inside**",
+        "`code with **stars** and _underscores_`",
+        "![img](https://ex.com/a.png) then [link](https://ex.com) then **bold**",
+        "[a ![x](y) b](z)",
+        "mix __bold__ *it* _it_ **b** `c`",
+        "[spec](<https://specs.ex/1.0 draft.pdf> 'draft') and ![](<a b.png>)",
+        "Wow! An exclamation, no image",
+    ]
+    INVALID = [
+        "hello **bold",
+        "*a**b*",
+        "_a **b** c_",
+        "**a [l](u) b**",
+        "`[l](u)`",
+        "snake_case",
+    ]
+
+    def test_matches_legacy_pipeline(self):
+        for text in self.SAMPLES:
+            with self.subTest(text=text):
+                self.assertEqual(text_to_textnodes(text), text_to_textnodes(text, legacy=True))
+
+    def test_raises_where_legacy_raises(self):
+        for text in self.INVALID:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text, legacy=True)
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text)
+
+    def test_module_switch_selects_legacy_path(self):
+        previous = inline_util.USE_LEGACY_INLINE_PARSER
+        inline_util.USE_LEGACY_INLINE_PARSER = True
+        try:
+            node = TextNode("**b** link", TextType.LINK, "/x")
+            self.assertEqual(text_node_to_html_node(node).to_html(), '<a href="/x">**b** link</a>')
+        finally:
+            inline_util.USE_LEGACY_INLINE_PARSER = previous
+
+    def test_markup_inside_link_text_is_nested(self):
+        node = TextNode("**b** and `c`", TextType.LINK, "/x")
+        self.assertEqual(
+            text_node_to_html_node(node).to_html(),
+            '<a href="/x"><b>b</b> and <code>c</code></a>',
+        )
+
+    def test_unbalanced_link_text_stays_literal(self):
+        node = TextNode("snake_case", TextType.LINK, "/x")
+        self.assertEqual(text_node_to_html_node(node).to_html(), '<a href="/x">snake_case</a>')
+
+
+
+class TestPlainTextFastPath(unittest.TestCase):
+    def test_is_plain_text(self):
+        for text in ("", "plain text", "Wow! no markup here", "a (b) {c} <d>"):
+            self.assertTrue(is_plain_text(text), text)
+        for text in ("![a](b)", "[a](b)", "`c`", "**b**", "snake_case"):
+            self.assertFalse(is_plain_text(text), text)
+
+    def test_plain_text_is_one_text_node(self):
+        self.assertEqual(text_to_textnodes("just words"), [TextNode("just words", TextType.TEXT)])
+        self.assertEqual(text_to_textnodes(""), [])
+
+
+class TestExtractTerms(unittest.TestCase):
+    def test_words_without_markup_or_urls(self):
+        self.assertEqual(
+            extract_terms("# **Bold** _Élan_ see [the docs](https://example.com/docs) ![Logo](/img/logo.png) a 42 bold"),
+            {"bold", "élan", "see", "the", "docs", "logo", "42"},
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
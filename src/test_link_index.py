@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from block_util import block_links, markdown_to_html_node
+from link_index import LinkIndex, resolve_url
+from render_cache import RenderCache
+
+
+class TestResolveUrl(unittest.TestCase):
+    def test_internal_urls(self):
+        self.assertEqual(resolve_url("/images/a.png", "blog/post/index.html"), "images/a.png")
+        self.assertEqual(resolve_url("a.png", "blog/post/index.html"), "blog/post/a.png")
+        self.assertEqual(resolve_url("../other/", "blog/post/index.html"), "blog/other")
+        self.assertEqual(resolve_url("/", "blog/index.html"), "")
+        self.assertEqual(resolve_url("/../../x", "index.html"), "x")
+        self.assertEqual(resolve_url("/a%20b.png?v=1#top", "index.html"), "a b.png")
+
+    def test_external_and_anchor_urls(self):
+        for url in ("https://example.com/a", "mailto:me@example.com", "//cdn.example.com/x.js", "#section", ""):
+            self.assertIsNone(resolve_url(url, "index.html"), url)
+
+
+class TestLinkIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "public")
+        for path in ("index.html", "blog/index.html", "about.html", "images/a.png", "images/unused.jpg", "index.css"):
+            full_path = os.path.join(self.output, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write("x")
+        self.index = LinkIndex(os.path.join(self.tmp.name, "links.json"))
+        self.index.record("index.md", "index.html", [
+            ("link", "/blog/"), ("link", "/blog"), ("link", "/about"), ("link", "/missing"),
+            ("image", "/images/a.png"), ("link", "https://example.com"),
+        ])
+        self.index.record("blog/index.md", "blog/index.html", [("link", "../"), ("image", "b.png")])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_broken_links(self):
+        self.assertEqual(self.index.broken_links(self.output), [("blog/index.md", "b.png"), ("index.md", "/missing")])
+
+    def test_references_and_orphaned_images(self):
+        references = self.index.references()
+        self.assertEqual(references["images/a.png"], ["index.html"])
+        self.assertEqual(references[""], ["blog/index.html"])
+        self.assertEqual(self.index.orphaned_images(self.output), ["images/unused.jpg"])
+
+    def test_round_trip_and_prune(self):
+        self.index.save()
+        loaded = LinkIndex.load(self.index.path)
+        self.assertEqual(loaded.pages, self.index.pages)
+        loaded.prune(["index.md"])
+        self.assertEqual(list(loaded.pages), ["index.md"])
+        self.assertEqual(LinkIndex.load(os.path.join(self.tmp.name, "missing.json")).pages, {})
+
+
+class TestBlockLinks(unittest.TestCase):
+    def test_collects_links_and_images_in_order(self):
+        self.assertEqual(
+            block_links("see [a](/a) and ![b](/b.png)\nthen [c](<c d.html>)"),
+            [("link", "/a"), ("image", "/b.png"), ("link", "c d.html")],
+        )
+        self.assertEqual(block_links("no links"), [])
+
+    def test_code_blocks_have_no_links(self):
+        self.assertEqual(block_links("```\n[a](/a)\n```"), [])
+
+    def test_collected_while_parsing(self):
+        links = []
+        markdown_to_html_node("# T\n\n[a](/a)\n\n```\n[x](/x)\n```\n\n- ![i](/i.png)", "/base/", links=links)
+        self.assertEqual(links, [("link", "/a"), ("image", "/i.png")])
+
+    def test_collected_from_cached_blocks(self):
+        markdown = "> [a](/a)\n\n- x\n  - ![i](/i.png) [b](</b c>)"
+        cache = RenderCache()
+        for _ in range(2):
+            links = []
+            markdown_to_html_node(markdown, cache=cache, links=links)
+            self.assertEqual(links, [("link", "/a"), ("image", "/i.png"), ("link", "/b c")])
+        self.assertEqual(cache.hits, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
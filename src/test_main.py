@@ -0,0 +1,317 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+import main
+from main import PageGenerationError, generate_pages_recursive
+from front_matter import METADATA_BYTES, read_metadata
+from manifest import BuildManifest
+from profiling import BuildProfiler
+from render_cache import RenderCache
+from site_index import PageTable
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestGeneratePagesIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.manifest = BuildManifest(os.path.join(root, "manifest.json"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def build(self):
+        with self.assertLogs("ssg", level="DEBUG") as logs:
+            generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest)
+        return "\n".join(logs.output)
+
+    def test_second_build_skips_unchanged_pages(self):
+        first = self.build()
+        self.assertNotIn("Skipping", first)
+        second = self.build()
+        self.assertNotIn("Generating", second)
+        self.assertEqual(second.count("Skipping unchanged page"), 2)
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog v2")
+        log = self.build()
+        self.assertEqual(log.count("Generating page"), 1)
+        with open(os.path.join(self.public, "blog", "index.html")) as f:
+            self.assertIn("Blog v2", f.read())
+
+    def test_template_change_invalidates_all_pages(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        log = self.build()
+        self.assertEqual(log.count("Generating page"), 2)
+
+    def test_section_template_only_rebuilds_its_section(self):
+        self.build()
+        section_template = os.path.join(self.content, "blog", "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{% block body %}<body>{{ Content }}</body>{% endblock %}")
+        self.write(section_template, "{% extends %}{% block body %}<article>{{ Content }}</article>{% endblock %}")
+        self.build()
+        with open(os.path.join(self.public, "blog", "index.html")) as f:
+            self.assertEqual(f.read(), "<title>Blog</title><article><div><h1>Blog</h1></div></article>")
+
+        self.write(section_template, "{% extends %}{% block body %}<main>{{ Content }}</main>{% endblock %}")
+        log = self.build()
+        self.assertEqual(log.count("Generating page"), 1)
+        self.assertIn(f"using {section_template}", log)
+
+    def test_failed_write_is_reported_and_rebuilt_next_time(self):
+        os.makedirs(self.public)
+        blocker = os.path.join(self.public, "blog")
+        self.write(blocker, "a file where the page directory should be")
+        with self.assertRaises(PageGenerationError) as ctx:
+            self.build()
+        self.assertEqual([source for source, _ in ctx.exception.failures], [os.path.join(self.content, "blog", "index.md")])
+        self.assertNotIn(os.path.join(self.content, "blog", "index.md"), self.manifest.pages)
+        os.remove(blocker)
+        log = self.build()
+        self.assertEqual(log.count("Generating page"), 1)
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        log = self.build()
+        self.assertIn("Removed orphaned page", log)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_compression_only_adds_missing_gz_files(self):
+        self.build()
+        with self.assertLogs("ssg", level="DEBUG") as logs:
+            generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest, compress_level=6)
+        self.assertEqual("\n".join(logs.output).count("Generating page"), 2)
+        self.assertTrue(os.path.isfile(os.path.join(self.public, "blog", "index.html.gz")))
+        with self.assertLogs("ssg", level="DEBUG") as logs:
+            generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest, compress_level=6)
+        self.assertNotIn("Generating page", "\n".join(logs.output))
+
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+
+    def test_gz_is_never_older_than_its_page(self):
+        gz_path = os.path.join(self.public, "blog", "index.html.gz")
+        with self.assertLogs("ssg"):
+            generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest, compress_level=6)
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog v2")
+        for threshold in (main.STREAM_THRESHOLD, 0):
+            previous = main.STREAM_THRESHOLD
+            main.STREAM_THRESHOLD = threshold
+            try:
+                self.build()
+            finally:
+                main.STREAM_THRESHOLD = previous
+            self.assertFalse(os.path.exists(gz_path))
+        with self.assertLogs("ssg", level="DEBUG") as logs:
+            generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest, compress_level=6)
+        self.assertEqual("\n".join(logs.output).count("Generating page"), 2)
+        with gzip.open(gz_path) as f:
+            self.assertIn(b"Blog v2", f.read())
+
+
+class TestGeneratePagesParallel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        with open(self.template, "w") as f:
+            f.write(TEMPLATE)
+        for i in range(6):
+            page_dir = os.path.join(self.content, f"p{i}")
+            os.makedirs(page_dir)
+            with open(os.path.join(page_dir, "index.md"), "w") as f:
+                f.write(f"# Page {i}\n\nSome **bold** text {i}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, dest, jobs):
+        with self.assertLogs("ssg", level="DEBUG") as logs:
+            generate_pages_recursive(self.content, self.template, dest, "/", jobs=jobs)
+        return "\n".join(logs.output)
+
+    def test_parallel_output_and_log_match_serial(self):
+        serial_dest = os.path.join(self.tmp.name, "serial")
+        parallel_dest = os.path.join(self.tmp.name, "parallel")
+        serial_log = self.build(serial_dest, 1)
+        parallel_log = self.build(parallel_dest, 3)
+        self.assertEqual(serial_log.replace(serial_dest, ""), parallel_log.replace(parallel_dest, ""))
+        for i in range(6):
+            with open(os.path.join(serial_dest, f"p{i}", "index.html")) as a, \
+                    open(os.path.join(parallel_dest, f"p{i}", "index.html")) as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_profiler_collects_page_timings_from_workers(self):
+        profiler = BuildProfiler()
+        with self.assertLogs("ssg"):
+            generate_pages_recursive(self.content, self.template, os.path.join(self.tmp.name, "out"), "/", jobs=2, profiler=profiler)
+        self.assertEqual(profiler.counters["pages_built"], 6)
+        self.assertEqual(len(profiler.pages), 6)
+        self.assertGreater(profiler.counters["bytes_written"], profiler.counters["bytes_read"])
+        self.assertEqual(profiler.stages["page.parse"][1], 6)
+
+    def test_streamed_pages_match_in_memory_pages(self):
+        for i in range(6):
+            with open(os.path.join(self.content, f"p{i}", "index.md"), "a") as f:
+                f.write("\n\n```\ncode\n\nmore\n```\n\n- item [link](/x)\n")
+        in_memory = os.path.join(self.tmp.name, "in_memory")
+        streamed = os.path.join(self.tmp.name, "streamed")
+        self.build(in_memory, 1)
+        previous = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        try:
+            self.build(streamed, 1)
+        finally:
+            main.STREAM_THRESHOLD = previous
+        for i in range(6):
+            with open(os.path.join(in_memory, f"p{i}", "index.html")) as a, \
+                    open(os.path.join(streamed, f"p{i}", "index.html")) as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_streamed_title_must_be_near_the_top(self):
+        with open(os.path.join(self.content, "p0", "index.md"), "w") as f:
+            f.write("Intro\n\n" + "words " * METADATA_BYTES + "\n\n# Late")
+        previous = main.STREAM_THRESHOLD
+        main.STREAM_THRESHOLD = 0
+        try:
+            with self.assertLogs("ssg"), self.assertRaises(PageGenerationError) as ctx:
+                generate_pages_recursive(self.content, self.template, os.path.join(self.tmp.name, "out"), "/")
+        finally:
+            main.STREAM_THRESHOLD = previous
+        self.assertEqual(len(ctx.exception.failures), 1)
+        self.assertIn(f"h1 header not detected in the first {METADATA_BYTES} characters", str(ctx.exception))
+
+    def test_compressed_pages_match_pages(self):
+        outputs = []
+        for jobs, threshold in ((1, main.STREAM_THRESHOLD), (2, main.STREAM_THRESHOLD), (1, 0)):
+            dest = os.path.join(self.tmp.name, f"out{len(outputs)}")
+            previous = main.STREAM_THRESHOLD
+            main.STREAM_THRESHOLD = threshold
+            try:
+                with self.assertLogs("ssg"):
+                    generate_pages_recursive(self.content, self.template, dest, "/", jobs=jobs, compress_level=6)
+            finally:
+                main.STREAM_THRESHOLD = previous
+            outputs.append(dest)
+        for dest in outputs:
+            for i in range(6):
+                path = os.path.join(dest, f"p{i}", "index.html")
+                with open(path, "rb") as page, gzip.open(path + ".gz") as compressed:
+                    self.assertEqual(page.read(), compressed.read())
+
+    def test_front_matter_title_and_metadata(self):
+        with open(os.path.join(self.content, "p0", "index.md"), "w") as f:
+            f.write("---\ntitle: From Front Matter\ntags: [a]\n---\nNo heading, *just* text\n")
+        table = PageTable()
+        for threshold in (main.STREAM_THRESHOLD, 0):
+            dest = os.path.join(self.tmp.name, f"out{threshold}")
+            previous = main.STREAM_THRESHOLD
+            main.STREAM_THRESHOLD = threshold
+            try:
+                with self.assertLogs("ssg"):
+                    generate_pages_recursive(self.content, self.template, dest, "/", page_table=table)
+            finally:
+                main.STREAM_THRESHOLD = previous
+            with open(os.path.join(dest, "p0", "index.html")) as f:
+                self.assertEqual(f.read(), "<title>From Front Matter</title><body><div><p>No heading, <i>just</i> text</p></div></body>")
+            entry = table.pages[os.path.join(self.content, "p0", "index.md")]
+            self.assertEqual((entry["title"], entry["meta"]), ("From Front Matter", {"tags": ["a"]}))
+
+    def test_front_matter_title_that_is_not_a_string(self):
+        with open(os.path.join(self.content, "p0", "index.md"), "w") as f:
+            f.write("---\ntitle: true\n---\n# Heading\n")
+        with open(os.path.join(self.content, "p1", "index.md"), "w") as f:
+            f.write("---\ntitle: [a, b]\n---\n# Heading\n")
+        dest = os.path.join(self.tmp.name, "out")
+        with self.assertRaises(PageGenerationError) as ctx:
+            self.build(dest, 1)
+        self.assertEqual([source for source, _ in ctx.exception.failures], [os.path.join(self.content, "p1", "index.md")])
+        self.assertIn("ValueError: front matter title must be a single value", str(ctx.exception))
+        with open(os.path.join(dest, "p0", "index.html")) as f:
+            self.assertTrue(f.read().startswith("<title>true</title>"))
+
+    def test_title_from_a_later_heading_matches_the_metadata_scan(self):
+        source = os.path.join(self.content, "p0", "index.md")
+        with open(source, "w") as f:
+            f.write("Some intro\n\n# Late Title\n\ntext\n")
+        for threshold in (main.STREAM_THRESHOLD, 0):
+            dest = os.path.join(self.tmp.name, f"out{threshold}")
+            previous = main.STREAM_THRESHOLD
+            main.STREAM_THRESHOLD = threshold
+            try:
+                self.build(dest, 1)
+            finally:
+                main.STREAM_THRESHOLD = previous
+            with open(os.path.join(dest, "p0", "index.html")) as f:
+                self.assertTrue(f.read().startswith("<title>Late Title</title><body><div><p>Some intro</p>"))
+        self.assertEqual(read_metadata(source)["title"], "Late Title")
+
+    def test_comment_in_a_code_block_is_not_a_title(self):
+        source = os.path.join(self.content, "p2", "index.md")
+        with open(source, "w") as f:
+            f.write("Some intro\n\n```sh\n# install deps\nmake\n```\n")
+        for threshold in (main.STREAM_THRESHOLD, 0):
+            previous = main.STREAM_THRESHOLD
+            main.STREAM_THRESHOLD = threshold
+            try:
+                with self.assertRaises(PageGenerationError) as ctx:
+                    self.build(os.path.join(self.tmp.name, f"out{threshold}"), 1)
+            finally:
+                main.STREAM_THRESHOLD = previous
+            self.assertIn("h1 header not detected", str(ctx.exception))
+        self.assertIsNone(read_metadata(source)["title"])
+
+    def test_render_cache_output_matches_and_learns_from_workers(self):
+        plain = os.path.join(self.tmp.name, "plain")
+        cached = os.path.join(self.tmp.name, "cached")
+        self.build(plain, 1)
+        cache = RenderCache()
+        for jobs in (2, 1):
+            profiler = BuildProfiler()
+            with self.assertLogs("ssg"):
+                generate_pages_recursive(self.content, self.template, cached, "/", jobs=jobs, profiler=profiler, cache=cache)
+            for i in range(6):
+                with open(os.path.join(plain, f"p{i}", "index.html")) as a, \
+                        open(os.path.join(cached, f"p{i}", "index.html")) as b:
+                    self.assertEqual(a.read(), b.read())
+        # the workers' fragments were absorbed, so the serial rebuild only hit
+        self.assertEqual(len(cache.entries), 12)
+        self.assertEqual(profiler.counters["render_cache_hits"], 12)
+        self.assertEqual(profiler.counters["render_cache_misses"], 0)
+
+    def test_failing_page_is_reported_and_others_still_built(self):
+        with open(os.path.join(self.content, "p2", "index.md"), "w") as f:
+            f.write("no title here")
+        dest = os.path.join(self.tmp.name, "out")
+        with self.assertRaises(PageGenerationError) as ctx:
+            self.build(dest, 2)
+        self.assertEqual([source for source, _ in ctx.exception.failures], [os.path.join(self.content, "p2", "index.md")])
+        self.assertIn("h1 header not detected", str(ctx.exception))
+        self.assertFalse(os.path.exists(os.path.join(dest, "p2", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(dest, "p5", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
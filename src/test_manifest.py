@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from manifest import BuildManifest, GENERATOR_VERSION, hash_bytes, hash_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.output = os.path.join(self.root, "out", "page", "index.html")
+        os.makedirs(os.path.dirname(self.output))
+        with open(self.output, "w") as f:
+            f.write("<p>hi</p>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_file_matches_hash_bytes(self):
+        path = os.path.join(self.root, "a.md")
+        with open(path, "wb") as f:
+            f.write(b"# title")
+        self.assertEqual(hash_file(path), hash_bytes(b"# title"))
+
+    def test_fresh_only_when_all_inputs_match(self):
+        manifest = BuildManifest()
+        manifest.record("a.md", "s1", "t1", "/", self.output)
+        self.assertTrue(manifest.is_fresh("a.md", "s1", "t1", "/", self.output))
+        self.assertFalse(manifest.is_fresh("a.md", "s2", "t1", "/", self.output))
+        self.assertFalse(manifest.is_fresh("a.md", "s1", "t2", "/", self.output))
+        self.assertFalse(manifest.is_fresh("a.md", "s1", "t1", "/blog/", self.output))
+        self.assertFalse(manifest.is_fresh("b.md", "s1", "t1", "/", self.output))
+
+    def test_stale_reason(self):
+        manifest = BuildManifest()
+        self.assertEqual(manifest.stale_reason("a.md", "s1", "t1", "/", self.output), "new page")
+        manifest.record("a.md", "s1", "t1", "/", self.output, {"/a.css": "/a.1.css", "/b/": None})
+        assets = {"/a.css": "/a.1.css"}
+        self.assertIsNone(manifest.stale_reason("a.md", "s1", "t1", "/", self.output, assets))
+        self.assertEqual(manifest.stale_reason("a.md", "s2", "t1", "/", self.output, assets), "source changed")
+        self.assertEqual(manifest.stale_reason("a.md", "s1", "t2", "/", self.output, assets), "template changed")
+        self.assertEqual(manifest.stale_reason("a.md", "s1", "t1", "/", self.output, {"/a.css": "/a.2.css"}), "asset /a.css changed")
+        self.assertEqual(manifest.stale_reason("a.md", "s1", "t1", "/", self.output, assets, compress_level=9), "compression changed")
+        # a new asset at a url the page already used
+        assets["/b/"] = "/b.1/"
+        self.assertEqual(manifest.stale_reason("a.md", "s1", "t1", "/", self.output, assets), "asset /b/ changed")
+
+    def test_not_fresh_when_output_missing(self):
+        manifest = BuildManifest()
+        manifest.record("a.md", "s1", "t1", "/", self.output)
+        os.remove(self.output)
+        self.assertFalse(manifest.is_fresh("a.md", "s1", "t1", "/", self.output))
+
+    def test_not_fresh_after_generator_version_change(self):
+        manifest = BuildManifest()
+        manifest.record("a.md", "s1", "t1", "/", self.output)
+        manifest.pages["a.md"]["version"] = GENERATOR_VERSION + "-old"
+        self.assertFalse(manifest.is_fresh("a.md", "s1", "t1", "/", self.output))
+
+    def test_save_and_load_round_trip(self):
+        path = os.path.join(self.root, "cache", "manifest.json")
+        manifest = BuildManifest(path)
+        manifest.record("a.md", "s1", "t1", "/", self.output)
+        manifest.save()
+        loaded = BuildManifest.load(path)
+        self.assertEqual(loaded.pages, manifest.pages)
+
+    def test_load_missing_or_corrupt_starts_empty(self):
+        path = os.path.join(self.root, "manifest.json")
+        self.assertEqual(BuildManifest.load(path).pages, {})
+        with open(path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(BuildManifest.load(path).pages, {})
+
+    def test_prune_removes_orphaned_outputs_and_empty_dirs(self):
+        manifest = BuildManifest()
+        manifest.record("gone.md", "s1", "t1", "/", self.output)
+        out_root = os.path.join(self.root, "out")
+        removed = manifest.prune([], out_root)
+        self.assertEqual(removed, [self.output])
+        self.assertEqual(manifest.pages, {})
+        self.assertFalse(os.path.exists(os.path.dirname(self.output)))
+        self.assertTrue(os.path.isdir(out_root))
+
+    def test_prune_keeps_seen_sources(self):
+        manifest = BuildManifest()
+        manifest.record("a.md", "s1", "t1", "/", self.output)
+        self.assertEqual(manifest.prune(["a.md"], self.root), [])
+        self.assertTrue(os.path.exists(self.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from page_writer import DirectoryCache, PageWriter, write_file
+
+
+class TestWriteFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "a", "b", "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_creates_directories_and_writes(self):
+        self.assertTrue(write_file(self.path, "<p>é</p>"))
+        self.assertEqual(self.read(), "<p>é</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_identical_bytes_are_not_rewritten(self):
+        write_file(self.path, "<p>one</p>")
+        os.utime(self.path, ns=(1, 1))
+        self.assertFalse(write_file(self.path, "<p>one</p>"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1)
+        # same size, different bytes
+        self.assertTrue(write_file(self.path, "<p>two</p>"))
+        self.assertEqual(self.read(), "<p>two</p>")
+        self.assertNotEqual(os.stat(self.path).st_mtime_ns, 1)
+
+    def test_failed_write_leaves_no_temp_file(self):
+        write_file(self.path, "old")
+        with mock.patch("page_writer.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_file(self.path, "new")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+        self.assertEqual(self.read(), "old")
+
+    def test_gzip_sibling(self):
+        self.assertTrue(write_file(self.path, "<p>one</p>", compress_level=6))
+        with gzip.open(self.path + ".gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<p>one</p>")
+        os.utime(self.path + ".gz", ns=(1, 1))
+        self.assertFalse(write_file(self.path, "<p>one</p>", compress_level=6))
+        self.assertEqual(os.stat(self.path + ".gz").st_mtime_ns, 1)
+        # an unchanged page whose .gz is missing only gets its .gz back
+        os.remove(self.path + ".gz")
+        os.utime(self.path, ns=(1, 1))
+        self.assertTrue(write_file(self.path, "<p>one</p>", compress_level=6))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1)
+        self.assertTrue(os.path.isfile(self.path + ".gz"))
+
+    def test_directory_cache_creates_once(self):
+        directories = DirectoryCache()
+        write_file(self.path, "x", directories)
+        self.assertEqual(directories.created, {os.path.dirname(self.path)})
+
+
+class TestPageWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, i):
+        return os.path.join(self.tmp.name, f"p{i % 7}", f"{i}.html")
+
+    def test_writes_everything_before_wait_returns(self):
+        for threads in (0, 1, 4):
+            with self.subTest(threads=threads):
+                writer = PageWriter(threads, max_pending=3)
+                for i in range(50):
+                    writer.submit(self.path(i), f"page {i} threads {threads}")
+                self.assertEqual(writer.close(), [])
+                self.assertEqual((writer.written, writer.unchanged), (50, 0))
+                for i in range(50):
+                    with open(self.path(i)) as f:
+                        self.assertEqual(f.read(), f"page {i} threads {threads}")
+
+    def test_counts_unchanged_pages(self):
+        with PageWriter(2) as writer:
+            writer.submit(self.path(0), "same")
+        with PageWriter(2) as writer:
+            writer.submit(self.path(0), "same")
+            writer.submit(self.path(1), "new")
+        self.assertEqual((writer.written, writer.unchanged), (1, 1))
+
+    def test_failures_are_reported_by_key(self):
+        blocker = os.path.join(self.tmp.name, "file")
+        with open(blocker, "w") as f:
+            f.write("not a directory")
+        for threads in (0, 2):
+            writer = PageWriter(threads)
+            writer.submit(os.path.join(blocker, "index.html"), "x", key="blocked.md")
+            writer.submit(self.path(0), "fine")
+            failures = writer.close()
+            self.assertEqual([key for key, _ in failures], ["blocked.md"])
+            self.assertEqual(writer.written + writer.unchanged, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from profiling import NULL_PROFILER, BuildProfiler
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_stage_accumulates_time_and_count(self):
+        profiler = BuildProfiler()
+        with profiler.stage("scan"):
+            pass
+        with profiler.stage("scan"):
+            pass
+        seconds, count = profiler.stages["scan"]
+        self.assertEqual(count, 2)
+        self.assertGreaterEqual(seconds, 0)
+
+    def test_stage_records_time_even_when_raising(self):
+        profiler = BuildProfiler()
+        with self.assertRaises(RuntimeError):
+            with profiler.stage("copy"):
+                raise RuntimeError()
+        self.assertIn("copy", profiler.stages)
+
+    def test_add_page_feeds_stages_counters_and_slowest(self):
+        profiler = BuildProfiler()
+        profiler.add_page("a.md", {"read": 0.1, "parse": 0.2, "bytes_read": 10, "bytes_written": 30})
+        profiler.add_page("b.md", {"read": 0.5, "parse": 0.5, "bytes_read": 5, "bytes_written": 7})
+        self.assertEqual(profiler.counters["bytes_read"], 15)
+        self.assertEqual(profiler.counters["bytes_written"], 37)
+        self.assertEqual(profiler.stages["page.parse"][1], 2)
+        self.assertEqual([page[0] for page in profiler.slowest_pages(1)], ["b.md"])
+
+    def test_write_json_and_csv_reports(self):
+        profiler = BuildProfiler()
+        profiler.count("pages_built", 2)
+        profiler.add_page("a.md", {"parse": 0.1, "bytes_read": 1, "bytes_written": 2})
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "report.json")
+            csv_path = os.path.join(tmp, "report.csv")
+            profiler.write_report(json_path)
+            profiler.write_report(csv_path)
+            with open(json_path) as f:
+                report = json.load(f)
+            with open(csv_path, newline="") as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(report["counters"]["pages_built"], 2)
+        self.assertEqual(report["slowest_pages"][0]["source"], "a.md")
+        self.assertEqual(rows[0], ["kind", "name", "seconds", "count", "bytes_read", "bytes_written"])
+        self.assertIn(["page", "a.md", "0.100000", "1", "1", "2"], rows)
+
+
+class TestNullProfiler(unittest.TestCase):
+    def test_null_profiler_accepts_everything(self):
+        self.assertFalse(NULL_PROFILER.enabled)
+        with NULL_PROFILER.stage("anything"):
+            NULL_PROFILER.count("x")
+            NULL_PROFILER.add_page("a.md", {"parse": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+import render_cache
+from block_util import markdown_to_html_node, render_markdown_into
+from render_cache import RenderCache
+
+
+MARKDOWN = "# Title\n\nSome **bold** [link](/a)\n\n- one\n- two\n\nSome **bold** [link](/a)"
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_output_matches_uncached(self):
+        cache = RenderCache()
+        expected = markdown_to_html_node(MARKDOWN, "/base/").to_html()
+        self.assertEqual(markdown_to_html_node(MARKDOWN, "/base/", cache).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(MARKDOWN, "/base/", cache).to_html(), expected)
+        chunks = []
+        render_markdown_into(MARKDOWN.splitlines(keepends=True), chunks.append, "/base/", cache)
+        self.assertEqual("".join(chunks), expected)
+
+    def test_counts_hits_and_misses(self):
+        cache = RenderCache()
+        markdown_to_html_node(MARKDOWN, "/", cache)
+        # the repeated paragraph is a hit on the first render already
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        markdown_to_html_node(MARKDOWN, "/", cache)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_base_path_is_part_of_the_key(self):
+        cache = RenderCache()
+        markdown_to_html_node("[link](/a)", "/", cache)
+        html = markdown_to_html_node("[link](/a)", "/blog/", cache).to_html()
+        self.assertIn('href="/blog/a"', html)
+        self.assertEqual(cache.misses, 2)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = RenderCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        cache.get("a")
+        cache.put("c", "<p>c</p>")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_added_keys_are_only_tracked_for_workers(self):
+        cache = RenderCache(max_entries=10)
+        for i in range(5000):
+            cache.put(str(i), "<p>x</p>")
+        self.assertEqual((len(cache.entries), len(cache._added)), (10, 0))
+        self.assertEqual(cache.drain(), (0, 0, []))
+
+    def test_drain_and_absorb(self):
+        worker = RenderCache(track_added=True)
+        markdown_to_html_node("one\n\ntwo", "/", worker)
+        delta = worker.drain()
+        self.assertEqual((worker.hits, worker.misses), (0, 0))
+        self.assertEqual(worker.drain(), (0, 0, []))
+        build = RenderCache()
+        build.absorb(delta)
+        self.assertEqual((build.hits, build.misses), (0, 2))
+        self.assertEqual(build.entries, worker.entries)
+
+
+class TestRenderCachePersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache", "render.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_keeps_order(self):
+        cache = RenderCache(path=self.path)
+        markdown_to_html_node(MARKDOWN, "/", cache)
+        cache.save()
+        loaded = RenderCache.load(self.path)
+        self.assertEqual(list(loaded.entries.items()), list(cache.entries.items()))
+        markdown_to_html_node(MARKDOWN, "/", loaded)
+        self.assertEqual(loaded.misses, 0)
+
+    def test_load_keeps_most_recent_entries(self):
+        cache = RenderCache(path=self.path)
+        for key in "abc":
+            cache.put(key, key)
+        cache.save()
+        self.assertEqual(list(RenderCache.load(self.path, max_entries=2).entries), ["b", "c"])
+
+    def test_missing_corrupt_or_old_cache_starts_empty(self):
+        self.assertEqual(len(RenderCache.load(self.path).entries), 0)
+        cache = RenderCache(path=self.path)
+        cache.put("a", "<p>a</p>")
+        cache.save()
+        previous = render_cache.GENERATOR_VERSION
+        render_cache.GENERATOR_VERSION = previous + "-new"
+        try:
+            self.assertEqual(len(RenderCache.load(self.path).entries), 0)
+        finally:
+            render_cache.GENERATOR_VERSION = previous
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertEqual(len(RenderCache.load(self.path).entries), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
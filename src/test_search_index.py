@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from search_index import SearchIndex, shard_postings, write_search_index
+
+
+def own_shard(shards, term):
+    # the loader's rule: a term lives in the shard with the longest prefix of it
+    return max((prefix for prefix in shards if term.startswith(prefix)), key=len)
+
+
+class TestShardPostings(unittest.TestCase):
+    def setUp(self):
+        self.postings = {f"{a}{b}{c}": [1, 4, 9] for a in "abc" for b in "xyz" for c in ("", "q", "qq")}
+
+    def test_one_shard_per_first_letter_when_small(self):
+        shards = shard_postings(self.postings)
+        self.assertEqual(sorted(shards), ["a", "b", "c"])
+        self.assertEqual(shards["a"]["ax"], [1, 3, 5])
+
+    def test_split_shards_follow_the_longest_prefix_rule(self):
+        shards = shard_postings(self.postings, max_shard_bytes=40)
+        self.assertGreater(len(shards), 9)
+        found = {}
+        for prefix, shard in shards.items():
+            for term in shard:
+                self.assertTrue(term.startswith(prefix))
+                self.assertEqual(own_shard(shards, term), prefix, term)
+                found[term] = prefix
+        self.assertEqual(sorted(found), sorted(self.postings))
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = SearchIndex(os.path.join(self.tmp.name, "search.json"))
+        self.index.record("b.md", "b/index.html", "Second Page", {"tolkien", "hobbit"})
+        self.index.record("a.md", "index.html", "Home", {"tolkien"})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.tmp.name, "public", "search", name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_invert(self):
+        pages, postings = self.index.invert("/x/")
+        self.assertEqual(pages, [["/x/", "Home"], ["/x/b/", "Second Page"]])
+        self.assertEqual(postings["tolkien"], [0, 1])
+        self.assertEqual(postings["second"], [1])
+
+    def test_write_and_reload(self):
+        output = os.path.join(self.tmp.name, "public")
+        self.assertEqual(write_search_index(self.index, output), 7)
+        index = self.read("index.json")
+        self.assertEqual(index["shards"]["t"], "74.json")
+        self.assertEqual(self.read("74.json"), {"tolkien": [0, 1]})
+        self.assertEqual(write_search_index(self.index, output), 0)
+
+        self.index.forget("b.md")
+        self.index.save()
+        reloaded = SearchIndex.load(self.index.path)
+        self.assertEqual(list(reloaded.pages), ["a.md"])
+        write_search_index(reloaded, output)
+        self.assertEqual(sorted(os.listdir(os.path.join(output, "search"))), ["68.json", "74.json", "index.json", "pages.json", "search.js"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+from server import SiteWatcher, make_server
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.public)
+        with self.assertLogs("ssg"):
+            self.watcher.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, *parts):
+        with open(os.path.join(self.public, *parts), encoding="utf-8") as f:
+            return f.read()
+
+    def test_no_changes_nothing_to_do(self):
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertEqual(self.watcher.rebuild(set()), 0)
+
+    def test_edited_page_is_the_only_one_rebuilt(self):
+        source = os.path.join(self.content, "blog", "index.md")
+        self.write(source, "# Blog edited")
+        changed = self.watcher.poll()
+        self.assertEqual(changed, {source})
+        with self.assertLogs("ssg") as logs:
+            self.assertEqual(self.watcher.rebuild(changed), 1)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Blog edited", self.read("blog", "index.html"))
+
+    def test_template_change_rebuilds_every_page(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        with self.assertLogs("ssg"):
+            self.watcher.rebuild(self.watcher.poll())
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+        self.assertTrue(self.read("blog", "index.html").startswith("<h1>Blog</h1>"))
+
+    def test_section_template_is_used_for_its_pages(self):
+        self.write(os.path.join(self.content, "blog", "template.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+        with self.assertLogs("ssg"):
+            self.watcher.rebuild(self.watcher.poll())
+        self.assertTrue(self.read("blog", "index.html").startswith("<h2>Blog</h2>"))
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog edited")
+        with self.assertLogs("ssg"):
+            self.assertEqual(self.watcher.rebuild(self.watcher.poll()), 1)
+        self.assertTrue(self.read("blog", "index.html").startswith("<h2>Blog edited</h2>"))
+        self.assertTrue(self.read("index.html").startswith("<title>Home</title>"))
+
+    def test_layout_outside_the_tree_is_watched(self):
+        layout = os.path.join(self.tmp.name, "layout.html")
+        self.write(layout, "<main>{% block main %}{% endblock %}</main>")
+        self.write(os.path.join(self.content, "blog", "template.html"), '{% extends "../../layout.html" %}{% block main %}{{ Content }}{% endblock %}')
+        with self.assertLogs("ssg"):
+            self.watcher.rebuild(self.watcher.poll())
+        self.assertTrue(self.read("blog", "index.html").startswith("<main>"))
+        self.assertEqual(self.watcher.poll(), set())
+
+        self.write(layout, "<article>{% block main %}{% endblock %}</article>")
+        os.utime(layout, ns=(1, 1))
+        changed = self.watcher.poll()
+        self.assertIn(os.path.normpath(layout), changed)
+        with self.assertLogs("ssg"):
+            self.watcher.rebuild(changed)
+        self.assertTrue(self.read("blog", "index.html").startswith("<article>"))
+        self.assertTrue(self.read("index.html").startswith("<title>Home</title>"))
+
+    def test_static_change_is_synced(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        with self.assertLogs("ssg"):
+            self.watcher.rebuild(self.watcher.poll())
+        self.assertEqual(self.read("index.css"), "body { margin: 0 }")
+
+    def test_deleted_page_output_is_removed(self):
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        with self.assertLogs("ssg"):
+            self.watcher.rebuild(self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_broken_page_is_logged_not_raised(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        with self.assertLogs("ssg", level="ERROR"):
+            self.assertEqual(self.watcher.rebuild(self.watcher.poll()), 0)
+
+
+class TestServer(unittest.TestCase):
+    def test_serves_output_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "index.html"), "w") as f:
+                f.write("<p>hello</p>")
+            server = make_server(tmp, port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                url = f"http://127.0.0.1:{server.server_address[1]}/"
+                with urllib.request.urlopen(url) as response:
+                    self.assertEqual(response.read(), b"<p>hello</p>")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
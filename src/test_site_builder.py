@@ -0,0 +1,270 @@
+import os
+import tempfile
+import unittest
+
+from render_cache import RenderCache
+from site_builder import Site, SiteBuilder
+
+
+class TestSiteBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def make_site(self, name, pages, base_path="/"):
+        site_dir = os.path.join(self.root, name)
+        for relative_path, markdown in pages.items():
+            self.write(os.path.join(site_dir, "content", relative_path), markdown)
+        self.write(os.path.join(site_dir, "static", "index.css"), "body {}")
+        self.write(os.path.join(site_dir, "template.html"), '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+        return Site(
+            os.path.join(site_dir, "content"),
+            os.path.join(site_dir, "template.html"),
+            os.path.join(site_dir, "public"),
+            os.path.join(site_dir, "static"),
+            base_path,
+        )
+
+    def read(self, site, relative_path):
+        with open(os.path.join(site.output_dir, relative_path), encoding="utf-8") as f:
+            return f.read()
+
+    def test_builds_many_sites_and_rebuilds_incrementally(self):
+        builder = SiteBuilder()
+        blog = self.make_site("blog", {"index.md": "# Blog", "post/index.md": "# Post\n\n[home](/)"}, "/blog/")
+        docs = self.make_site("docs", {"index.md": "# Docs"})
+        with self.assertLogs("ssg"):
+            first = builder.build(blog)
+            builder.build(docs)
+        self.assertTrue(first.ok)
+        self.assertEqual((first.pages_built, first.pages_skipped, first.static_copied), (2, 0, 1))
+        self.assertIn('href="/blog/"', self.read(blog, "post/index.html"))
+        self.assertIn('href="/blog/index.css"', self.read(blog, "index.html"))
+        self.assertIn("<title>Docs</title>", self.read(docs, "index.html"))
+
+        self.write(os.path.join(blog.content_dir, "index.md"), "# Blog v2")
+        with self.assertLogs("ssg"):
+            second = builder.build(blog)
+        self.assertEqual((second.pages_built, second.pages_skipped, second.static_unchanged), (1, 1, 1))
+        self.assertIn("Blog v2", self.read(blog, "index.html"))
+
+    def test_template_is_compiled_once_until_it_changes(self):
+        builder = SiteBuilder()
+        site = self.make_site("site", {"index.md": "# Home"})
+        with self.assertLogs("ssg"):
+            builder.build(site)
+        template = builder.template(site.template_path, "/")
+        with self.assertLogs("ssg"):
+            builder.build(site)
+        self.assertIs(builder.template(site.template_path, "/"), template)
+        self.write(site.template_path, "<h1>{{ Title }}</h1>{{ Content }}")
+        os.utime(site.template_path, ns=(1, 1))
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        self.assertIsNot(builder.template(site.template_path, "/"), template)
+        self.assertEqual(result.pages_built, 1)
+        self.assertEqual(self.read(site, "index.html"), "<h1>Home</h1><div><h1>Home</h1></div>")
+
+    def test_sync_without_incremental_removes_deleted_pages(self):
+        builder = SiteBuilder(incremental=False, sync=True, check_links=True)
+        site = self.make_site("site", {"index.md": "# Home\n\n[contact](/contact/)", "contact/index.md": "# Contact"})
+        with self.assertLogs("ssg"):
+            builder.build(site)
+        os.remove(os.path.join(site.content_dir, "contact", "index.md"))
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        self.assertEqual((result.pages_built, result.pages_skipped, result.pages_removed), (1, 0, 1))
+        self.assertFalse(os.path.exists(os.path.join(site.output_dir, "contact")))
+        self.assertEqual(result.broken_links, [(os.path.join(site.content_dir, "index.md"), "/contact/")])
+
+    def test_layout_changes_recompile_the_template(self):
+        builder = SiteBuilder()
+        site = self.make_site("site", {"index.md": "# Home"})
+        layout = os.path.join(self.root, "site", "layout.html")
+        self.write(layout, "<main>{% block main %}{% endblock %}</main>")
+        self.write(site.template_path, '{% extends "layout.html" %}{% block main %}{{ Content }}{% endblock %}')
+        with self.assertLogs("ssg"):
+            builder.build(site)
+        self.assertEqual(self.read(site, "index.html"), "<main><div><h1>Home</h1></div></main>")
+        self.write(layout, "<article>{% block main %}{% endblock %}</article>")
+        os.utime(layout, ns=(1, 1))
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        self.assertEqual(result.pages_built, 1)
+        self.assertEqual(self.read(site, "index.html"), "<article><div><h1>Home</h1></div></article>")
+
+    def test_worker_processes_are_kept_between_builds(self):
+        site = self.make_site("site", {f"p{i}.md": f"# Page {i}" for i in range(4)})
+        with SiteBuilder(jobs=2, incremental=False, render_cache=RenderCache()) as builder:
+            with self.assertLogs("ssg"):
+                builder.build(site)
+            executor = builder.executor
+            self.write(os.path.join(site.content_dir, "p0.md"), "# Changed")
+            with self.assertLogs("ssg"):
+                result = builder.build(site)
+            self.assertIs(builder.executor, executor)
+            self.assertEqual(result.pages_built, 4)
+            self.assertIn("<title>Changed</title>", self.read(site, "p0.html"))
+        self.assertIsNone(builder.executor)
+
+    def test_failures_are_returned_not_raised(self):
+        builder = SiteBuilder(render_cache=RenderCache())
+        site = self.make_site("site", {"index.md": "# Home", "bad.md": "no title"})
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        self.assertFalse(result.ok)
+        self.assertEqual([source for source, _ in result.failures], [os.path.join(site.content_dir, "bad.md")])
+        self.assertEqual(result.pages_built, 1)
+        self.assertGreater(result.seconds, 0)
+
+    def test_manifest_is_persisted_when_given_a_path(self):
+        site = self.make_site("site", {"index.md": "# Home"})
+        site.manifest_path = os.path.join(self.root, "site", ".build", "manifest.json")
+        site.links_path = os.path.join(self.root, "site", ".build", "links.json")
+        site.pages_path = os.path.join(self.root, "site", ".build", "pages.json")
+        with self.assertLogs("ssg"):
+            SiteBuilder().build(site)
+            result = SiteBuilder().build(site)
+        self.assertEqual((result.pages_built, result.pages_skipped), (0, 1))
+        # indexes are only kept for the features that need them
+        self.assertFalse(os.path.exists(site.links_path))
+        self.assertFalse(os.path.exists(site.pages_path))
+
+        site.links_path = None
+        with self.assertLogs("ssg"):
+            SiteBuilder(check_links=True).build(site)
+            # an in-memory link index is empty in a new builder: the page is generated again to index it
+            self.assertEqual(SiteBuilder(check_links=True).build(site).pages_built, 1)
+        site.links_path = os.path.join(self.root, "site", ".build", "links.json")
+        with self.assertLogs("ssg"):
+            SiteBuilder(check_links=True).build(site)
+            result = SiteBuilder(check_links=True).build(site)
+        self.assertEqual((result.pages_built, result.pages_skipped), (0, 1))
+        self.assertTrue(os.path.isfile(site.links_path))
+        with self.assertLogs("ssg"):
+            SiteBuilder().build(site)
+        self.assertFalse(os.path.exists(site.links_path))
+
+    def test_check_links(self):
+        site = self.make_site("site", {
+            "index.md": "# Home\n\n[post](/post) [missing](/nope) ![logo](/images/logo.png)",
+            "post/index.md": "# Post\n\n[up](../) [ext](https://example.com) ![gone](pic.png)",
+        })
+        self.write(os.path.join(site.static_dir, "images", "logo.png"), "png")
+        self.write(os.path.join(site.static_dir, "images", "unused.png"), "png")
+        with self.assertLogs("ssg"):
+            result = SiteBuilder(check_links=True).build(site)
+        self.assertEqual(result.broken_links, [
+            (os.path.join(site.content_dir, "index.md"), "/nope"),
+            (os.path.join(site.content_dir, "post", "index.md"), "pic.png"),
+        ])
+        self.assertEqual(result.orphaned_images, ["images/unused.png"])
+
+    def test_search(self):
+        site = self.make_site("site", {"index.md": "# Home\n\nHobbits", "post/index.md": "# Post\n\nMore **hobbits**"})
+        site.search_path = os.path.join(self.root, "site", ".build", "search.json")
+        builder = SiteBuilder(search=True, compress_level=6)
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        self.assertEqual(result.search_written, 6)
+        self.assertIn('"hobbits":[0,1]', self.read(site, "search/68.json"))
+        self.assertTrue(os.path.isfile(os.path.join(site.output_dir, "search", "68.json.gz")))
+        self.assertTrue(os.path.isfile(site.search_path))
+        with self.assertLogs("ssg"):
+            second = builder.build(site)
+        self.assertEqual((second.pages_skipped, second.search_written), (2, 0))
+
+        # an index that is no longer kept up to date is dropped, and so is what was published of it
+        with self.assertLogs("ssg"):
+            SiteBuilder().build(site)
+        self.assertFalse(os.path.exists(site.search_path))
+        self.assertFalse(os.path.exists(os.path.join(site.output_dir, "search")))
+
+    def test_indexes(self):
+        site = self.make_site("site", {
+            "index.md": "# Home",
+            "blog/a/index.md": "# Post <A>",
+            "blog/b.md": "# Post B",
+        }, "/x/")
+        builder = SiteBuilder(indexes=True, site_url="https://example.com/")
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        self.assertEqual(result.indexes_written, 3)
+        listing = self.read(site, "blog/index.html")
+        self.assertIn("<title>Blog</title>", listing)
+        self.assertIn('<a href="/x/blog/a/">Post &lt;A&gt;</a>', listing)
+        self.assertIn('<a href="/x/blog/b.html">Post B</a>', listing)
+        self.assertIn("<loc>https://example.com/x/blog/</loc>", self.read(site, "sitemap.xml"))
+        feed = self.read(site, "feed.xml")
+        self.assertIn("<title>Home</title>", feed)
+        self.assertEqual(feed.count("<entry>"), 2)
+
+        # unchanged pages keep their rows; a directory that gets its own page loses its listing
+        # (the sitemap lists the same urls, so only the feed is rewritten)
+        self.write(os.path.join(site.content_dir, "blog", "index.md"), "# My blog")
+        with self.assertLogs("ssg"):
+            second = builder.build(site)
+        self.assertEqual((second.pages_built, second.pages_skipped, second.indexes_written), (1, 3, 1))
+        self.assertIn("<title>My blog</title>", self.read(site, "blog/index.html"))
+        self.assertEqual(builder.page_table(site).listings, [])
+
+    def test_listings_use_their_section_template(self):
+        site = self.make_site("site", {"index.md": "# Home", "blog/a.md": "# A"})
+        self.write(os.path.join(site.content_dir, "blog", "template.html"), "<aside>{{ Title }}</aside>{{ Content }}")
+        with self.assertLogs("ssg"):
+            SiteBuilder(indexes=True).build(site)
+        self.assertTrue(self.read(site, "blog/a.html").startswith("<aside>A</aside>"))
+        self.assertTrue(self.read(site, "blog/index.html").startswith("<aside>Blog</aside>"))
+
+    def test_fingerprint(self):
+        site = self.make_site("site", {"index.md": "# Home\n\n![logo](/images/logo.png)"}, "/x/")
+        self.write(os.path.join(site.static_dir, "images", "logo.png"), "png")
+        builder = SiteBuilder(fingerprint=True, check_links=True)
+        with self.assertLogs("ssg"):
+            result = builder.build(site)
+        css, logo = result.assets["/x/index.css"], result.assets["/x/images/logo.png"]
+        html = self.read(site, "index.html")
+        self.assertIn(f'href="{css}"', html)
+        self.assertIn(f'src="{logo}"', html)
+        self.assertTrue(os.path.isfile(os.path.join(site.output_dir, css[3:] + ".gz")))
+        self.assertEqual((result.assets_built, result.broken_links, result.orphaned_images), (2, [], []))
+
+        self.write(os.path.join(site.static_dir, "index.css"), "body { margin: 0 }")
+        with self.assertLogs("ssg"):
+            second = builder.build(site)
+        self.assertEqual((second.assets_built, second.pages_built), (1, 1))
+        self.assertIn(f'href="{second.assets["/x/index.css"]}"', self.read(site, "index.html"))
+
+
+    def test_asset_changes_rebuild_only_the_pages_that_use_them(self):
+        site = self.make_site("site", {"index.md": "# Home\n\n![logo](/images/logo.png)", "about.md": "# About\n\n[top](/)"})
+        self.write(os.path.join(site.static_dir, "images", "logo.png"), "png")
+        builder = SiteBuilder(fingerprint=True, explain=True)
+        with self.assertLogs("ssg"):
+            builder.build(site)
+
+        self.write(os.path.join(site.static_dir, "images", "logo.png"), "png v2")
+        with self.assertLogs("ssg") as logs:
+            second = builder.build(site)
+        self.assertEqual((second.pages_built, second.pages_skipped), (1, 1))
+        self.assertIn(f"Generating {os.path.join(site.content_dir, 'index.md')}: asset /images/logo.png changed", "\n".join(logs.output))
+        self.assertIn(second.assets["/images/logo.png"], self.read(site, "index.html"))
+
+        # every page depends on the assets its template references
+        self.write(os.path.join(site.static_dir, "index.css"), "body { margin: 0 }")
+        with self.assertLogs("ssg") as logs:
+            third = builder.build(site)
+        self.assertEqual((third.pages_built, third.pages_skipped), (2, 0))
+        self.assertIn("asset /index.css changed", "\n".join(logs.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from site_index import FEED_ENTRIES, PageTable, page_time, page_url, render_feed
+
+
+class TestPageTable(unittest.TestCase):
+    def setUp(self):
+        self.table = PageTable()
+        self.table.record("index.md", "index.html", "Home", 1)
+        self.table.record("blog/old.md", "blog/old.html", "Old", 1_000_000_000)
+        self.table.record("blog/new/index.md", "blog/new/index.html", "New", 2_000_000_000)
+        self.table.record("docs/index.md", "docs/index.html", "Docs", 3)
+        self.table.record("docs/guide/index.md", "docs/guide/index.html", "Guide", 4)
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/x/"), "/x/")
+        self.assertEqual(page_url("blog/new/index.html", "/x/"), "/x/blog/new/")
+        self.assertEqual(page_url("blog/old.html"), "/blog/old.html")
+
+    def test_sections_are_directories_without_a_page(self):
+        sections = self.table.sections()
+        self.assertEqual(list(sections), ["blog"])
+        self.assertEqual([entry["title"] for entry in sections["blog"]], ["New", "Old"])
+
+    def test_front_matter_date_orders_pages(self):
+        self.table.record("blog/older.md", "blog/older.html", "Dated", 5_000_000_000, {"date": "1970-01-01"})
+        self.assertEqual(page_time(self.table.pages["blog/older.md"]), 0)
+        self.assertEqual(page_time({"mtime": 7, "meta": {"date": "not a date"}}), 7)
+        self.assertEqual(page_time({"mtime": 7, "meta": {"date": "1970-01-01T00:00:01+00:00"}}), 1_000_000_000)
+        self.assertEqual([entry["title"] for entry in self.table.sections()["blog"]], ["New", "Old", "Dated"])
+
+    def test_prune(self):
+        self.table.prune(["index.md"])
+        self.assertEqual(list(self.table.pages), ["index.md"])
+
+    def test_feed(self):
+        for i in range(FEED_ENTRIES + 5):
+            self.table.record(f"p{i}.md", f"p{i}.html", f"Page {i}", 10 + i)
+        feed = render_feed(self.table, "https://example.com", "/")
+        self.assertIn("<title>Home</title>", feed)
+        self.assertEqual(feed.count("<entry>"), FEED_ENTRIES)
+        self.assertLess(feed.index("<title>New</title>"), feed.index("<title>Old</title>"))
+        self.assertIn("<updated>1970-01-01T00:00:02Z</updated>", feed)
+
+
+if __name__ == "__main__":
+    unittest.main()
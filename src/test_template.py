@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+
+from block_util import markdown_to_html_node
+from template import Template, TemplateSet, apply_layouts, rewrite_root_urls
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compiles_into_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(template.render(Title="Hi", Content="<p>x</p>"), "<title>Hi</title><p>x</p>")
+
+    def test_missing_value_keeps_placeholder(self):
+        template = Template("{{ Title }} {{ Author }}")
+        self.assertEqual(template.render(Title="Hi"), "Hi {{ Author }}")
+
+    def test_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render(Title="a"), "a|a")
+
+    def test_base_path_rewrites_template_urls_once(self):
+        template = Template('<link href="/index.css" /><img src="/logo.png" />{{ Content }}', "/blog/")
+        self.assertEqual(
+            template.render(Content='<a href="/raw">'),
+            '<link href="/blog/index.css" /><img src="/blog/logo.png" /><a href="/raw">',
+        )
+
+    def test_render_into_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}{{ Footer }}")
+        node = markdown_to_html_node("hello **world**")
+        chunks = []
+        template.render_into(chunks.append, Title="Hi", Content=node)
+        self.assertEqual(
+            "".join(chunks),
+            template.render(Title="Hi", Content=node.to_html()),
+        )
+
+    def test_hash_depends_on_source_only(self):
+        self.assertEqual(Template("{{ Title }}", "/").hash, Template("{{ Title }}", "/x/").hash)
+        self.assertNotEqual(Template("{{ Title }}").hash, Template("{{ Content }}").hash)
+
+
+class TestLayouts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.default = os.path.join(self.tmp.name, "template.html")
+        self.write(self.default, "<nav>{% block nav %}site{% endblock %}</nav><main>{% block main %}{{ Content }}{% endblock %}</main>")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "docs", "template.html"), '{% extends %}{% block nav %}docs{% endblock %}')
+        self.write(os.path.join(self.content, "docs", "api", "index.md"), "# API")
+        self.write(os.path.join(self.content, "docs", "api", "template.html"), '{% extends %}{% block main %}<pre>{{ Content }}</pre>{% endblock %}')
+        self.write(os.path.join(self.content, "docs", "guide", "deep", "index.md"), "# Guide")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def render(self, templates, *parts):
+        return templates.for_page(os.path.join(self.content, *parts)).render(Content="x")
+
+    def test_apply_layouts(self):
+        self.assertEqual(apply_layouts(["{% block a %}child{% endblock %}", "[{% block a %}a{% endblock %}|{% block b %}b{% endblock %}]"]), "[child|b]")
+        with self.assertRaises(ValueError):
+            apply_layouts(["{% block a %}{% block b %}{% endblock %}{% endblock %}"])
+
+    def test_nearest_template_and_its_layouts(self):
+        templates = TemplateSet(self.content, self.default)
+        self.assertEqual(self.render(templates, "index.md"), "<nav>site</nav><main>x</main>")
+        self.assertEqual(self.render(templates, "docs", "guide", "deep", "index.md"), "<nav>docs</nav><main>x</main>")
+        # blocks come from the most specific template that has them
+        self.assertEqual(self.render(templates, "docs", "api", "index.md"), "<nav>docs</nav><main><pre>x</pre></main>")
+        self.assertEqual(Template.load(self.default).render(Content="x"), "<nav>site</nav><main>x</main>")
+
+    def test_each_file_is_read_and_each_chain_compiled_once(self):
+        default = Template.load(self.default, "/x/")
+        templates = TemplateSet(self.content, self.default, "/x/", default=default)
+        for _ in range(3):
+            self.assertIs(templates.for_page(os.path.join(self.content, "index.md")), default)
+            templates.for_page(os.path.join(self.content, "docs", "api", "index.md"))
+            templates.for_page(os.path.join(self.content, "docs", "guide", "deep", "index.md"))
+        self.assertEqual(len(templates.sources), 3)
+        self.assertEqual(len(templates.compiled), 3)
+
+    def test_extends_by_path_and_cycles(self):
+        layout = os.path.join(self.tmp.name, "layouts", "plain.html")
+        self.write(layout, "<p>{% block main %}{% endblock %}</p>")
+        self.write(os.path.join(self.content, "docs", "template.html"), '{% extends "../../layouts/plain.html" %}{% block main %}{{ Content }}{% endblock %}')
+        self.assertEqual(self.render(TemplateSet(self.content, self.default), "docs", "guide", "deep", "index.md"), "<p>x</p>")
+        self.write(layout, '{% extends "plain.html" %}')
+        with self.assertRaises(ValueError):
+            TemplateSet(self.content, self.default).for_page(os.path.join(self.content, "docs", "api", "index.md"))
+
+
+class TestBasePathAtNodeConstruction(unittest.TestCase):
+    def test_root_relative_urls_are_prefixed(self):
+        md = "[home](/index.html) ![logo](/images/logo.png) [ext](https://example.com)"
+        html = markdown_to_html_node(md, "/site/").to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/site/index.html">home</a> <img src="/site/images/logo.png" alt="logo"></img> '
+            '<a href="https://example.com">ext</a></p></div>',
+        )
+
+    def test_code_is_not_rewritten(self):
+        md = '```\n<a href="/x">\n```'
+        self.assertIn('href="/x"', markdown_to_html_node(md, "/site/").to_html())
+
+    def test_matches_string_rewrite_for_default_base(self):
+        self.assertEqual(rewrite_root_urls('href="/a"', "/"), 'href="/a"')
+
+
+if __name__ == "__main__":
+    unittest.main()
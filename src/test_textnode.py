@@ -32,6 +32,10 @@ class TestTextNode(unittest.TestCase):
         node = TextNode('test', TextType.ITALIC)
         self.assertEqual(repr(node), 'TextNode(test, italic, None)')
 
+    def test_slotted(self):
+        node = TextNode('test', TextType.TEXT)
+        self.assertFalse(hasattr(node, '__dict__'))
+
 
 if __name__ == "__main__":
     unittest.main()